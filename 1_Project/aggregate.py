@@ -0,0 +1,281 @@
+"""
+| Project Implementation for IZV 2020/2021
+| Script aggregate.py
+| Date: 18.10.2026
+| Author: Mikhail Abramov
+| xabram00@stud.fit.vutbr.cz
+"""
+
+import time
+import gzip
+import pickle
+import argparse
+import numpy
+import pandas as pd
+
+"""
+Maximum range of integer keys encoded by offset (without hashing)
+"""
+DENSE_RANGE = 1 << 16
+
+"""
+Maximum number of cells of dense key space, bigger spaces are compacted
+"""
+DENSE_CELLS = 1 << 24
+
+
+def encode(values):
+    """
+    Map key values to dense integer codes 0..k-1 (sorted by value).
+    Small bounded integers are encoded by offset lookup table,
+    categories reuse their codes, other values are hashed by pd.factorize.
+    Missing values get code -1.
+
+    Parameters
+    ----------
+    values : array-like
+        Key column.
+
+    Returns
+    -------
+    codes : np.ndarray[int64]
+        Dense codes of the values
+    labels : pd.Index
+        Key value for each code
+    """
+    if isinstance(values, pd.Series) and isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy().astype(numpy.int64)
+        present = numpy.bincount(codes[codes >= 0], minlength=len(values.cat.categories)) > 0
+        lookup = numpy.append(numpy.cumsum(present) - 1, -1)
+        return lookup[codes], pd.Index(values.cat.categories[present])
+
+    array = numpy.asarray(values)
+    if array.dtype.kind in 'iu' and len(array):
+        low, high = int(array.min()), int(array.max())
+        if high - low < DENSE_RANGE:
+            shifted = array.astype(numpy.int64) - low
+            present = numpy.bincount(shifted, minlength=high - low + 1) > 0
+            lookup = numpy.cumsum(present) - 1
+            return lookup[shifted], pd.Index(numpy.flatnonzero(present) + low,
+                                             dtype=array.dtype)
+
+    codes, labels = pd.factorize(values, sort=True)
+    return codes.astype(numpy.int64), pd.Index(labels)
+
+
+def group(keys):
+    """
+    Combine several key columns into one dense group code
+
+    Parameters
+    ----------
+    keys : list[array-like]
+        Key columns of the same length.
+
+    Returns
+    -------
+    codes : np.ndarray[int64]
+        Group code of each row (-1 for rows with missing key)
+    labels : list[pd.Index]
+        Key values of each group (one index per key column)
+    """
+    encoded = [encode(key) for key in keys]
+    valid = numpy.ones(len(encoded[0][0]), dtype=bool)
+    for codes, _ in encoded:
+        valid &= codes >= 0
+    shape = tuple(len(labels) for _, labels in encoded)
+    combined = numpy.ravel_multi_index(tuple(numpy.where(valid, codes, 0)
+                                             for codes, _ in encoded), shape)
+
+    # Keep only observed groups
+    if numpy.prod(shape, dtype=float) <= DENSE_CELLS:
+        present = numpy.bincount(combined[valid], minlength=int(numpy.prod(shape))) > 0
+        observed = numpy.flatnonzero(present)
+        lookup = numpy.cumsum(present) - 1
+        codes = numpy.where(valid, lookup[combined], -1)
+    else:
+        observed, inverse = numpy.unique(combined[valid], return_inverse=True)
+        codes = numpy.full(len(combined), -1, dtype=numpy.int64)
+        codes[valid] = inverse
+    positions = numpy.unravel_index(observed, shape)
+    return codes, [labels[position] for (_, labels), position in zip(encoded, positions)]
+
+
+def aggregate(keys, sums=None, counts=None):
+    """
+    Count rows and sum measures for each group in one bincount pass per measure
+
+    Parameters
+    ----------
+    keys : list[array-like]
+        Key columns.
+    sums : dict{str: array-like}
+        Measures to sum (missing values are ignored).
+    counts : dict{str: array-like}
+        Columns to count non-missing values.
+
+    Returns
+    -------
+    labels : list[pd.Index]
+        Key values of each group
+    size : np.ndarray
+        Number of rows of each group
+    results : dict{str: np.ndarray}
+        Sum or count of each measure for each group
+    """
+    codes, labels = group(keys)
+    n = len(labels[0])
+    valid = codes >= 0
+    size = numpy.bincount(codes[valid], minlength=n)
+    results = {}
+    for name, values in (sums or {}).items():
+        values = numpy.asarray(values, dtype=float)
+        mask = valid & ~numpy.isnan(values)
+        total = numpy.bincount(codes[mask], weights=values[mask], minlength=n)
+        results[name] = total
+    for name, values in (counts or {}).items():
+        mask = valid & pd.notna(numpy.asarray(values))
+        results[name] = numpy.bincount(codes[mask], minlength=n)
+    return labels, size, results
+
+
+def groupby_agg(df, by, agg, observed=False):
+    """
+    Drop-in replacement of df.groupby(by, as_index=False, observed=observed).agg(agg)
+    for 'sum', 'count' and 'size' aggregations. As in pandas, when some key
+    is categorical and observed is False, the result has a row for every
+    combination of all categories (and of the observed values of other keys),
+    combinations without rows get 0.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Incoming dataframe
+    by : list[str]
+        Key columns.
+    agg : dict{str: str}
+        Column -> 'sum' / 'count' / 'size'.
+    observed : bool
+        Keep only observed combinations of categorical keys.
+
+    Returns
+    -------
+    df : pd.DataFrame
+        Key columns followed by aggregated columns
+    """
+    sums = {c: df[c] for c, f in agg.items() if f == 'sum'}
+    counts = {c: df[c] for c, f in agg.items() if f == 'count'}
+    labels, size, results = aggregate([df[c] for c in by], sums, counts)
+    out = pd.DataFrame({c: label for c, label in zip(by, labels)})
+    for c, f in agg.items():
+        if f == 'size':
+            out[c] = size
+        elif f == 'sum' and df[c].dtype.kind in 'iub':
+            out[c] = results[c].round().astype(numpy.int64)
+        else:
+            out[c] = results[c]
+
+    categorical = [isinstance(df[c].dtype, pd.CategoricalDtype) for c in by]
+    if not observed and any(categorical):
+        levels = [df[c].cat.categories if is_categorical else pd.Index(out[c].unique()).sort_values()
+                  for c, is_categorical in zip(by, categorical)]
+        full = (pd.MultiIndex.from_product(levels, names=by) if len(by) > 1
+                else pd.Index(levels[0], name=by[0]))
+        out = out.set_index(by).reindex(full, fill_value=0).reset_index()
+    return out
+
+
+def crosstab(index, columns):
+    """
+    Drop-in replacement of pd.crosstab(index=index, columns=columns)
+
+    Parameters
+    ----------
+    index : list[pd.Series]
+        Row key columns.
+    columns : pd.Series
+        Column key.
+
+    Returns
+    -------
+    df : pd.DataFrame
+        Number of rows for each (index, column) pair,
+        rows are observed index combinations
+    """
+    row_codes, row_labels = group(index)
+    col_codes, col_labels = encode(columns)
+    valid = (row_codes >= 0) & (col_codes >= 0)
+    shape = (len(row_labels[0]), len(col_labels))
+    table = numpy.bincount(row_codes[valid] * shape[1] + col_codes[valid],
+                           minlength=shape[0] * shape[1]).reshape(shape)
+    # Rows without any counted value are dropped as in pd.crosstab
+    rows = table.sum(axis=1) > 0
+    names = [getattr(key, 'name', None) for key in index]
+    if len(index) == 1:
+        row_index = pd.Index(row_labels[0][rows], name=names[0])
+    else:
+        row_index = pd.MultiIndex.from_arrays([labels[rows] for labels in row_labels],
+                                              names=names)
+    return pd.DataFrame(table[rows], index=row_index,
+                        columns=pd.Index(col_labels, name=getattr(columns, 'name', None)))
+
+
+def benchmark(filename, repeat=5):
+    """
+    Compare pandas groupby/crosstab with the bincount kernel
+    on the report queries (plot_conseq, plot_surface, make_plot, make_table)
+
+    Parameters
+    ----------
+    filename : str
+        Accidents dataframe in pickle.gz format.
+    repeat : int
+        Number of runs of each query, the best time is reported.
+    """
+    with gzip.open(filename) as cache:
+        df = pickle.load(cache)
+    df['date'] = pd.to_datetime(df['p2a'], errors='coerce').dt.to_period('M').dt.to_timestamp()
+    df['region'] = df['region'].astype('category')
+    measures = {'p13a': 'sum', 'p13b': 'sum', 'p13c': 'sum', 'p1': 'count'}
+
+    queries = {
+        'plot_conseq': (
+            lambda: df.groupby(['region'], as_index=False).agg(measures),
+            lambda: groupby_agg(df, ['region'], measures)),
+        'plot_surface': (
+            lambda: pd.crosstab(index=[df['region'], df['date']], columns=df['p16']),
+            lambda: crosstab([df['region'], df['date']], df['p16'])),
+        'make_plot': (
+            lambda: pd.crosstab(index=[df['date']], columns=df['p12']),
+            lambda: crosstab([df['date']], df['p12'])),
+        'make_table': (
+            lambda: df.groupby(['p12'], as_index=False).agg(
+                {'p13a': 'sum', 'p13b': 'sum', 'p13c': 'sum'}),
+            lambda: groupby_agg(df, ['p12'], {'p13a': 'sum', 'p13b': 'sum', 'p13c': 'sum'})),
+    }
+    print(f'Rows: {len(df.index)}')
+    print(f'{"query":<14}{"pandas [ms]":>14}{"kernel [ms]":>14}{"speedup":>10}')
+    for name, (pandas_query, kernel_query) in queries.items():
+        times = []
+        for query in (pandas_query, kernel_query):
+            best = float('inf')
+            for _ in range(repeat):
+                start = time.perf_counter()
+                query()
+                best = min(best, time.perf_counter() - start)
+            times.append(best * 1000)
+        print(f'{name:<14}{times[0]:>14.2f}{times[1]:>14.2f}{times[0]/times[1]:>9.1f}x')
+
+
+if __name__ == "__main__":
+    """
+    Main:
+        benchmark of the kernel on the national dataset
+    """
+    parser = argparse.ArgumentParser(description='Benchmark aggregation kernel.')
+    parser.add_argument('filename', nargs='?', default='accidents.pkl.gz',
+                        help='Accidents dataframe in pickle.gz format')
+    parser.add_argument('-n', '--repeat', type=int, default=5,
+                        help='Number of runs of each query')
+    parsed_args = parser.parse_args()
+    benchmark(parsed_args.filename, parsed_args.repeat)
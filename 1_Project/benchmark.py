@@ -0,0 +1,667 @@
+"""
+| Project Implementation for IZV 2020/2021
+| Script benchmark.py
+| Date: 18.10.2026
+| Author: Mikhail Abramov
+| xabram00@stud.fit.vutbr.cz
+"""
+
+import os
+import sys
+import gzip
+import json
+import time
+import glob
+import pickle
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import numpy
+import pandas as pd
+import matplotlib
+
+# Figures are only rendered into files
+matplotlib.use("Agg")
+
+from datetime import datetime
+
+from download import DataDownloader, columns_codes
+from region_cache import RegionCache
+from synthetic import generate_archives, serve
+import aggregate
+import figure_cache
+
+# Report modules from 2_Project and 3_Project
+for project in ("2_Project", "3_Project"):
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, project))
+
+"""
+Region used by single region scenarios (the biggest one)
+"""
+REGION = "PHA"
+
+"""
+Default folder of the stored results
+"""
+RESULTS_FOLDER = "data/benchmarks"
+
+"""
+Scenarios checked by the regression gate
+"""
+CORE_SCENARIOS = ["parse", "get_list_cold", "get_list_warm", "get_dataframe", "plot_stat"]
+
+"""
+Default allowed slowdown of the median time (0.25 = 25 %)
+"""
+TOLERANCE = 0.25
+
+"""
+Statuses of the check report failing the regression gate
+"""
+FAILED = ("REGRESSION", "ERROR", "MISSING")
+
+"""
+Differences within this multiple of the run-to-run noise (MAD) are not regressions
+"""
+NOISE_FACTOR = 3.0
+
+
+class Context:
+    """
+    Shared state of the benchmark scenarios
+
+    Attributes
+    ----------
+    folder : str
+        Working folder (archives, caches, figures).
+    url : str
+        Listing url of the local server with synthetic archives.
+    data : tuple(list[str], list[np.ndarray])
+        get_list() output of all regions.
+    accidents : str
+        Accidents dataframe in pickle.gz format made from data.
+    df : pd.DataFrame
+        get_dataframe() output.
+    """
+
+    def __init__(self, folder, url):
+        self.folder = folder
+        self.url = url
+        self.warm = None
+        self.data = None
+        self.region = None
+        self.accidents = None
+        self.df = None
+        self.gdf = None
+
+    def prepare(self):
+        """
+        Download archives, build caches and dataframes used by the scenarios,
+        so the measured runs do not include their preparation
+        """
+        self.warm = self.downloader()
+        self.data = self.warm.get_list()
+        self.region = self.warm.read_cache(REGION)
+        self.accidents = f"{self.folder}/accidents.pkl.gz"
+        with gzip.open(self.accidents, "wb") as f:
+            pickle.dump(to_dataframe(self.data), f)
+        try:
+            from analysis import get_dataframe
+            self.df = get_dataframe(self.accidents)
+        except ImportError as e:
+            print(f"WARNING: {e}", file=sys.stderr)
+
+    def downloader(self, folder=None, regions_cache=None):
+        """
+        DataDownloader of the working folder with own program cache
+        """
+        return DataDownloader(self.url, folder or f"{self.folder}/data",
+                              regions_cache=regions_cache or RegionCache(None))
+
+    def copy_archives(self, folder):
+        """
+        New data folder with downloaded archives only (cold caches)
+        """
+        shutil.rmtree(folder, ignore_errors=True)
+        os.makedirs(folder)
+        for path in glob.glob(f"{self.folder}/data/*.zip") + [f"{self.folder}/data/catalog.json"]:
+            shutil.copy(path, folder)
+        manifest = self.downloader().manifest.load()
+        with open(f"{folder}/manifest.json", "w") as f:
+            json.dump({name: entry for name, entry in manifest.items() if name.endswith(".zip")}, f)
+        return folder
+
+    def figure(self, name):
+        """
+        Path of the rendered figure
+        """
+        return f"{self.folder}/figures/{name}.png"
+
+
+def to_dataframe(data):
+    """
+    Convert data object into accidents dataframe (accidents.pkl.gz layout)
+
+    Parameters
+    ----------
+    data : tuple(list[str], list[np.ndarray])
+
+    Returns
+    -------
+    df : pd.DataFrame
+        Columns by short codes, p2a as string, missing GPS as NaN
+    """
+    df = pd.DataFrame({columns_codes[i]: array for i, array in enumerate(data[1])})
+    df["p2a"] = numpy.datetime_as_string(data[1][4])
+    for column in ("d", "e"):
+        df[column] = df[column].astype(float).where(df[column] != -1)
+    return df
+
+
+def scenario_download(ctx):
+    """
+    Download all archives from the local server into empty folder
+    """
+    folder = f"{ctx.folder}/download"
+    shutil.rmtree(folder, ignore_errors=True)
+    ctx.downloader(folder).download_data()
+    # Rows are not counted, download is measured in bytes
+    return None
+
+
+def scenario_parse(ctx):
+    """
+    Parse the region from all archives
+    """
+    return len(ctx.downloader().parse_region_data(REGION)[1][0])
+
+
+def scenario_cache_save(ctx):
+    """
+    Save the region cache file
+    """
+    ctx.downloader().save_cache(REGION, ctx.region)
+    return len(ctx.region[1][0])
+
+
+def scenario_cache_load(ctx):
+    """
+    Read the region cache file
+    """
+    return len(ctx.downloader().read_cache(REGION)[1][0])
+
+
+def scenario_get_list_cold(ctx):
+    """
+    get_list of all regions with downloaded archives and without caches
+    """
+    folder = ctx.copy_archives(f"{ctx.folder}/cold")
+    return len(ctx.downloader(folder).get_list()[1][0])
+
+
+def scenario_get_list_file(ctx):
+    """
+    get_list of all regions from the cache files
+    """
+    return len(ctx.downloader().get_list()[1][0])
+
+
+def scenario_get_list_warm(ctx):
+    """
+    get_list of all regions from the program cache
+    """
+    return len(ctx.warm.get_list()[1][0])
+
+
+def scenario_get_dataframe(ctx):
+    """
+    Load accidents dataframe by analysis.get_dataframe
+    """
+    from analysis import get_dataframe
+    return len(get_dataframe(ctx.accidents))
+
+
+def scenario_aggregate(ctx):
+    """
+    Report aggregations by the bincount kernel
+    """
+    df = ctx.df
+    aggregate.groupby_agg(df, ["region"], {"p13a": "sum", "p13b": "sum", "p13c": "sum", "p1": "count"})
+    aggregate.crosstab([df["region"], df["date"]], df["p16"])
+    aggregate.crosstab([df["date"]], df["p12"])
+    return len(df)
+
+
+def scenario_plot_stat(ctx):
+    """
+    Render get_stat.plot_stat
+    """
+    from get_stat import plot_stat
+    plot_stat(ctx.data, ctx.figure("plot_stat"))
+    return len(ctx.data[1][0])
+
+
+def scenario_plot_conseq(ctx):
+    """
+    Render analysis.plot_conseq
+    """
+    from analysis import plot_conseq
+    plot_conseq(ctx.df, ctx.figure("plot_conseq"))
+    return len(ctx.df)
+
+
+def scenario_plot_damage(ctx):
+    """
+    Render analysis.plot_damage
+    """
+    from analysis import plot_damage
+    plot_damage(ctx.df, ctx.figure("plot_damage"))
+    return len(ctx.df)
+
+
+def scenario_plot_surface(ctx):
+    """
+    Render analysis.plot_surface
+    """
+    from analysis import plot_surface
+    plot_surface(ctx.df, ctx.figure("plot_surface"))
+    return len(ctx.df)
+
+
+def scenario_make_geo(ctx):
+    """
+    Convert accidents into GeoDataFrame by geo.make_geo
+    """
+    from geo import make_geo
+    ctx.gdf = make_geo(pd.read_pickle(ctx.accidents))
+    return len(ctx.gdf)
+
+
+def scenario_plot_geo(ctx):
+    """
+    Render geo.plot_geo
+    """
+    from geo import plot_geo
+    plot_geo(ctx.gdf, ctx.figure("plot_geo"))
+    return len(ctx.gdf)
+
+
+def scenario_plot_cluster(ctx):
+    """
+    Render geo.plot_cluster
+    """
+    from geo import plot_cluster
+    plot_cluster(ctx.gdf, ctx.figure("plot_cluster"))
+    return len(ctx.gdf)
+
+
+def scenario_make_plot(ctx):
+    """
+    Load dataframe and render doc.make_plot
+    """
+    from doc import make_dataframe, make_plot
+    df = make_dataframe(ctx.accidents)
+    make_plot(df, ctx.figure("make_plot"))
+    return len(df)
+
+
+"""
+Scenarios in run order (later scenarios use results of the former ones)
+"""
+SCENARIOS = {
+    "download": scenario_download,
+    "parse": scenario_parse,
+    "cache_save": scenario_cache_save,
+    "cache_load": scenario_cache_load,
+    "get_list_cold": scenario_get_list_cold,
+    "get_list_file": scenario_get_list_file,
+    "get_list_warm": scenario_get_list_warm,
+    "get_dataframe": scenario_get_dataframe,
+    "aggregate": scenario_aggregate,
+    "plot_stat": scenario_plot_stat,
+    "plot_conseq": scenario_plot_conseq,
+    "plot_damage": scenario_plot_damage,
+    "plot_surface": scenario_plot_surface,
+    "make_geo": scenario_make_geo,
+    "plot_geo": scenario_plot_geo,
+    "plot_cluster": scenario_plot_cluster,
+    "make_plot": scenario_make_plot,
+}
+
+
+def commit():
+    """
+    Short hash of the current git commit ('unknown' outside of git)
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def quiet(function, *args):
+    """
+    Call function with suppressed standard output (progress prints)
+    """
+    with open(os.devnull, "w") as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            return function(*args)
+        finally:
+            sys.stdout = stdout
+
+
+def run(scale=0.1, repeat=3, scenarios=None, years=None, seed=0, warmup=0):
+    """
+    Generate synthetic archives, serve them by local HTTP server
+    and measure the scenarios
+
+    Parameters
+    ----------
+    scale : float
+        Multiple of the national volume.
+    repeat : int
+        Number of runs of each scenario.
+    scenarios : list[str]
+        Scenarios to run, all scenarios if None. Scenarios which
+        cannot run (missing optional packages) are recorded with error.
+    years : list[int]
+        Generated years, 2016 .. 2020 if None.
+    seed : int
+        Generator seed.
+    warmup : int
+        Number of unrecorded runs of each scenario before measuring.
+
+    Returns
+    -------
+    results : dict
+        Metadata and times of each scenario
+    """
+    selected = [name for name in SCENARIOS if scenarios is None or name in scenarios]
+    # Scenarios measure rendering, not copying of cached figures
+    figure_cache.enable(False)
+    results = {"commit": commit(),
+               "date": datetime.now().isoformat(timespec="seconds"),
+               "python": platform.python_version(),
+               "numpy": numpy.__version__,
+               "pandas": pd.__version__,
+               "scale": scale,
+               "repeat": repeat,
+               "scenarios": {}}
+    with tempfile.TemporaryDirectory() as folder:
+        os.makedirs(f"{folder}/figures")
+        quiet(generate_archives, f"{folder}/archives", scale, years or range(2016, 2021),
+              None, 0.01, 0.001, seed)
+        server, url = serve(f"{folder}/archives")
+        ctx = Context(folder, url)
+        try:
+            quiet(ctx.prepare)
+            for name in selected:
+                times, rows, error = [], None, None
+                for i in range(warmup + repeat):
+                    start = time.perf_counter()
+                    try:
+                        rows = quiet(SCENARIOS[name], ctx)
+                    except Exception as e:
+                        error = f"{type(e).__name__}: {e}"
+                        break
+                    if i >= warmup:
+                        times.append(time.perf_counter() - start)
+                results["scenarios"][name] = {"times": times, "rows": rows, "error": error,
+                                              "stats": statistics(times)}
+                print(format_line(name, results["scenarios"][name]))
+        finally:
+            server.shutdown()
+    return results
+
+
+def statistics(times):
+    """
+    Robust statistics of the run times, outliers are the runs
+    further than 3 MAD from the median (e.g. disturbed by other processes)
+
+    Parameters
+    ----------
+    times : list[float]
+
+    Returns
+    -------
+    stats : dict
+        median, mad (scaled to sigma), q1, q3, min, n and number of outliers,
+        None for empty times
+    """
+    if not times:
+        return None
+    times = numpy.asarray(times)
+    median = numpy.median(times)
+    mad = 1.4826 * numpy.median(numpy.abs(times - median))
+    outliers = numpy.abs(times - median) > 3 * mad if mad else numpy.zeros(len(times), dtype=bool)
+    kept = times[~outliers]
+    q1, q3 = numpy.percentile(kept, [25, 75])
+    return {"median": float(numpy.median(kept)), "mad": float(mad), "q1": float(q1),
+            "q3": float(q3), "min": float(kept.min()), "n": int(len(kept)),
+            "outliers": int(outliers.sum())}
+
+
+def check(baseline, results, tolerance=TOLERANCE, tolerances=None, scenarios=None):
+    """
+    Compare results with baseline, scenario regresses when its median time
+    is slower than baseline median by more than the tolerance and
+    the difference is bigger than the run-to-run noise.
+    Checked scenario without times failed (ERROR) or was not run (MISSING),
+    only baseline scenarios left out of the checked ones are SKIPPED.
+
+    Parameters
+    ----------
+    baseline, results : dict
+        Stored results.
+    tolerance : float
+        Allowed relative slowdown of the median.
+    tolerances : dict{str: float}
+        Allowed slowdown of the scenarios, overrides tolerance.
+    scenarios : list[str]
+        Checked scenarios, all scenarios of the results if None.
+
+    Returns
+    -------
+    report : list[tuple(str, str, float, float, float)]
+        (scenario, status, baseline median, median, change) of each scenario,
+        status is OK, REGRESSION, IMPROVED, NEW, ERROR, MISSING or SKIPPED
+    """
+    report = []
+    checked = list(results["scenarios"]) if scenarios is None else list(scenarios)
+    for name in checked:
+        result = results["scenarios"].get(name)
+        if result is None:
+            report.append((name, "MISSING", None, None, None))
+            continue
+        base = baseline["scenarios"].get(name)
+        new = result.get("stats") or statistics(result["times"])
+        old = base and (base.get("stats") or statistics(base["times"]))
+        if new is None:
+            report.append((name, "ERROR" if result.get("error") else "MISSING",
+                           None, None, None))
+            continue
+        if not old:
+            report.append((name, "NEW", None, new["median"], None))
+            continue
+        change = new["median"] / old["median"] - 1
+        allowed = (tolerances or {}).get(name, tolerance)
+        noise = NOISE_FACTOR * numpy.hypot(old["mad"], new["mad"])
+        difference = new["median"] - old["median"]
+        if change > allowed and difference > noise:
+            status = "REGRESSION"
+        elif change < -allowed and -difference > noise:
+            status = "IMPROVED"
+        else:
+            status = "OK"
+        report.append((name, status, old["median"], new["median"], change))
+    for name in baseline["scenarios"]:
+        if name not in checked:
+            report.append((name, "SKIPPED", None, None, None))
+    return report
+
+
+def format_report(report, baseline, results):
+    """
+    Readable table of the check report
+
+    Returns
+    -------
+    text : str
+    """
+    lines = [f'Baseline {baseline["commit"]} ({baseline["date"]}) -> '
+             f'{results["commit"]} ({results["date"]}), scale x{results["scale"]:g}',
+             f'{"scenario":<16}{"baseline [ms]":>15}{"current [ms]":>15}{"change":>10}  status']
+    for name, status, old, new, change in report:
+        old = f"{old * 1000:.1f}" if old is not None else "-"
+        new = f"{new * 1000:.1f}" if new is not None else "-"
+        change = f"{change * 100:+.1f}%" if change is not None else "-"
+        error = (results["scenarios"].get(name) or {}).get("error") if status == "ERROR" else None
+        lines.append(f'{name:<16}{old:>15}{new:>15}{change:>10}  {status}'
+                     + (f' ({error})' if error else ''))
+    failed = [f"{name} ({status.lower()})" for name, status, *_ in report if status in FAILED]
+    lines.append(f'FAILED: {", ".join(failed)}' if failed else 'PASSED')
+    return "\n".join(lines)
+
+
+def parse_tolerances(values):
+    """
+    Parse scenario tolerances 'name=0.5' of the command line
+    """
+    tolerances = {}
+    for value in values or []:
+        name, _, limit = value.partition("=")
+        if name not in SCENARIOS or not limit:
+            raise argparse.ArgumentTypeError(f"ERROR: wrong tolerance {value}, use scenario=0.5")
+        tolerances[name] = float(limit)
+    return tolerances
+
+
+def format_line(name, result):
+    """
+    One line of the results table
+    """
+    if result["error"]:
+        return f'{name:<16}{"skipped":>12}  {result["error"][:60]}'
+    times = numpy.array(result["times"])
+    return (f'{name:<16}{times.min() * 1000:>12.1f}{numpy.median(times) * 1000:>12.1f}'
+            f'{result["rows"] or 0:>12}')
+
+
+def save(results, folder=RESULTS_FOLDER):
+    """
+    Store results as {folder}/{commit}-x{scale}.json
+
+    Returns
+    -------
+    path : str
+    """
+    os.makedirs(folder, exist_ok=True)
+    path = f"{folder}/{results['commit']}-x{results['scale']:g}.json"
+    with open(path, "w") as f:
+        json.dump(results, f, indent=1)
+    return path
+
+
+def load(path):
+    """
+    Load stored results
+    """
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(old, new):
+    """
+    Print median times of two stored results side by side
+
+    Parameters
+    ----------
+    old, new : dict
+        Stored results.
+    """
+    print(f'{"scenario":<16}{old["commit"]:>12}{new["commit"]:>12}{"change":>10}')
+    for name in SCENARIOS:
+        a, b = old["scenarios"].get(name), new["scenarios"].get(name)
+        if not a or not b or not a["times"] or not b["times"]:
+            continue
+        before, after = numpy.median(a["times"]) * 1000, numpy.median(b["times"]) * 1000
+        print(f'{name:<16}{before:>12.1f}{after:>12.1f}{(after / before - 1) * 100:>+9.1f}%')
+
+
+if __name__ == "__main__":
+    """
+    Main:
+        run - measure scenarios on synthetic archives and store results
+        compare - compare two stored results
+        check - regression gate of the core scenarios against the baseline
+    """
+    parser = argparse.ArgumentParser(description='Benchmark suite on synthetic archives.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help='Measure scenarios and store results')
+    run_parser.add_argument('-x', '--scale', type=float, default=0.1,
+                            help='Multiple of the national volume (1, 10, 100)')
+    run_parser.add_argument('-n', '--repeat', type=int, default=3,
+                            help='Number of runs of each scenario')
+    run_parser.add_argument('-s', '--scenarios', nargs='+', choices=list(SCENARIOS),
+                            help='Scenarios to run, all if not set')
+    run_parser.add_argument('-o', '--results', default=RESULTS_FOLDER,
+                            help='Folder of the stored results')
+    compare_parser = commands.add_parser('compare', help='Compare two stored results')
+    compare_parser.add_argument('old', help='Stored results (baseline)')
+    compare_parser.add_argument('new', help='Stored results')
+    check_parser = commands.add_parser('check', help='Run core scenarios and fail on regression')
+    check_parser.add_argument('-b', '--baseline', default=f'{RESULTS_FOLDER}/baseline.json',
+                              help='Stored baseline results')
+    check_parser.add_argument('-x', '--scale', type=float, default=0.1,
+                              help='Multiple of the national volume')
+    check_parser.add_argument('-n', '--repeat', type=int, default=7,
+                              help='Number of measured runs of each scenario')
+    check_parser.add_argument('-w', '--warmup', type=int, default=1,
+                              help='Number of unrecorded runs of each scenario')
+    check_parser.add_argument('-s', '--scenarios', nargs='+', choices=list(SCENARIOS),
+                              default=CORE_SCENARIOS, help='Checked scenarios')
+    check_parser.add_argument('-t', '--tolerance', type=float, default=TOLERANCE,
+                              help='Allowed slowdown of the median (0.25 = 25 %%)')
+    check_parser.add_argument('-T', '--scenario-tolerance', nargs='+', metavar='NAME=LIMIT',
+                              help='Allowed slowdown of the scenarios, e.g. plot_stat=0.5')
+    check_parser.add_argument('-r', '--results', default=None,
+                              help='Check stored results instead of running scenarios')
+    check_parser.add_argument('-u', '--update-baseline', action='store_true',
+                              help='Store current results as the new baseline')
+    parsed_args = parser.parse_args()
+
+    if parsed_args.command == 'run':
+        print(f'{"scenario":<16}{"best [ms]":>12}{"median [ms]":>12}{"rows":>12}')
+        stored = save(run(parsed_args.scale, parsed_args.repeat, parsed_args.scenarios),
+                      parsed_args.results)
+        print(f'Results: {stored}')
+    elif parsed_args.command == 'compare':
+        compare(load(parsed_args.old), load(parsed_args.new))
+    else:
+        tolerances = parse_tolerances(parsed_args.scenario_tolerance)
+        if parsed_args.results:
+            current = load(parsed_args.results)
+        else:
+            print(f'{"scenario":<16}{"best [ms]":>12}{"median [ms]":>12}{"rows":>12}')
+            current = run(parsed_args.scale, parsed_args.repeat, parsed_args.scenarios,
+                          warmup=parsed_args.warmup)
+        if parsed_args.update_baseline or not os.path.isfile(parsed_args.baseline):
+            os.makedirs(os.path.dirname(parsed_args.baseline) or ".", exist_ok=True)
+            with open(parsed_args.baseline, "w") as f:
+                json.dump(current, f, indent=1)
+            print(f'Baseline stored: {parsed_args.baseline}')
+            sys.exit(0)
+        baseline = load(parsed_args.baseline)
+        if baseline["scale"] != current["scale"]:
+            print(f'ERROR: baseline scale x{baseline["scale"]:g} differs from x{current["scale"]:g}')
+            sys.exit(2)
+        check_report = check(baseline, current, parsed_args.tolerance, tolerances,
+                             parsed_args.scenarios)
+        print(format_report(check_report, baseline, current))
+        sys.exit(1 if any(status in FAILED for _, status, *_ in check_report) else 0)
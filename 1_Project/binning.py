@@ -0,0 +1,210 @@
+"""
+| Project Implementation for IZV 2020/2021
+| Script binning.py
+| Date: 18.10.2026
+| Author: Mikhail Abramov
+| xabram00@stud.fit.vutbr.cz
+"""
+
+import os
+import gzip
+import pickle
+import numpy
+import pandas as pd
+
+from download import columns_codes
+from storage import atomic_write, file_stamp
+
+
+class Bins:
+    """
+    Precompiled right-closed intervals (low, high] with labels,
+    same categories as pd.cut with IntervalIndex and renamed categories.
+    Values are assigned by binary search over the upper edges.
+
+    Attributes
+    ----------
+    lows, highs : np.ndarray[float]
+        Edges of the intervals sorted by high edge (not overlapping).
+    labels : list[str]
+        Label of each interval.
+    """
+
+    def __init__(self, intervals, labels):
+        order = numpy.argsort([high for _, high in intervals], kind="stable")
+        self.lows = numpy.array([intervals[i][0] for i in order], dtype=float)
+        self.highs = numpy.array([intervals[i][1] for i in order], dtype=float)
+        self.labels = [labels[i] for i in order]
+
+    def codes(self, values):
+        """
+        Interval of each value
+
+        Returns
+        -------
+        codes : np.ndarray[int8]
+            Index of the label, -1 for values outside of the intervals and NaN
+        """
+        values = numpy.asarray(values, dtype=float)
+        index = numpy.searchsorted(self.highs, values, side="left")
+        inside = index < len(self.highs)
+        index = numpy.where(inside, index, 0)
+        inside &= values > self.lows[index]
+        return numpy.where(inside, index, -1).astype(numpy.int8)
+
+    def categorical(self, values=None, codes=None):
+        """
+        Categorical of the values (or of precomputed codes)
+
+        Returns
+        -------
+        categorical : pd.Categorical
+            Categories are the labels, values outside are NaN
+        """
+        if codes is None:
+            codes = self.codes(values)
+        return pd.Categorical.from_codes(codes, self.labels)
+
+
+"""
+Groups of accident causes (p12)
+"""
+CAUSES = Bins([(99, 100), (200, 209), (300, 311), (400, 414), (500, 516), (600, 616)],
+              ['Not caused by the driver',
+               'Speeding',
+               'Incorrect overtaking',
+               'Not giving priority in driving',
+               'Wrong way of driving',
+               'Technical defect of the vehicle'])
+
+"""
+Classes of damage to vehicles (p53 in hundreds CZK, labels in thousands CZK)
+"""
+DAMAGE = Bins([(-1, 499.99), (499.99, 1999.99), (1999.99, 4999.99),
+               (4999.99, 10000), (10000, float('inf'))],
+              ['<50', '50-199', '200-499', '500-1000', '>1000'])
+
+"""
+Bins of the columns (short codes)
+"""
+BINS = {"p12": CAUSES, "p53": DAMAGE}
+
+
+class BinCodes:
+    """
+    Precomputed bin codes of the rows for each binned column,
+    stored as compact int8 arrays next to the data and shared
+    by all reports using cause groups or damage classes.
+
+    Attributes
+    ----------
+    codes : dict{str: np.ndarray[int8]}
+        Bin codes of the rows for each column.
+    source : str
+        Stamp of the source file (for_file), empty otherwise.
+    """
+
+    def __init__(self, codes, source=""):
+        self.codes = codes
+        self.source = source
+
+    @classmethod
+    def build(cls, columns):
+        """
+        Compute codes of the columns
+
+        Parameters
+        ----------
+        columns : dict{str: array-like}
+            Column short code (key of BINS) -> values.
+
+        Returns
+        -------
+        codes : BinCodes
+        """
+        return cls({column: BINS[column].codes(values) for column, values in columns.items()})
+
+    @classmethod
+    def from_data(cls, data, columns=BINS):
+        """
+        Compute codes from DataDownloader.get_list data object
+        """
+        codes = [columns_codes[i] for i in range(len(data[0]))]
+        arrays = dict(zip(codes, data[1]))
+        return cls.build({column: arrays[column] for column in columns})
+
+    @classmethod
+    def from_dataframe(cls, df, columns=BINS):
+        """
+        Compute codes from dataframe (positions of df rows),
+        missing columns are skipped
+        """
+        return cls.build({column: df[column] for column in columns if column in df})
+
+    @classmethod
+    def for_file(cls, filename, columns=BINS):
+        """
+        Load codes cached next to accidents pickle.gz file ({filename}.bins.npz),
+        codes are recomputed when the file is rewritten (size, mtime).
+
+        Parameters
+        ----------
+        filename : str
+            Accidents dataframe in pickle.gz format.
+        columns : list[str]
+            Binned column short codes.
+
+        Returns
+        -------
+        codes : BinCodes
+        """
+        path = f"{filename}.bins.npz"
+        stamp = file_stamp(filename)
+        if os.path.isfile(path):
+            codes = cls.load(path)
+            if codes.source == stamp and all(c in codes.codes for c in columns):
+                return codes
+        with gzip.open(filename) as cache:
+            df = pickle.load(cache)
+        codes = cls.from_dataframe(df, columns)
+        codes.save(path, stamp)
+        return codes
+
+    def save(self, path, source=None):
+        """
+        Atomically save codes into npz file
+        """
+        source = self.source if source is None else source
+        with atomic_write(path) as f:
+            numpy.savez_compressed(f, source=numpy.array(source),
+                                   columns=numpy.array(list(self.codes)),
+                                   **{f"codes_{i}": codes
+                                      for i, codes in enumerate(self.codes.values())})
+        self.source = source
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load codes from npz file
+        """
+        with numpy.load(path, allow_pickle=False) as f:
+            columns = [str(c) for c in f["columns"]]
+            return cls({c: f[f"codes_{i}"] for i, c in enumerate(columns)}, str(f["source"]))
+
+    def categorical(self, column, rows=None):
+        """
+        Labels of the rows as categorical
+
+        Parameters
+        ----------
+        column : str
+            Binned column short code.
+        rows : np.ndarray[int]
+            Positions of the rows, all rows if None.
+
+        Returns
+        -------
+        categorical : pd.Categorical
+        """
+        codes = self.codes[column]
+        return BINS[column].categorical(codes=codes if rows is None else codes[rows])
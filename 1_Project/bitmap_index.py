@@ -0,0 +1,304 @@
+"""
+| Project Implementation for IZV 2020/2021
+| Script bitmap_index.py
+| Date: 18.10.2026
+| Author: Mikhail Abramov
+| xabram00@stud.fit.vutbr.cz
+"""
+
+import os
+import gzip
+import pickle
+import numpy
+
+from aggregate import encode
+from download import columns_codes
+from storage import atomic_write, file_stamp
+
+"""
+Low-cardinality columns indexed by default (short codes)
+"""
+INDEX_COLUMNS = ["region", "p5a", "p6", "p10", "p11", "p12", "p15", "p16", "weekday(p2a)"]
+
+"""
+Number of set bits for each byte value
+"""
+POPCOUNT = numpy.array([bin(i).count("1") for i in range(256)], dtype=numpy.uint8)
+
+
+class Bitmap:
+    """
+    Packed row selection (one bit per row), combined with & | ~
+
+    Attributes
+    ----------
+    bits : np.ndarray[uint8]
+        Packed bits (numpy.packbits layout).
+    size : int
+        Number of rows.
+    """
+
+    def __init__(self, bits, size):
+        self.bits = bits
+        self.size = size
+
+    def __and__(self, other):
+        return Bitmap(self.bits & other.bits, self.size)
+
+    def __or__(self, other):
+        return Bitmap(self.bits | other.bits, self.size)
+
+    def __invert__(self):
+        bits = ~self.bits
+        # Clear padding bits of the last byte
+        if self.size % 8:
+            bits[-1] &= numpy.uint8((0xFF << (8 - self.size % 8)) & 0xFF)
+        return Bitmap(bits, self.size)
+
+    def __len__(self):
+        return self.count()
+
+    def count(self):
+        """
+        Number of selected rows
+        """
+        return int(POPCOUNT[self.bits].sum(dtype=numpy.int64))
+
+    def mask(self):
+        """
+        Boolean mask of selected rows
+        """
+        return numpy.unpackbits(self.bits, count=self.size).astype(bool)
+
+    def rows(self):
+        """
+        Positions of selected rows (for df.iloc / array indexing)
+        """
+        return numpy.flatnonzero(numpy.unpackbits(self.bits, count=self.size))
+
+
+class BitmapIndex:
+    """
+    Per-value bitmap indexes of low-cardinality columns.
+    Every column keeps sorted distinct values and packed bitmap
+    of each value, predicates are combined with bitwise AND/OR.
+
+    Attributes
+    ----------
+    size : int
+        Number of indexed rows.
+    values : dict{str: np.ndarray}
+        Distinct values of each indexed column.
+    bits : dict{str: np.ndarray[uint8]}
+        Packed bitmaps (values × bytes) of each indexed column.
+
+    Methods
+    -------
+    build(columns):
+        Build index from row-level columns
+    from_data(data, columns), from_dataframe(df, columns):
+        Build index from DataDownloader data object or dataframe
+    for_file(filename, columns):
+        Load index cached next to accidents pickle.gz file (build if needed)
+    save(path), load(path):
+        Persist index into npz file
+    eq(column, value), isin(column, values):
+        Bitmap of the rows with column value(s)
+    select(**predicates):
+        AND of isin bitmaps, e.g. select(region=['JHM'], p5a=[1])
+    """
+
+    def __init__(self, size, values, bits):
+        self.size = size
+        self.values = values
+        self.bits = bits
+        self.source = ""
+
+    @classmethod
+    def build(cls, columns):
+        """
+        Build index from row-level columns
+
+        Parameters
+        ----------
+        columns : dict{str: array-like}
+            Column short code -> values.
+
+        Returns
+        -------
+        index : BitmapIndex
+        """
+        size = len(next(iter(columns.values())))
+        values, bits = {}, {}
+        for column, data in columns.items():
+            codes, labels = encode(data)
+            labels = numpy.asarray(labels)
+            if labels.dtype == object:
+                labels = labels.astype(str)
+            values[column] = labels
+            bits[column] = numpy.stack([numpy.packbits(codes == k) for k in range(len(labels))]
+                                       ) if len(labels) else numpy.zeros((0, (size + 7) // 8),
+                                                                         dtype=numpy.uint8)
+        return cls(size, values, bits)
+
+    @classmethod
+    def from_data(cls, data, columns=INDEX_COLUMNS):
+        """
+        Build index from DataDownloader.get_list data object
+
+        Parameters
+        ----------
+        data : tuple(list[str], list[np.ndarray])
+        columns : list[str]
+            Column short codes to index.
+
+        Returns
+        -------
+        index : BitmapIndex
+        """
+        codes = [columns_codes[i] for i in range(len(data[0]))]
+        arrays = dict(zip(codes, data[1]))
+        return cls.build({column: arrays[column] for column in columns})
+
+    @classmethod
+    def from_dataframe(cls, df, columns=INDEX_COLUMNS):
+        """
+        Build index from dataframe (positions of df rows)
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+        columns : list[str]
+            Column names to index, missing columns are skipped.
+
+        Returns
+        -------
+        index : BitmapIndex
+        """
+        return cls.build({column: (df[column].astype(str) if column == "region" else df[column])
+                          for column in columns if column in df})
+
+    @classmethod
+    def for_file(cls, filename, columns=INDEX_COLUMNS):
+        """
+        Load index cached next to accidents pickle.gz file ({filename}.bitmaps.npz),
+        index is rebuilt when the file is rewritten (size, mtime).
+
+        Parameters
+        ----------
+        filename : str
+            Accidents dataframe in pickle.gz format.
+        columns : list[str]
+            Column short codes to index.
+
+        Returns
+        -------
+        index : BitmapIndex
+        """
+        path = f"{filename}.bitmaps.npz"
+        stamp = file_stamp(filename)
+        if os.path.isfile(path):
+            index = cls.load(path)
+            if index.source == stamp and all(c in index.values for c in columns):
+                return index
+        with gzip.open(filename) as cache:
+            df = pickle.load(cache)
+        index = cls.from_dataframe(df, columns)
+        index.save(path, stamp)
+        return index
+
+    def save(self, path, source=""):
+        """
+        Atomically save index into npz file
+
+        Parameters
+        ----------
+        path : str
+        source : str
+            Stamp of the indexed data file.
+        """
+        arrays = {"size": numpy.array(self.size), "source": numpy.array(source),
+                  "columns": numpy.array(list(self.values))}
+        for i, column in enumerate(self.values):
+            arrays[f"values_{i}"] = self.values[column]
+            arrays[f"bits_{i}"] = self.bits[column]
+        with atomic_write(path) as f:
+            numpy.savez_compressed(f, **arrays)
+        self.source = source
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load index from npz file
+
+        Parameters
+        ----------
+        path : str
+
+        Returns
+        -------
+        index : BitmapIndex
+        """
+        with numpy.load(path, allow_pickle=False) as f:
+            columns = [str(c) for c in f["columns"]]
+            index = cls(int(f["size"]),
+                        {c: f[f"values_{i}"] for i, c in enumerate(columns)},
+                        {c: f[f"bits_{i}"] for i, c in enumerate(columns)})
+            index.source = str(f["source"])
+        return index
+
+    def empty(self):
+        """
+        Bitmap without rows
+        """
+        return Bitmap(numpy.zeros((self.size + 7) // 8, dtype=numpy.uint8), self.size)
+
+    def all(self):
+        """
+        Bitmap with all rows
+        """
+        return ~self.empty()
+
+    def isin(self, column, values):
+        """
+        Bitmap of the rows where column value is one of the values (OR of bitmaps)
+
+        Parameters
+        ----------
+        column : str
+        values : list
+
+        Returns
+        -------
+        bitmap : Bitmap
+        """
+        labels = self.values[column]
+        positions = numpy.flatnonzero(numpy.isin(labels, numpy.asarray(list(values),
+                                                                       dtype=labels.dtype)))
+        if not len(positions):
+            return self.empty()
+        return Bitmap(numpy.bitwise_or.reduce(self.bits[column][positions], axis=0), self.size)
+
+    def eq(self, column, value):
+        """
+        Bitmap of the rows with column == value
+        """
+        return self.isin(column, [value])
+
+    def select(self, **predicates):
+        """
+        AND of isin bitmaps for each predicate
+
+        Parameters
+        ----------
+        predicates : dict{str: list}
+            Column short code -> accepted values.
+
+        Returns
+        -------
+        bitmap : Bitmap
+        """
+        result = self.all()
+        for column, values in predicates.items():
+            result = result & self.isin(column, values)
+        return result
@@ -0,0 +1,399 @@
+"""
+| Project Implementation for IZV 2020/2021
+| Script block_store.py
+| Date: 18.10.2026
+| Author: Mikhail Abramov
+| xabram00@stud.fit.vutbr.cz
+"""
+
+import os
+import gzip
+import time
+import glob
+import struct
+import pickle
+import argparse
+import tempfile
+import numpy
+
+import cache_codecs
+
+"""
+Block store file signature (version 2: every column of the block
+is compressed separately by its own codec)
+"""
+MAGIC = b"IZVBLK2\n"
+
+"""
+Signature of version 1 files (whole block compressed by gzip)
+"""
+MAGIC_V1 = b"IZVBLK1\n"
+
+"""
+Default number of rows in one block
+"""
+BLOCK_ROWS = 16384
+
+"""
+Sort column of the region caches
+"""
+DATE_COLUMN = "YYYY-MM-DD"
+
+
+def sort_by(data, column=DATE_COLUMN):
+    """
+    Stable sort of the data object rows by defined column
+
+    Parameters
+    ----------
+    data : tuple(list[str], list[np.ndarray])
+    column : str
+        Sort column name.
+
+    Returns
+    -------
+    data : tuple(list[str], list[np.ndarray])
+        New data object with sorted rows
+    """
+    order = numpy.argsort(data[1][data[0].index(column)], kind="stable")
+    return (list(data[0]), [array[order] for array in data[1]])
+
+
+def missing(values):
+    """
+    Mask of the missing values (NaN, NaT) of the array
+
+    Parameters
+    ----------
+    values : np.ndarray
+
+    Returns
+    -------
+    mask : np.ndarray[bool]
+    """
+    if values.dtype.kind == "M":
+        return numpy.isnat(values)
+    if values.dtype.kind == "f":
+        return numpy.isnan(values)
+    return numpy.zeros(values.shape, dtype=bool)
+
+
+def zone(values):
+    """
+    Min and max of the block segment without the missing values,
+    both are missing (NaN, NaT) when all values of the segment are missing
+
+    Parameters
+    ----------
+    values : np.ndarray
+
+    Returns
+    -------
+    low, high : scalar
+    """
+    known = values[~missing(values)]
+    if not len(known):
+        return values[0], values[0]
+    return known.min(), known.max()
+
+
+def is_block_store(path):
+    """
+    Check block store signature of the file
+
+    Parameters
+    ----------
+    path : str
+
+    Returns
+    -------
+    bool
+    """
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) in (MAGIC, MAGIC_V1)
+
+
+def write(f, data, block_rows=BLOCK_ROWS, codec=None):
+    """
+    Write data object as sequence of blocks of rows followed by footer
+    with block offsets, column codecs and zone maps
+    (per-block min/max of date and numeric columns, NaN and NaT are skipped).
+    Every column segment of the block is compressed separately,
+    so readers decompress only needed columns.
+
+    File layout: MAGIC | block 0 | ... | block N | footer | footer size (8 B)
+    Block layout: column 0 | ... | column M (compressed pickles)
+
+    Parameters
+    ----------
+    f : file object
+        Binary file opened for writing.
+    data : tuple(list[str], list[np.ndarray])
+        Data object (rows should be sorted by date for efficient skipping).
+    block_rows : int
+        Number of rows in one block.
+    codec : str or dict{str: str}
+        Codec of the file or codecs of the columns
+        (see cache_codecs, DEFAULT_CODEC if None).
+    """
+    names, arrays = data
+    codecs = cache_codecs.resolve(codec, names)
+    compressors = [cache_codecs.get_codec(name)[0] for name in codecs]
+    rows = len(arrays[0]) if arrays else 0
+    zone_columns = [i for i, array in enumerate(arrays) if array.dtype.kind in "iufM"]
+    blocks = []
+    zones = {names[i]: ([], []) for i in zone_columns}
+    offset = len(MAGIC)
+    f.write(MAGIC)
+    for start in range(0, rows, block_rows):
+        block = [array[start:start + block_rows] for array in arrays]
+        lengths = []
+        for compress, segment in zip(compressors, block):
+            content = compress(pickle.dumps(segment, protocol=pickle.HIGHEST_PROTOCOL))
+            f.write(content)
+            lengths.append(len(content))
+        blocks.append((offset, lengths, start, len(block[0])))
+        offset += sum(lengths)
+        for i in zone_columns:
+            low, high = zone(block[i])
+            zones[names[i]][0].append(low)
+            zones[names[i]][1].append(high)
+    footer = pickle.dumps({"names": list(names),
+                           "dtypes": [array.dtype.str for array in arrays],
+                           "codecs": codecs,
+                           "rows": rows,
+                           "blocks": blocks,
+                           "zones": {name: (numpy.array(mins, dtype=arrays[names.index(name)].dtype),
+                                            numpy.array(maxs, dtype=arrays[names.index(name)].dtype))
+                                     for name, (mins, maxs) in zones.items()}},
+                          protocol=pickle.HIGHEST_PROTOCOL)
+    f.write(footer)
+    f.write(struct.pack("<Q", len(footer)))
+
+
+def read_footer(f):
+    """
+    Read footer of the block store
+
+    Parameters
+    ----------
+    f : file object
+        Binary file opened for reading.
+
+    Returns
+    -------
+    footer : dict
+        names, dtypes, rows, blocks, zones
+    """
+    f.seek(-8, 2)
+    size = struct.unpack("<Q", f.read(8))[0]
+    f.seek(-8 - size, 2)
+    return pickle.loads(f.read(size))
+
+
+def read_block(f, footer, index, positions):
+    """
+    Read and decompress columns of one block
+
+    Parameters
+    ----------
+    f : file object
+        Binary file opened for reading.
+    footer : dict
+    index : int
+        Block number.
+    positions : list[int]
+        Column positions to read.
+
+    Returns
+    -------
+    columns : dict{int: np.ndarray}
+        Column position -> block segment
+    """
+    offset, lengths, _, _ = footer["blocks"][index]
+    if "codecs" not in footer:
+        # Version 1: one gzip pickle of all columns
+        f.seek(offset)
+        block = pickle.loads(gzip.decompress(f.read(lengths)))
+        return {i: block[i] for i in positions}
+    starts = numpy.concatenate(([0], numpy.cumsum(lengths))) + offset
+    columns = {}
+    for i in sorted(set(positions)):
+        f.seek(int(starts[i]))
+        content = cache_codecs.decompress(footer["codecs"][i], f.read(lengths[i]))
+        columns[i] = pickle.loads(content)
+    return columns
+
+
+def select_blocks(footer, where):
+    """
+    Select blocks which can contain rows matching the ranges (zone maps),
+    blocks with missing zone (all values NaN/NaT) are always selected
+
+    Parameters
+    ----------
+    footer : dict
+    where : dict{str: (low, high)}
+        Inclusive ranges, None means open bound.
+
+    Returns
+    -------
+    blocks : np.ndarray[bool]
+        Mask of the blocks to read
+    """
+    selected = numpy.ones(len(footer["blocks"]), dtype=bool)
+    for column, (low, high) in (where or {}).items():
+        mins, maxs = footer["zones"][column]
+        unknown = missing(mins) | missing(maxs)
+        with numpy.errstate(invalid="ignore"):
+            if low is not None:
+                selected &= unknown | (maxs >= numpy.asarray(low).astype(maxs.dtype))
+            if high is not None:
+                selected &= unknown | (mins <= numpy.asarray(high).astype(mins.dtype))
+    return selected
+
+
+def read(path, columns=None, where=None):
+    """
+    Read data object from block store, blocks outside of the ranges
+    are skipped without decompression, rows of the read blocks are filtered.
+
+    Parameters
+    ----------
+    path : str
+    columns : list[str]
+        Needed columns, all columns if None.
+    where : dict{str: (low, high)}
+        Inclusive ranges of date/numeric columns,
+        e.g. {'YYYY-MM-DD': ('2020-01-01', None)}.
+
+    Returns
+    -------
+    data : tuple(list[str], list[np.ndarray])
+    """
+    with open(path, "rb") as f:
+        footer = read_footer(f)
+        names = footer["names"]
+        columns = names if columns is None else list(columns)
+        positions = [names.index(column) for column in columns]
+        filters = [names.index(column) for column in (where or {})]
+        parts = []
+        for index in numpy.flatnonzero(select_blocks(footer, where)):
+            block = read_block(f, footer, index, positions + filters)
+            mask = numpy.ones(footer["blocks"][index][3], dtype=bool)
+            for column, (low, high) in (where or {}).items():
+                values = block[names.index(column)]
+                if low is not None:
+                    mask &= values >= numpy.asarray(low).astype(values.dtype)
+                if high is not None:
+                    mask &= values <= numpy.asarray(high).astype(values.dtype)
+            parts.append([block[i][mask] for i in positions])
+    if not parts:
+        return (columns, [numpy.empty(0, dtype=footer["dtypes"][i]) for i in positions])
+    return (columns, [numpy.concatenate([part[j] for part in parts]) for j in range(len(columns))])
+
+
+def read_rows(path, rows, columns=None):
+    """
+    Read rows by position, only blocks containing the rows are decompressed
+
+    Parameters
+    ----------
+    path : str
+    rows : array-like
+        Row positions in the file.
+    columns : list[str]
+        Needed columns, all columns if None.
+
+    Returns
+    -------
+    data : tuple(list[str], list[np.ndarray])
+        Rows in ascending position order
+    """
+    rows = numpy.sort(numpy.asarray(rows, dtype=numpy.int64))
+    with open(path, "rb") as f:
+        footer = read_footer(f)
+        names = footer["names"]
+        columns = names if columns is None else list(columns)
+        positions = [names.index(column) for column in columns]
+        starts = numpy.array([start for _, _, start, _ in footer["blocks"]], dtype=numpy.int64)
+        owners = numpy.searchsorted(starts, rows, side="right") - 1
+        parts = []
+        for b in numpy.unique(owners):
+            block = read_block(f, footer, b, positions)
+            local = rows[owners == b] - footer["blocks"][b][2]
+            parts.append([block[i][local] for i in positions])
+    if not parts:
+        return (columns, [numpy.empty(0, dtype=footer["dtypes"][i]) for i in positions])
+    return (columns, [numpy.concatenate([part[j] for part in parts]) for j in range(len(columns))])
+
+
+def benchmark(paths, codecs=None, repeat=3):
+    """
+    Compare codecs on the region caches: compressed size,
+    save and load throughput (of uncompressed column bytes)
+
+    Parameters
+    ----------
+    paths : list[str]
+        Region cache files (block store or gzip pickle).
+    codecs : list[str]
+        Codecs to compare, all available codecs if None.
+    repeat : int
+        Number of runs of each save/load, the best time is reported.
+    """
+    datasets = []
+    for path in paths:
+        if is_block_store(path):
+            datasets.append(read(path))
+        else:
+            with gzip.open(path, "rb") as cache:
+                datasets.append(pickle.load(cache))
+    raw = sum(array.nbytes for data in datasets for array in data[1])
+    rows = sum(len(data[1][0]) for data in datasets)
+    print(f'Files: {len(paths)}, rows: {rows}, raw size: {raw / 1048576:.1f} MB')
+    print(f'{"codec":<10}{"size [MB]":>12}{"ratio":>8}{"save [MB/s]":>14}{"load [MB/s]":>14}')
+    with tempfile.TemporaryDirectory() as folder:
+        target = os.path.join(folder, "cache.blk")
+        for codec in codecs or list(cache_codecs.CODECS):
+            save, load, size = float("inf"), float("inf"), 0
+            for _ in range(repeat):
+                size, elapsed = 0, 0.0
+                for data in datasets:
+                    start = time.perf_counter()
+                    with open(target, "wb") as f:
+                        write(f, data, codec=codec)
+                    elapsed += time.perf_counter() - start
+                    size += os.path.getsize(target)
+                save = min(save, elapsed)
+            for _ in range(repeat):
+                elapsed = 0.0
+                for data in datasets:
+                    with open(target, "wb") as f:
+                        write(f, data, codec=codec)
+                    start = time.perf_counter()
+                    read(target)
+                    elapsed += time.perf_counter() - start
+                load = min(load, elapsed)
+            print(f'{codec:<10}{size / 1048576:>12.2f}{raw / max(size, 1):>8.1f}'
+                  f'{raw / 1048576 / save:>14.1f}{raw / 1048576 / load:>14.1f}')
+
+
+if __name__ == "__main__":
+    """
+    Main:
+        benchmark - compare cache codecs on the region caches
+    """
+    parser = argparse.ArgumentParser(description='Region cache block store tools.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    bench = commands.add_parser('benchmark', help='Compare cache codecs on the region caches')
+    bench.add_argument('paths', nargs='*',
+                       help='Region cache files, data/data_*.pkl.gz if not set')
+    bench.add_argument('-c', '--codecs', nargs='+', choices=list(cache_codecs.CODECS),
+                       help='Codecs to compare, all available codecs if not set')
+    bench.add_argument('-n', '--repeat', type=int, default=3,
+                       help='Number of runs of each save/load')
+    parsed_args = parser.parse_args()
+    if parsed_args.command == 'benchmark':
+        benchmark(parsed_args.paths or sorted(glob.glob('data/data_*.pkl.gz')),
+                  parsed_args.codecs, parsed_args.repeat)
@@ -0,0 +1,126 @@
+"""
+| Project Implementation for IZV 2020/2021
+| Script cache_codecs.py
+| Date: 18.10.2026
+| Author: Mikhail Abramov
+| xabram00@stud.fit.vutbr.cz
+"""
+
+import os
+import bz2
+import lzma
+import zlib
+import functools
+
+"""
+Default codec of the cache files (IZV_CACHE_CODEC env. variable)
+"""
+DEFAULT_CODEC = os.environ.get("IZV_CACHE_CODEC", "gzip-6")
+
+
+def gzip_compress(data, level):
+    """
+    Compress data into gzip format (zlib with gzip header)
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def gzip_decompress(data):
+    """
+    Decompress gzip format (faster than gzip.decompress)
+    """
+    return zlib.decompress(data, 31)
+
+
+"""
+Available codecs: {NAME: (compress, decompress)}
+"""
+CODECS = {"none": (bytes, bytes)}
+for level in range(1, 10):
+    CODECS[f"gzip-{level}"] = (functools.partial(gzip_compress, level=level), gzip_decompress)
+CODECS["bz2"] = (bz2.compress, bz2.decompress)
+CODECS["lzma"] = (lzma.compress, lzma.decompress)
+
+# Optional fast codecs, registered only when installed
+try:
+    import lz4.frame
+    CODECS["lz4"] = (lz4.frame.compress, lz4.frame.decompress)
+except ImportError:
+    pass
+
+try:
+    import zstandard
+    for level in (1, 3, 9):
+        # Compressor objects are not thread-safe, one is created per call
+        CODECS[f"zstd-{level}"] = (
+            lambda data, level=level: zstandard.ZstdCompressor(level=level).compress(data),
+            lambda data: zstandard.ZstdDecompressor().decompress(data))
+except ImportError:
+    pass
+
+
+def get_codec(name):
+    """
+    Return compress and decompress functions of the codec
+
+    Parameters
+    ----------
+    name : str
+        Codec name ('none', 'gzip-1' .. 'gzip-9', 'bz2', 'lzma', 'lz4', 'zstd-N').
+
+    Returns
+    -------
+    compress, decompress : function(bytes) -> bytes
+
+    Raises
+    ------
+    ValueError
+        If the codec is unknown or its package is not installed
+    """
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise ValueError(f"ERROR: cache codec {name} is not available "
+                         f"(available: {', '.join(CODECS)})")
+
+
+def compress(name, data):
+    """
+    Compress bytes by the codec
+    """
+    return get_codec(name)[0](data)
+
+
+def decompress(name, data):
+    """
+    Decompress bytes by the codec
+    """
+    return get_codec(name)[1](data)
+
+
+def resolve(codec, names):
+    """
+    Codec of each column
+
+    Parameters
+    ----------
+    codec : str or dict{str: str}
+        Codec of the file or codecs of the columns,
+        columns missing in the dict use DEFAULT_CODEC.
+    names : list[str]
+        Column names.
+
+    Returns
+    -------
+    codecs : list[str]
+    """
+    if codec is None:
+        codec = DEFAULT_CODEC
+    if isinstance(codec, str):
+        get_codec(codec)
+        return [codec] * len(names)
+    codecs = [codec.get(name, DEFAULT_CODEC) for name in names]
+    for name in set(codecs):
+        get_codec(name)
+    return codecs
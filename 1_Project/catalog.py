@@ -0,0 +1,405 @@
+"""
+| Project Implementation for IZV 2020/2021
+| Script catalog.py
+| Date: 18.10.2026
+| Author: Mikhail Abramov
+| xabram00@stud.fit.vutbr.cz
+"""
+
+import os
+import re
+import json
+import time
+import threading
+import requests
+
+from datetime import datetime
+from storage import atomic_write
+from collections import namedtuple
+from html.parser import HTMLParser
+from email.utils import parsedate_to_datetime
+
+"""
+One archive in the catalog:
+    name     - archive file name (datagis-rok-2019.zip, datagis-09-2020.zip)
+    url      - absolute url of the archive
+    year     - statistics year
+    month    - month of the rolling archive, 12 for yearly archives
+    yearly   - True for the full year archive
+    size     - size in bytes or None if unknown
+    modified - last modification date (ISO string) or None if unknown
+"""
+Archive = namedtuple("Archive", "name url year month yearly size modified")
+
+"""
+Archive file names patterns
+"""
+YEARLY_PATTERN = re.compile(r'datagis-?(?:rok-)?(\d{4})\.zip')
+MONTHLY_PATTERN = re.compile(r'datagis-(\d{1,2})-(\d{4})\.zip')
+
+"""
+Listing row patterns: date (2020-11-03 10:15 / 03-Nov-2020 10:15) and size (1.2M / 1234)
+"""
+DATE_PATTERN = re.compile(r'(\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}|\d{2}-\w{3}-\d{4} \d{2}:\d{2})')
+SIZE_PATTERN = re.compile(r'(?<![\w:.-])(\d+(?:\.\d+)?)\s*([KMG]?)B?(?![\w:-])')
+SIZE_UNITS = {"": 1, "K": 1024, "M": 1048576, "G": 1073741824}
+
+"""
+Seconds for which the refreshed catalog is reused without asking the server again
+"""
+REFRESH_INTERVAL = 600
+
+
+class ArchiveLinkParser(HTMLParser):
+    """
+    Lightweight link extractor for the archives listing.
+    Collects every link to a ZIP archive together with the text
+    following the link (date and size columns of the listing row).
+
+    Attributes
+    ----------
+    links : list[list[str, str]]
+        List of [href, text after the link] pairs
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.links = []
+
+    def handle_starttag(self, tag, attrs):
+        """
+        Register new ZIP link, zip links can be placed into
+        href or into onclick="download('...')" attributes.
+        """
+        for _, value in attrs:
+            if value and '.zip' in value:
+                match = re.search(r"([\w./-]+\.zip)", value)
+                if match:
+                    self.links.append([match.group(1), ""])
+                    return
+
+    def handle_data(self, data):
+        """
+        Append text to the last registered link
+        """
+        if self.links:
+            self.links[-1][1] += data
+
+
+class ArchiveCatalog:
+    """
+    A class used to:
+        - parse the archives listing once;
+        - build structured catalog of yearly and monthly archives;
+        - select newest archive per year;
+        - cache the catalog with conditional GET (ETag/Last-Modified).
+
+    Attributes
+    ----------
+    url : str
+        Address of the archives listing.
+    folder : str
+        Folder where the catalog cache is stored.
+    catalog_filename : str
+        Name of the catalog cache file in the folder.
+    archives : list[Archive]
+        All archives found in the listing.
+    refreshed : float
+        time.monotonic() of the last refresh, None before the first one.
+
+    Methods
+    -------
+    refresh():
+        Load the listing (or reuse cache on 304) and rebuild the catalog
+    recent(max_age=REFRESH_INTERVAL):
+        Catalog refreshed at most max_age seconds ago (one request per window)
+    latest():
+        Newest archive for each year
+    probe_latest_month(year):
+        Binary search of the newest monthly archive with HEAD requests
+    """
+
+    def __init__(self, url, folder, catalog_filename="catalog.json", session=None):
+        """
+        Parameters
+        ----------
+        url : str
+            Address of the archives listing.
+        folder : str
+            Folder where the catalog cache is stored.
+        catalog_filename : str
+            Name of the catalog cache file in the folder.
+        session : requests.Session
+            Optional session to reuse connections.
+        """
+        self.url = url if url.endswith('/') else f"{url}/"
+        self.folder = folder
+        self.catalog_filename = catalog_filename
+        self.session = session or requests.session()
+        self.archives = []
+        self.etag = None
+        self.last_modified = None
+        self.refreshed = None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        """
+        Catalog cache file path
+        """
+        return os.path.join(self.folder, self.catalog_filename)
+
+    def load(self):
+        """
+        Load catalog from the cache file
+
+        Returns
+        -------
+        bool
+            True if the cache file was loaded
+        """
+        try:
+            with open(self.path, "r") as cache:
+                content = json.load(cache)
+        except (OSError, ValueError):
+            return False
+        self.etag = content.get("etag")
+        self.last_modified = content.get("last_modified")
+        self.archives = [Archive(**archive) for archive in content.get("archives", [])]
+        return True
+
+    def save(self):
+        """
+        Save catalog into the cache file
+        """
+        with atomic_write(self.path, "w") as cache:
+            json.dump({"url": self.url,
+                       "etag": self.etag,
+                       "last_modified": self.last_modified,
+                       "archives": [archive._asdict() for archive in self.archives]},
+                      cache, indent=1)
+
+    def refresh(self, headers=None):
+        """
+        Load the listing with conditional GET and rebuild the catalog.
+        If server answers 304 or is not reachable, cached catalog is used.
+
+        Parameters
+        ----------
+        headers : dict
+            Additional request headers
+
+        Returns
+        -------
+        archives : list[Archive]
+            All archives found in the listing
+
+        Raises
+        ------
+        OSError
+            If the listing is not reachable and there is no cached catalog
+        """
+        cached = self.load()
+        request_headers = dict(headers or {})
+        if cached:
+            if self.etag:
+                request_headers["If-None-Match"] = self.etag
+            if self.last_modified:
+                request_headers["If-Modified-Since"] = self.last_modified
+
+        try:
+            r = self.session.get(url=self.url, headers=request_headers, timeout=30)
+        except requests.RequestException as e:
+            if cached:
+                print(f"WARNING: {self.url} is not reachable, using cached catalog")
+                self.refreshed = time.monotonic()
+                return self.archives
+            raise OSError(f"ERROR: {self.url} is not reachable: {e}")
+
+        if r.status_code == requests.codes.not_modified and cached:
+            print(f"Catalog is up to date: {self.path}")
+            self.refreshed = time.monotonic()
+            return self.archives
+        if r.status_code != requests.codes.ok:
+            if cached:
+                print(f"WARNING: {self.url} returned {r.status_code}, using cached catalog")
+                self.refreshed = time.monotonic()
+                return self.archives
+            raise OSError(f"ERROR: {self.url} returned {r.status_code}")
+
+        self.etag = r.headers.get("ETag")
+        self.last_modified = r.headers.get("Last-Modified")
+        self.archives = self.parse(r.text)
+        # Listing without current year archives -> probe monthly archives directly
+        year = datetime.now().year
+        if not any(archive.year == year for archive in self.archives):
+            archive = self.probe_latest_month(year)
+            if archive is not None:
+                self.archives.append(archive)
+        self.save()
+        self.refreshed = time.monotonic()
+        print(f"Catalog updated: {len(self.archives)} archives in {self.path}")
+        return self.archives
+
+    def recent(self, headers=None, max_age=REFRESH_INTERVAL):
+        """
+        Catalog refreshed at most max_age seconds ago: only the first call
+        of the window sends the conditional GET, concurrent callers wait for it
+        and later calls reuse its result.
+
+        Parameters
+        ----------
+        headers : dict
+            Additional request headers
+        max_age : float
+            Seconds for which the last refresh is reused, 0 always refreshes.
+
+        Returns
+        -------
+        archives : list[Archive]
+            All archives found in the listing
+
+        Raises
+        ------
+        OSError
+            If the listing is not reachable and there is no cached catalog
+        """
+        with self._lock:
+            if self.refreshed is None or time.monotonic() - self.refreshed >= max_age:
+                self.refresh(headers)
+            return self.archives
+
+    def parse(self, html):
+        """
+        Parse the listing once and build the catalog
+
+        Parameters
+        ----------
+        html : str
+            Listing content
+
+        Returns
+        -------
+        archives : list[Archive]
+            Archives sorted by year and month
+        """
+        parser = ArchiveLinkParser()
+        parser.feed(html)
+        archives = {}
+        for href, text in parser.links:
+            name = href.split('/')[-1]
+            archive = self.make_archive(name, requests.compat.urljoin(self.url, href), text)
+            if archive is not None:
+                archives[name] = archive
+        return sorted(archives.values(), key=lambda a: (a.year, a.month, a.yearly, a.name))
+
+    def make_archive(self, name, url, text=""):
+        """
+        Create catalog entry from archive name and listing row text
+
+        Returns
+        -------
+        archive : Archive
+            Catalog entry or None if name is not a statistics archive
+        """
+        size = None
+        modified = None
+        date = DATE_PATTERN.search(text)
+        if date:
+            modified = date.group(1)
+            text = text.replace(modified, " ")
+        amount = SIZE_PATTERN.search(text)
+        if amount:
+            size = int(float(amount.group(1)) * SIZE_UNITS[amount.group(2)])
+
+        match = MONTHLY_PATTERN.fullmatch(name)
+        if match:
+            month = int(match.group(1))
+            if not 1 <= month <= 12:
+                return None
+            return Archive(name, url, int(match.group(2)), month, False, size, modified)
+        match = YEARLY_PATTERN.fullmatch(name)
+        if match:
+            return Archive(name, url, int(match.group(1)), 12, True, size, modified)
+        return None
+
+    def latest(self, first_year=None):
+        """
+        Select the newest archive per year deterministically:
+        yearly archive first, otherwise monthly archive with the highest month.
+
+        Parameters
+        ----------
+        first_year : int
+            Ignore archives older than this year
+
+        Returns
+        -------
+        archives : list[Archive]
+            Newest archive for each year sorted by year
+        """
+        newest = {}
+        for archive in self.archives:
+            if first_year is not None and archive.year < first_year:
+                continue
+            key = (archive.yearly, archive.month, archive.name)
+            current = newest.get(archive.year)
+            if current is None or key > (current.yearly, current.month, current.name):
+                newest[archive.year] = archive
+        return [newest[year] for year in sorted(newest)]
+
+    def head(self, name):
+        """
+        HEAD request for the archive with defined name
+
+        Returns
+        -------
+        archive : Archive
+            Catalog entry with size and date or None if archive does not exist
+        """
+        url = requests.compat.urljoin(self.url, name)
+        try:
+            r = self.session.head(url, allow_redirects=True, timeout=30)
+        except requests.RequestException:
+            return None
+        if r.status_code != requests.codes.ok:
+            return None
+        archive = self.make_archive(name, url)
+        if archive is None:
+            return None
+        size = r.headers.get("Content-Length")
+        modified = r.headers.get("Last-Modified")
+        if modified:
+            try:
+                modified = parsedate_to_datetime(modified).strftime("%Y-%m-%d %H:%M")
+            except (TypeError, ValueError):
+                pass
+        return archive._replace(size=int(size) if size else None, modified=modified)
+
+    def probe_latest_month(self, year):
+        """
+        Binary search of the newest monthly archive of the year with HEAD requests.
+        Monthly archives are published in order, so if month M exists,
+        all months before M exist too (at most 4 requests).
+
+        Parameters
+        ----------
+        year : int
+            Statistics year
+
+        Returns
+        -------
+        archive : Archive
+            Newest monthly archive or None if there is no archive for the year
+        """
+        low, high = 1, 12
+        found = None
+        while low <= high:
+            month = (low + high) // 2
+            archive = self.head(f"datagis-{month:02d}-{year}.zip")
+            if archive is None:
+                high = month - 1
+            else:
+                found = archive
+                low = month + 1
+        return found
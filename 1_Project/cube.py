@@ -0,0 +1,237 @@
+"""
+| Project Implementation for IZV 2020/2021
+| Script cube.py
+| Date: 18.10.2026
+| Author: Mikhail Abramov
+| xabram00@stud.fit.vutbr.cz
+"""
+
+import numpy
+import pandas as pd
+
+from aggregate import aggregate, encode
+from download import columns_codes
+from storage import atomic_write
+
+"""
+Cube dimensions (short codes), month is derived from p2a
+"""
+DIMENSIONS = ["region", "month", "p12", "p16", "p11", "p5a"]
+
+"""
+Cube measures, count is the number of accidents
+"""
+MEASURES = ["count", "p13a", "p13b", "p13c", "p53"]
+
+
+class AccidentCube:
+    """
+    Materialized accident data cube: counts and sums of p13a, p13b, p13c, p53
+    over region × month × p12 × p16 × p11 × p5a.
+    Only observed cells are stored (sparse coordinates),
+    every dimension keeps its own small labels table.
+
+    Attributes
+    ----------
+    labels : dict{str: np.ndarray}
+        Distinct values of each dimension.
+    codes : dict{str: np.ndarray}
+        Label code of each cell for each dimension.
+    measures : dict{str: np.ndarray}
+        Measure value of each cell.
+
+    Methods
+    -------
+    from_data(data):
+        Build cube from DataDownloader data object
+    from_dataframe(df):
+        Build cube from accidents dataframe
+    save(path), load(path):
+        Persist cube into npz file
+    slice(**conditions):
+        Cube with cells matching dimension conditions
+    rollup(by, measures):
+        Aggregate cube to the defined dimensions
+    """
+
+    def __init__(self, labels, codes, measures):
+        self.labels = labels
+        self.codes = codes
+        self.measures = measures
+
+    def __len__(self):
+        return len(self.measures["count"])
+
+    @classmethod
+    def build(cls, columns):
+        """
+        Build cube from row-level columns
+
+        Parameters
+        ----------
+        columns : dict{str: array-like}
+            Row-level columns by short code (region, p2a, p11, p12,
+            p13a, p13b, p13c, p16, p53, p5a).
+
+        Returns
+        -------
+        cube : AccidentCube
+        """
+        dates = numpy.asarray(columns["p2a"], dtype="datetime64[D]")
+        # Months are grouped as integers (months since 1970-01)
+        keys = {"month": dates.astype("datetime64[M]").astype(numpy.int64)}
+        for dim in DIMENSIONS:
+            if dim != "month":
+                keys[dim] = numpy.asarray(columns[dim])
+        # Parse fallback value -1 is not counted into sums
+        sums = {m: numpy.clip(numpy.asarray(columns[m], dtype=float), 0, None)
+                for m in MEASURES if m != "count"}
+        cells, size, results = aggregate([keys[dim] for dim in DIMENSIONS], sums)
+
+        labels, codes = {}, {}
+        for dim, values in zip(DIMENSIONS, cells):
+            code, label = encode(numpy.asarray(values))
+            codes[dim] = code.astype(numpy.uint16)
+            labels[dim] = numpy.asarray(label)
+            if labels[dim].dtype == object:
+                labels[dim] = labels[dim].astype(str)
+        labels["month"] = labels["month"].astype("datetime64[M]")
+        measures = {"count": size.astype(numpy.int64)}
+        for m in MEASURES[1:]:
+            measures[m] = results[m].round().astype(numpy.int64)
+        return cls(labels, codes, measures)
+
+    @classmethod
+    def from_data(cls, data):
+        """
+        Build cube from DataDownloader.get_list data object
+
+        Parameters
+        ----------
+        data : tuple(list[str], list[np.ndarray])
+
+        Returns
+        -------
+        cube : AccidentCube
+        """
+        codes = [columns_codes[i] for i in range(len(data[0]))]
+        return cls.build(dict(zip(codes, data[1])))
+
+    @classmethod
+    def from_dataframe(cls, df):
+        """
+        Build cube from accidents dataframe (accidents.pkl.gz layout
+        or get_dataframe result with date column)
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+
+        Returns
+        -------
+        cube : AccidentCube
+        """
+        columns = {c: df[c].fillna(-1).to_numpy() for c in DIMENSIONS + MEASURES
+                   if c in df and c not in ("month", "count")}
+        columns["region"] = df["region"].astype(str).to_numpy()
+        date = df["date"] if "date" in df else df["p2a"]
+        columns["p2a"] = pd.to_datetime(date, errors="coerce").to_numpy().astype("datetime64[D]")
+        return cls.build(columns)
+
+    def save(self, path):
+        """
+        Atomically save cube into npz file
+
+        Parameters
+        ----------
+        path : str
+        """
+        arrays = {}
+        for dim in DIMENSIONS:
+            arrays[f"labels_{dim}"] = self.labels[dim]
+            arrays[f"codes_{dim}"] = self.codes[dim]
+        for m in MEASURES:
+            arrays[f"measure_{m}"] = self.measures[m]
+        with atomic_write(path) as f:
+            numpy.savez_compressed(f, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load cube from npz file
+
+        Parameters
+        ----------
+        path : str
+
+        Returns
+        -------
+        cube : AccidentCube
+        """
+        with numpy.load(path, allow_pickle=False) as f:
+            return cls({dim: f[f"labels_{dim}"] for dim in DIMENSIONS},
+                       {dim: f[f"codes_{dim}"] for dim in DIMENSIONS},
+                       {m: f[f"measure_{m}"] for m in MEASURES})
+
+    def values(self, dim):
+        """
+        Value of the dimension for each cell, 'year' is derived from month
+
+        Parameters
+        ----------
+        dim : str
+
+        Returns
+        -------
+        values : np.ndarray
+        """
+        if dim == "year":
+            return self.labels["month"].astype("datetime64[Y]")[self.codes["month"]]
+        return self.labels[dim][self.codes[dim]]
+
+    def slice(self, **conditions):
+        """
+        Select cells by dimension conditions, condition is a list of values
+        or a function returning boolean mask for the dimension labels, e.g.:
+            cube.slice(region=['JHM', 'PHA'],
+                       month=lambda m: m >= numpy.datetime64('2020-01'))
+
+        Returns
+        -------
+        cube : AccidentCube
+            Cube with matching cells
+        """
+        mask = numpy.ones(len(self), dtype=bool)
+        for dim, condition in conditions.items():
+            labels = self.labels[dim]
+            if callable(condition):
+                selected = numpy.asarray(condition(labels), dtype=bool)
+            else:
+                selected = numpy.isin(labels, numpy.asarray(list(condition), dtype=labels.dtype))
+            mask &= selected[self.codes[dim]]
+        return AccidentCube(self.labels,
+                            {dim: codes[mask] for dim, codes in self.codes.items()},
+                            {m: values[mask] for m, values in self.measures.items()})
+
+    def rollup(self, by, measures=MEASURES):
+        """
+        Aggregate cube to the defined dimensions
+
+        Parameters
+        ----------
+        by : list[str]
+            Dimensions (DIMENSIONS or 'year').
+        measures : list[str]
+            Measures to sum.
+
+        Returns
+        -------
+        df : pd.DataFrame
+            Dimensions columns followed by measures columns
+        """
+        labels, _, results = aggregate([self.values(dim) for dim in by],
+                                       {m: self.measures[m] for m in measures})
+        df = pd.DataFrame({dim: label for dim, label in zip(by, labels)})
+        for m in measures:
+            df[m] = results[m].round().astype(numpy.int64)
+        return df
@@ -7,17 +7,25 @@
 """
 
 import os
-import re
 import gzip
 import glob
 import numpy
 import pickle
 import zipfile
+import asyncio
 import requests 
+import functools
+import threading
 
-from bs4 import BeautifulSoup
-from datetime import datetime
-from datetime import date
+from concurrent.futures import Future
+
+from catalog import ArchiveCatalog
+import block_store
+from pipeline import pipeline, QUEUE_SIZE
+from profiling import span
+from id_index import IdIndex, deduplicate
+from region_cache import RegionCache
+from storage import Manifest, HashingWriter, atomic_write, file_checksum, tag
 
 """
 Start statistics year
@@ -87,6 +95,18 @@ columns_names_dtypes = {
     64: ("Accident area","i1")
 }
 
+"""
+Short column codes of the accidents dataframe: {№:CODE}
+"""
+columns_codes = dict(enumerate([
+    "region", "p1", "p36", "p37", "p2a", "weekday(p2a)", "p2b", "p6", "p7",
+    "p8", "p9", "p10", "p11", "p12", "p13a", "p13b", "p13c", "p14", "p15",
+    "p16", "p17", "p18", "p19", "p20", "p21", "p22", "p23", "p24", "p27",
+    "p28", "p34", "p35", "p39", "p44", "p45a", "p47", "p48a", "p49", "p50a",
+    "p50b", "p51", "p52", "p53", "p55a", "p57", "p58", "a", "b", "d", "e",
+    "f", "g", "h", "i", "j", "k", "l", "n", "o", "p", "q", "r", "s", "t",
+    "p5a"]))
+
 """
 Region's csv filenames: {REGION, FILE.csv)}
 """
@@ -123,6 +143,32 @@ headers = {
     "user-agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_1) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/78.0.3904.108 Safari/537.36",
 }
 
+def filter_rows(data, where):
+    """
+    Filter data object rows by inclusive ranges of columns
+
+    Parameters
+    ----------
+    data : tuple(list[str], list[np.ndarray])
+    where : dict{str: (low, high)}
+        Inclusive ranges, None means open bound.
+
+    Returns
+    -------
+    data : tuple(list[str], list[np.ndarray])
+    """
+    if not where:
+        return data
+    mask = numpy.ones(len(data[1][0]), dtype=bool)
+    for column, (low, high) in where.items():
+        values = data[1][data[0].index(column)]
+        if low is not None:
+            mask &= values >= numpy.asarray(low).astype(values.dtype)
+        if high is not None:
+            mask &= values <= numpy.asarray(high).astype(values.dtype)
+    return (data[0], [array[mask] for array in data[1]])
+
+
 class DataDownloader:
     """
     A class used to:
@@ -144,15 +190,45 @@ class DataDownloader:
         A name of the file in the specified folder,
         where the processed data from the get_list method will be stored
         and from where the data will be taken for further processing.
-    regions_cache : dictionary - {REGION:statistics objects}
-        Dictionary to store processed data in program
+    regions_cache : RegionCache
+        Thread-safe LRU cache with memory budget to store processed data in program,
+        shared by all DataDownloader objects by default
+    codec : str or dict{str: str}
+        Compression codec of the cache files (per file or per column)
+    catalog : ArchiveCatalog
+        Catalog of available yearly and monthly archives
+    manifest : Manifest
+        Checksums of downloaded archives and saved caches
 
     Methods
     -------
     download_data():
-        Creates folder, downloads data archives from web
+        Creates folder, downloads the newest data archives from web
+    download_archives():
+        Generator of archives, yields each archive as soon as it is downloaded
+    archives_missing():
+        Check if all archives selected by the catalog are downloaded
+    archives_files():
+        Downloaded archives which pass checksum verification
+    archive_recency(zip_file):
+        Sort key of the archive by covered period
+    save_cache(region, data):
+        Atomically save region cache file and record its checksum
+    read_cache(region):
+        Read verified region cache file
+    load_region(region):
+        Load region from cache or parse it under inter-process lock
+    get_id_index(region):
+        Load or build sorted ID index of the region cache
+    find_accident(accident_id, regions=None, columns=None):
+        Point lookup of the accident by ID
     parse_region_data(region):
         Process data arcives, generate data objects for defined region
+        (rows with the same ID are kept only from the newest archive)
+    parse_table(zf, file_name):
+        Parse one region csv file of the archive
+    merge_region(region, tables):
+        Merge and de-duplicate region tables from all archives
     parse_i(element):
         Parse element value like Integer object
     parse_f(element):
@@ -161,16 +237,38 @@ class DataDownloader:
         Parse element value like time column with Unicode object
     parse_u_m(element):
         Parse element value like unicode and data objects
-    get_list(regions=None):
+    build_regions(regions, queue_size=QUEUE_SIZE):
+        Concurrent download -> parse -> cache pipeline for cold regions
+    load_shared(region):
+        Single-flight loading of region into the program cache
+    get_list(regions=None, columns=None, years=None):
         Check program cache and cache files for defined regions.
         Leads the proccess of datagathering
+    collect(regions=None, columns=None, years=None):
+        Collect regions data objects for get_list
+    get_list_async(regions=None, columns=None, executor=None):
+        Asyncio wrapper of get_list
+    export_parquet(path=None, regions=None):
+        Export dataset into Parquet partitioned by region and year
+    derived_cache(filename, build, load):
+        Load or build structure derived from all region caches
+    get_cube(cube_filename="cube.npz"):
+        Load or build materialized accident data cube
+    get_bitmap_index(index_filename="bitmaps.npz"):
+        Load or build bitmap indexes of low-cardinality columns
     """
 
+    # Regions being loaded right now: {(namespace, region): Future}
+    _loading = {}
+    _loading_lock = threading.Lock()
+
     def __init__(
         self,
         url="https://ehw.fit.vutbr.cz/izv/",
         folder="data",
         cache_filename="data_{}.pkl.gz",
+        regions_cache=None,
+        codec=None,
     ):
         """
         Parameters
@@ -186,31 +284,53 @@ class DataDownloader:
             A name of the file in the specified folder,
             where the processed data from the get_list method will be stored
             and from where the data will be taken for further processing.
+        regions_cache : RegionCache
+            In-process cache of loaded regions.
+            The default value is the process-wide shared cache.
+        codec : str or dict{str: str}
+            Compression codec of the cache files or codecs of the columns
+            (see cache_codecs), readers detect codecs from the file footer.
+            The default value is IZV_CACHE_CODEC env. variable or 'gzip-6'.
         """
         self.url = url
         self.folder = folder
         self.cache_filename = cache_filename
-        self.regions_cache = {
-            "PHA": None,
-            "STC": None,
-            "JHC": None,
-            "PLK": None,
-            "ULK": None,
-            "HKK": None,
-            "JHM": None,
-            "MSK": None,
-            "OLK": None,
-            "ZLK": None,
-            "VYS": None,
-            "PAK": None,
-            "LBK": None,
-            "KVK": None,
-        }
+        self.catalog = ArchiveCatalog(url, folder)
+        self.manifest = Manifest(folder)
+        self.regions_cache = regions_cache or RegionCache.shared()
+        self.codec = codec
+        self.cache_namespace = f"{os.path.abspath(folder)}/{cache_filename}"
 
 
     def download_data(self):
         """
-        Creates folder, downloads data archives from web
+        Creates folder, refreshes archives catalog and downloads
+        the newest archive for each year from web.
+        Archives which are already downloaded with the same size are kept,
+        outdated archives are deleted.
+
+        Raises
+        ------
+            OSError
+                If it is impossible to create folder
+        """
+        with span("download_data"):
+            for _ in self.download_archives():
+                pass
+
+
+    def download_archives(self):
+        """
+        Generator version of download_data, yields each selected archive
+        as soon as it is downloaded (or verified), so the archive
+        can be parsed while the next ones are downloading.
+
+        Yields
+        ------
+        file_name : str
+            Archive path or None if download failed
+        remaining : int
+            Number of archives which will follow
 
         Raises
         ------
@@ -221,55 +341,282 @@ class DataDownloader:
         # Try to create folder.
         if not os.path.isdir(self.folder):
             try:
-                os.makedirs(self.folder)
+                os.makedirs(self.folder, exist_ok=True)
             except OSError:
                 raise OSError(f"Creation of the directory {self.folder} failed")
             else:
                 print (f"Successfully created the directory {self.folder}")
 
-        # Prepare folder for new zips.
-        if os.listdir(self.folder):
-            print(f"Clean-up {self.folder}")
+        # Only one process downloads archives into the folder at time
+        with self.manifest.lock("download"):
+            # Process url -> catalog with the newest archive per year.
+            print(f"Processing: {self.url}")
+            self.catalog.recent(headers, max_age=0)
+            archives = self.catalog.latest(FIRST_YEAR)
+            if archives:
+                last = archives[-1]
+                print(f"Last update: {last.name} ({last.modified or 'unknown date'})")
+            needed = {archive.name for archive in archives}
+
+            # Prepare folder for new zips.
             for f in glob.glob(f'{self.folder}/*.zip'):
-                print(f"...Deleting - {self.folder}/{f}")
-                os.remove(f)
-
-        # Process url.
-        print(f"Processing: {self.url}")
-        pattern = re.compile(rf'''(datagis-rok-.{{5}}zip)|
-                                  (.datagis.{{5}}zip)|
-                                  ({datetime.now().month-1}-{datetime.now().year}\.zip)''')
-        s = requests.session().get(url=self.url, headers=headers)
-        test_soup = BeautifulSoup(s.content,
-                                 "html.parser").find_all("a",
-                                                         href=rf'({datetime.now().month-1}-{datetime.now().year}\.zip)')
-
-        # Detect last needed file for example september or october of the current year.
-        if not test_soup:
-            print(f"Last update: {datetime.now().month-2}-{datetime.now().year}")
-            pattern = re.compile(
-                rf'(datagis-rok-.{{5}}zip)|(datagis.{{5}}zip)|({datetime.now().month-2}-{datetime.now().year}\.zip)')
-        else:
-            print(f"Last update: {datetime.now().month-1}-{datetime.now().year}")
-            pattern = re.compile(
-                rf'(datagis-rok-.{{5}}zip)|(datagis.{{5}}zip)|({datetime.now().month-1}-{datetime.now().year}\.zip)')          
-        soup = BeautifulSoup(s.content, "html.parser").find_all("a", href=pattern)
-        
-        # For each detected archive -> download it.
-        for name in soup:
-            zip_url = f"{self.url}/{name['href']}"
-            file_name = f"{self.folder}/{zip_url.split('/')[-1]}"
-            r = requests.get(zip_url, stream=True)
-            if r.status_code == requests.codes.ok:
-                print(f"Downloading {zip_url} ({round(int(r.headers['content-length'])/1048576,2)}Mb) into {file_name}")
-                with open(file_name, "wb") as fd:
-                    for chunk in r.iter_content(chunk_size=1024):
-                        if chunk:
-                            fd.write(chunk)
-                    fd.close()
+                if os.path.basename(f) not in needed:
+                    print(f"...Deleting - {f}")
+                    os.remove(f)
+                    self.manifest.forget(os.path.basename(f))
+
+            # For each selected archive -> download it if it is missing, changed or corrupted.
+            for remaining, archive in reversed(list(enumerate(reversed(archives)))):
+                file_name = f"{self.folder}/{archive.name}"
+                entry = self.manifest.get(archive.name)
+                if (entry is not None and entry.get("archive_size") == archive.size
+                        and self.manifest.verify(archive.name)):
+                    print(f"...Up to date - {file_name}")
+                    yield file_name, remaining
+                    continue
+                r = self.catalog.session.get(archive.url, headers=headers, stream=True)
+                if r.status_code == requests.codes.ok:
+                    size = r.headers.get('content-length')
+                    size = f"{round(int(size)/1048576,2)}Mb" if size else "unknown size"
+                    print(f"Downloading {archive.url} ({size}) into {file_name}")
+                    with span("download_archive", archive=archive.name) as s, \
+                            atomic_write(file_name) as fd:
+                        writer = HashingWriter(fd)
+                        for chunk in r.iter_content(chunk_size=65536):
+                            if chunk:
+                                writer.write(chunk)
+                        s.bytes = writer.size
+                    self.manifest.record(archive.name, writer.hexdigest(), writer.size,
+                                         archive_size=archive.size,
+                                         modified=archive.modified)
+                    yield file_name, remaining
+                else:
+                    yield None, remaining
         print(f"Finished with: {self.url}")
 
 
+    def archives_missing(self):
+        """
+        Check if all archives selected by the catalog are downloaded,
+        the listing is requested at most once per catalog.REFRESH_INTERVAL
+
+        Returns
+        -------
+        bool
+            True if some archive is missing or catalog is empty
+        """
+        try:
+            self.catalog.recent(headers)
+        except OSError as e:
+            print(f"WARNING: {e}")
+            return not glob.glob(f"{self.folder}/*.zip")
+        archives = self.catalog.latest(FIRST_YEAR)
+        return (not archives or
+                any(self.manifest.get(archive.name) is None or
+                    not os.path.isfile(f"{self.folder}/{archive.name}") for archive in archives))
+
+
+    def archives_files(self):
+        """
+        Downloaded archives which pass checksum verification.
+        Corrupted archives are reported and skipped.
+
+        Returns
+        -------
+        files : list[str]
+            Sorted list of verified archive paths
+        """
+        files = []
+        for zip_file in sorted(glob.glob(f"{self.folder}/*.zip")):
+            if self.manifest.verify(os.path.basename(zip_file)):
+                files.append(zip_file)
+            else:
+                print(f"WARNING: {zip_file} failed checksum verification, skipped")
+        return files
+
+
+    def archive_recency(self, zip_file):
+        """
+        Sort key of the archive by covered period, the yearly archive
+        is newer than any monthly archive of the same year.
+
+        Parameters
+        ----------
+        zip_file : str
+            Archive path.
+
+        Returns
+        -------
+        key : tuple(int, int, bool)
+            (year, month, yearly), (0, 0, False) for unknown names
+        """
+        archive = self.catalog.make_archive(os.path.basename(zip_file), None)
+        if archive is None:
+            return (0, 0, False)
+        return (archive.year, archive.month, archive.yearly)
+
+
+    def save_cache(self, region, data):
+        """
+        Atomically save region data object into cache file (block store
+        with zone maps, compressed by the selected codec)
+        and record its checksum in the manifest.
+
+        Parameters
+        ----------
+        region : str
+            Region name.
+        data : tuple(list[str], list[np.ndarray])
+            Processed data object for defined region.
+        """
+        name = self.cache_filename.format(region)
+        print(f'\nSave dataset cache...{self.folder}/{name}')
+        with span("save_cache", region=region) as s, atomic_write(f'{self.folder}/{name}') as f:
+            writer = HashingWriter(f)
+            block_store.write(writer, data, codec=self.codec)
+            s.rows, s.bytes = len(data[1][0]), writer.size
+        self.manifest.record(name, writer.hexdigest(), writer.size, region=region)
+        IdIndex.build(data[1][data[0].index("ID")], writer.hexdigest()).save(
+            f'{self.folder}/{name}.ids.npz')
+        print('...Done')
+
+
+    def read_cache(self, region, columns = None, where = None):
+        """
+        Read region data object from the cache file if it passes
+        checksum verification. Block store caches skip blocks
+        outside of the defined ranges (zone maps).
+
+        Parameters
+        ----------
+        region : str
+            Region name.
+        columns : list[str]
+            Needed columns, all columns if None.
+        where : dict{str: (low, high)}
+            Inclusive ranges of date/numeric columns.
+
+        Returns
+        -------
+        data object : tuple(list[str], list[np.ndarray])
+            Cached data object or None if cache is missing or corrupted
+        """
+        name = self.cache_filename.format(region)
+        if not os.path.isfile(f'{self.folder}/{name}'):
+            return None
+        if not self.manifest.verify(name):
+            print(f'WARNING: {self.folder}/{name} failed checksum verification, rebuilding')
+            return None
+        print(f'\nRead dataset cache...{self.folder}/{name}')
+        with span("read_cache", region=region) as s:
+            if block_store.is_block_store(f'{self.folder}/{name}'):
+                data = block_store.read(f'{self.folder}/{name}', columns, where)
+            else:
+                # Cache saved by older version - single gzip pickle
+                with gzip.open(f'{self.folder}/{name}', 'rb') as cache:
+                    data = pickle.load(cache)
+                data = filter_rows(data, where)
+                if columns is not None:
+                    data = (list(columns), [data[1][data[0].index(c)] for c in columns])
+            s.rows, s.bytes = len(data[1][0]), os.path.getsize(f'{self.folder}/{name}')
+        print('...Done')
+        return data
+
+
+    def load_region(self, region):
+        """
+        Load region data object from the cache file or parse it from archives.
+        Region build is guarded by the file lock, so concurrent worker
+        processes wait for one build instead of repeating it.
+
+        Parameters
+        ----------
+        region : str
+            Region name.
+
+        Returns
+        -------
+        data object : tuple(list[str], list[np.ndarray])
+            Processed data object for defined region.
+        """
+        data = self.read_cache(region)
+        if data is not None:
+            return data
+        with self.manifest.lock(self.cache_filename.format(region)):
+            # Cache could be created by another process while waiting for the lock
+            data = self.read_cache(region)
+            if data is None:
+                data = block_store.sort_by(self.parse_region_data(region))
+                self.save_cache(region, data)
+        return data
+
+
+    def get_id_index(self, region):
+        """
+        Load sorted ID index of the region cache file ({cache}.ids.npz),
+        the index is rebuilt when the cache checksum changes.
+
+        Parameters
+        ----------
+        region : str
+            Region name.
+
+        Returns
+        -------
+        index : IdIndex
+            Row positions of the region cache by accident ID
+        """
+        name = self.cache_filename.format(region)
+        path = f'{self.folder}/{name}.ids.npz'
+        entry = self.manifest.get(name)
+        if entry is not None and os.path.isfile(path):
+            index = IdIndex.load(path)
+            if index.source == entry.get("sha256"):
+                return index
+        data = self.regions_cache.get(self.cache_namespace, region, ["ID"])
+        if data is None:
+            data = self.read_cache(region, ["ID"]) or self.load_shared(region)
+        entry = self.manifest.get(name) or {}
+        index = IdIndex.build(data[1][data[0].index("ID")], entry.get("sha256", ""))
+        if entry:
+            index.save(path)
+        return index
+
+
+    def find_accident(self, accident_id, regions = None, columns = None):
+        """
+        Point lookup of the accident by ID (binary search in the ID index
+        of each region), only the cache block with the row is read.
+
+        Parameters
+        ----------
+        accident_id : str
+            Accident ID (p1).
+        regions : list
+            list of regions to search, all regions if None
+        columns : list
+            list of column names to return, all columns if None
+
+        Returns
+        -------
+        data object : tuple(list[str], list[np.ndarray])
+            Row of the accident or None if the ID is not found
+        """
+        for region in (regions_files if regions is None else regions):
+            position = self.get_id_index(region).lookup(accident_id)[0]
+            if position < 0:
+                continue
+            data = self.regions_cache.get(self.cache_namespace, region, columns)
+            if data is not None:
+                return (data[0], [array[position:position + 1] for array in data[1]])
+            name = self.cache_filename.format(region)
+            if block_store.is_block_store(f'{self.folder}/{name}'):
+                return block_store.read_rows(f'{self.folder}/{name}', [position], columns)
+            data = self.read_cache(region, columns)
+            return (data[0], [array[position:position + 1] for array in data[1]])
+        return None
+
+
     def parse_region_data(self, region):
         """
         For defined region:
@@ -293,19 +640,46 @@ class DataDownloader:
         """
 
         file_name = regions_files.get(region)
-        df = None
-        columns_data = None
 
         # Check if provided region is supported
         if file_name == None:
             raise NotImplementedError(f"ERROR: {region} not found")
 
-        # Check the number of available archives in 2020 - 5 in 2021 - 6 and etc.   
-        if len(glob.glob(f"{self.folder}/*.zip")) != int(datetime.now().year)-FIRST_YEAR+1:
-            if int(datetime.now().month) != 1:
-                print("WARNING: Not enough data archives, need to update")
-                self.download_data()
+        # Check that the newest archive of each year is available
+        if self.archives_missing():
+            print("WARNING: Not enough data archives, need to update")
+            self.download_data()
+
+        # Read csv files from zips
+        print("\nParse tables:")
+        with span("parse_region_data", region=region) as s:
+            tables = []
+            for zip_file in self.archives_files():
+                with zipfile.ZipFile(zip_file) as zf:
+                    if file_name in zf.namelist():
+                        tables.append((self.archive_recency(zip_file), self.parse_table(zf, file_name)))
+                        print(f'...Parse table {file_name} ({region}) from {zip_file} with size rows/columns: {len(tables[-1][1])}/{len(tables[-1][1][0])}')
+            data = self.merge_region(region, tables)
+            s.rows = len(data[1][0])
+        return data
+
 
+    def parse_table(self, zf, file_name):
+        """
+        Parse one region csv file of the archive
+
+        Parameters
+        ------
+        zf : zipfile.ZipFile
+            Opened data archive.
+        file_name : str
+            Region csv file name.
+
+        Returns
+        -------
+        columns : list[np.ndarray]
+            Columns of the table (without region column)
+        """
         # prepare data converter dictionary and dtypes string for (numpy.loadtxt)
         convert = dict()
         dtypes = None
@@ -323,27 +697,48 @@ class DataDownloader:
             else:
                 convert[i] = lambda x: self.parse_u_m(x)
 
-        # Read csv files from zips
-        print("\nParse tables:")
-        for zip_file in glob.glob(f"{self.folder}/*.zip"):
-            zf = zipfile.ZipFile(zip_file)
-            for csv_file in zf.namelist():
-                if csv_file == file_name:
-                    df = numpy.loadtxt(zf.open(csv_file),
-                                            delimiter=";",
-                                            encoding="cp1250",
-                                            converters=convert,
-                                            dtype=dtypes,
-                                            unpack=True,
-                                            usecols=numpy.arange(0,64))
-                    if columns_data == None:
-                        columns_data = df
-                    else:
-                        for j in range(0,len(columns_data)):
-                            columns_data[j] = numpy.concatenate(
-                                (columns_data[j],df[j]), axis=0)
-                    print(f'...Parse table {file_name} ({region}) from {zip_file} with size rows/columns: {len(columns_data)}/{len(columns_data[0])}')
-        
+        with span("parse_table", file=f"{zf.filename}/{file_name}") as s:
+            table = list(numpy.loadtxt(zf.open(file_name),
+                                       delimiter=";",
+                                       encoding="cp1250",
+                                       converters=convert,
+                                       dtype=dtypes,
+                                       unpack=True,
+                                       usecols=numpy.arange(0,64)))
+            s.rows, s.bytes = len(table[0]), zf.getinfo(file_name).file_size
+        return table
+
+
+    def merge_region(self, region, tables):
+        """
+        Merge parsed tables of the region from all archives.
+        Yearly and monthly archives overlap, rows with the same ID
+        are kept only from the newest archive.
+
+        Parameters
+        ------
+        region : str
+            Region name.
+        tables : list[tuple(key, list[np.ndarray])]
+            Parsed tables with archive_recency key of their archive.
+
+        Returns
+        -------
+        data object : tuple(list[str], list[np.ndarray])
+            Processed data object for defined region.
+        """
+        tables = sorted(tables, key=lambda table: table[0])
+        columns_data = [numpy.concatenate([table[j] for _, table in tables], axis=0)
+                        for j in range(0, 64)]
+        ranks = numpy.concatenate([numpy.full(len(table[0]), rank, dtype=numpy.int32)
+                                   for rank, (_, table) in enumerate(tables)])
+
+        # Keep the newest version of each ID
+        keep, duplicates = deduplicate(columns_data[0], ranks)
+        if duplicates:
+            columns_data = [column[keep] for column in columns_data]
+        print(f'...Removed {duplicates} duplicate rows by ID ({region})')
+
         # Add first row with region name
         columns_data.insert(0, numpy.full((1,len(columns_data[0])), region, dtype='=U3')[0])
 
@@ -446,7 +841,301 @@ class DataDownloader:
         return element.replace('"', '')
 
 
-    def get_list(self, regions = None):
+    def build_regions(self, regions, queue_size = QUEUE_SIZE):
+        """
+        Cold start pipeline: download -> parse -> cache stages run concurrently
+        with bounded queues between them. Each archive is parsed as soon as
+        its download finishes and region is merged and saved into cache
+        as soon as its table from the last archive is parsed.
+
+        Parameters
+        ----------
+        regions : list[str]
+            Regions to build.
+        queue_size : int
+            Capacity of the queues between stages.
+
+        Yields
+        ------
+        region : str
+            Region name
+        data : tuple(list[str], list[np.ndarray])
+            Processed data object for the region
+        """
+
+        def parse(archives):
+            for zip_file, remaining in archives:
+                if zip_file is None:
+                    if remaining == 0:
+                        for region in regions:
+                            yield region, None, None, True
+                    continue
+                key = self.archive_recency(zip_file)
+                with zipfile.ZipFile(zip_file) as zf:
+                    names = zf.namelist()
+                    for region in regions:
+                        table = None
+                        if regions_files[region] in names:
+                            table = self.parse_table(zf, regions_files[region])
+                            print(f'...Parse table {regions_files[region]} ({region}) from {zip_file} with size rows/columns: {len(table)}/{len(table[0])}')
+                        yield region, key, table, remaining == 0
+
+        def cache(chunks):
+            tables = {region: [] for region in regions}
+            for region, key, table, last in chunks:
+                if table is not None:
+                    tables[region].append((key, table))
+                if last and tables[region]:
+                    name = self.cache_filename.format(region)
+                    with self.manifest.lock(name):
+                        # Cache could be created by another process in the meantime
+                        data = self.read_cache(region)
+                        if data is None:
+                            data = block_store.sort_by(self.merge_region(region, tables.pop(region)))
+                            self.save_cache(region, data)
+                    yield region, data
+
+        print("\nParse tables:")
+        return pipeline(self.download_archives, [parse, cache], queue_size)
+
+
+    def load_shared(self, region):
+        """
+        Single-flight region loading: the first thread loads the region
+        and stores it in the program cache, other threads asking for
+        the same region wait for its result instead of parsing it again.
+        Loaded arrays are read-only, so cached data can be shared safely.
+
+        Parameters
+        ----------
+        region : str
+            Region name.
+
+        Returns
+        -------
+        data object : tuple(list[str], list[np.ndarray])
+            Processed data object for defined region.
+        """
+        future, owner = self.claim(region)
+        if not owner:
+            return future.result()
+
+        try:
+            data = self.load_region(region)
+        except BaseException as e:
+            self.publish(region, future, error=e)
+            raise
+        return self.publish(region, future, data)
+
+
+    def claim(self, region):
+        """
+        Claim loading of the region (see load_shared)
+
+        Returns
+        -------
+        future : Future
+            Result of the region loading.
+        owner : bool
+            True if the calling thread loads the region and must publish it,
+            False if it should wait for the future
+        """
+        key = (self.cache_namespace, region)
+        with DataDownloader._loading_lock:
+            future = DataDownloader._loading.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                DataDownloader._loading[key] = future
+        return future, owner
+
+
+    def publish(self, region, future, data = None, error = None):
+        """
+        Publish result of the claimed region: data are stored read-only
+        in the program cache and passed to the waiting threads
+
+        Returns
+        -------
+        data object : tuple(list[str], list[np.ndarray])
+            Processed data object for defined region.
+        """
+        try:
+            if error is not None:
+                future.set_exception(error)
+                return None
+            for array in data[1]:
+                array.setflags(write=False)
+            self.regions_cache.put(self.cache_namespace, region, data)
+            future.set_result(data)
+            return data
+        finally:
+            with DataDownloader._loading_lock:
+                DataDownloader._loading.pop((self.cache_namespace, region), None)
+
+
+    def has_cache(self, region):
+        """
+        Check that the region has recorded cache file
+        """
+        name = self.cache_filename.format(region)
+        return (self.manifest.get(name) is not None
+                and os.path.isfile(f'{self.folder}/{name}'))
+
+
+    def export_parquet(self, path = None, regions = None):
+        """
+        Export parsed dataset into Parquet dataset partitioned by region and year
+
+        Parameters
+        ------
+        path : str
+            Dataset root folder, the default value is '{folder}/accidents.parquet'
+        regions : list  
+            list of regions to export, all regions if None
+
+        Returns
+        -------
+        path : str
+            Dataset root folder
+        """
+        # Imported here, parquet_store depends on this module
+        from parquet_store import export_parquet
+
+        path = path or f"{self.folder}/accidents.parquet"
+        export_parquet(self.get_list(regions), path)
+        return path
+
+
+    def derived_cache(self, filename, build, load):
+        """
+        Load structure derived from all regions (data cube, indexes)
+        saved next to the region caches, it is rebuilt when any region
+        cache has changed.
+
+        Parameters
+        ------
+        filename : str
+            File name in the data folder
+        build : function(data object) -> object with save(path) method
+            Builder of the structure from get_list() output
+        load : function(path) -> object
+            Loader of the saved structure
+
+        Returns
+        -------
+        object
+            Loaded or built structure
+        """
+        path = f"{self.folder}/{filename}"
+
+        def sources():
+            return {region: (self.manifest.get(self.cache_filename.format(region)) or {}).get("sha256")
+                    for region in regions_files}
+
+        entry = self.manifest.get(filename)
+        if entry is not None and entry.get("sources") == sources() and self.manifest.verify(filename):
+            print(f'\nRead {path}')
+            return load(path)
+        with self.manifest.lock(filename):
+            derived = build(self.get_list())
+            print(f'\nSave {path}')
+            derived.save(path)
+            self.manifest.record(filename, file_checksum(path), os.path.getsize(path),
+                                 sources=sources())
+        return derived
+
+
+    def get_cube(self, cube_filename = "cube.npz"):
+        """
+        Load materialized accident data cube saved next to the region caches,
+        the cube is rebuilt when any region cache has changed.
+
+        Parameters
+        ------
+        cube_filename : str
+            Cube file name in the data folder
+
+        Returns
+        -------
+        cube : AccidentCube
+            Counts and sums over region × month × p12 × p16 × p11 × p5a
+        """
+        # Imported here, cube depends on this module
+        from cube import AccidentCube
+
+        return self.derived_cache(cube_filename, AccidentCube.from_data, AccidentCube.load)
+
+
+    def get_bitmap_index(self, index_filename = "bitmaps.npz"):
+        """
+        Load bitmap indexes of low-cardinality columns for get_list() rows
+        (all regions), saved next to the region caches.
+
+        Parameters
+        ------
+        index_filename : str
+            Index file name in the data folder
+
+        Returns
+        -------
+        index : BitmapIndex
+            Row selections by region, p5a, p11, p12, p16, weekday, etc.
+        """
+        # Imported here, bitmap_index depends on this module
+        from bitmap_index import BitmapIndex
+
+        return self.derived_cache(index_filename, BitmapIndex.from_data, BitmapIndex.load)
+
+
+    def get_bin_codes(self, codes_filename = "bins.npz"):
+        """
+        Load bin codes (cause groups, damage classes) of get_list() rows
+        (all regions), saved next to the region caches.
+
+        Parameters
+        ------
+        codes_filename : str
+            Codes file name in the data folder
+
+        Returns
+        -------
+        codes : BinCodes
+            Codes of p12 cause groups and p53 damage classes
+        """
+        # Imported here, binning depends on this module
+        from binning import BinCodes
+
+        return self.derived_cache(codes_filename, BinCodes.from_data, BinCodes.load)
+
+
+    async def get_list_async(self, regions = None, columns = None, executor = None,
+                             years = None):
+        """
+        Asyncio wrapper of get_list, loading and parsing runs in executor.
+
+        Parameters
+        ------
+        regions : list  
+            list of regions to generate data object
+        columns : list
+            list of column names to return, all columns if None
+        executor : concurrent.futures.Executor
+            Executor to run get_list, the default loop executor if None
+        years : tuple(int, int)
+            inclusive range of years to return, all years if None
+
+        Returns
+        -------
+        data object : tuple(list[str], list[np.ndarray])
+            Processed data object for defined regions.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor,
+                                          functools.partial(self.get_list, regions, columns, years))
+
+
+    def get_list(self, regions = None, columns = None, years = None):
         """
         Check program cache and cache files for defined regions.
         Leads the proccess of datagathering
@@ -455,81 +1144,109 @@ class DataDownloader:
         ------
         regions : list  
             list of regions to generate data object
+        columns : list
+            list of column names to return, all columns if None
+        years : tuple(int, int)
+            inclusive range of years to return, all years if None.
+            Regions missing in program cache read only the blocks
+            of the cache file with these years.
 
         Returns
         -------
         data object : tuple(list[str], list[np.ndarray])
             Processed data object for defined regions.
         """
-        output = None
+        names = [element[0] for element in columns_names_dtypes.values()]
+        if columns is not None and not all(column in names for column in columns):
+            raise NotImplementedError(f"ERROR: {columns} not found")
+        if regions is not None and not all(region in regions_files for region in regions):
+            raise NotImplementedError(f"ERROR: {regions} not found")
 
-        # If we need to process all regions
-        if regions is None:
-            for i in regions_files:
-                # Check program cache 
-                if self.regions_cache[i] == None:
-                    # Check cache file
-                    if not glob.glob(f"{self.folder}/{self.cache_filename.format(i)}"):
-                        # Create program and file cache
-                        self.regions_cache[i] = self.parse_region_data(i)
-                        print(f'\nSave dataset cache...{self.folder}/{self.cache_filename.format(i)}')
-                        with gzip.open(f'{self.folder}/{self.cache_filename.format(i)}', 'wb') as cache:
-                            pickle.dump(self.regions_cache[i], cache)
-                        print('...Done')
-                    else:
-                        # Save file cache to program cache
-                        print(f'\nRead dataset cache...{self.folder}/{self.cache_filename.format(i)}')
-                        with gzip.open(f'{self.folder}/{self.cache_filename.format(i)}', 'rb') as cache:
-                            self.regions_cache[i] = pickle.load(cache)
-                        print('...Done')
-                # Concentrate output for all regions
-                if output == None:
-                    output = self.regions_cache[i]
-                else:
-                    for j in range(0,len(output[1])):
-                        output[1][j] = numpy.concatenate(
-                            (output[1][j],self.regions_cache[i][1][j]), axis=0)
-        # If we need to process specific regions
-        else:
-            if all(region in regions_files for region in regions):
-                for i in regions:
-                    # Check program cache 
-                    if self.regions_cache[i] == None:
-                        # Check cache file
-                        if not glob.glob(f"{self.folder}/{self.cache_filename.format(i)}"):
-                            # Create program and file cache
-                            self.regions_cache[i] = self.parse_region_data(i)
-                            print(f'\nSave dataset cache...{self.folder}/{self.cache_filename.format(i)}')
-                            with gzip.open(f'{self.folder}/{self.cache_filename.format(i)}', 'wb') as cache:
-                                pickle.dump(self.regions_cache[i], cache)
-                            print('...Done')
-                        else:
-                            # Save file cache to program cache
-                            print(f'\nRead dataset cache...{self.folder}/{self.cache_filename.format(i)}')
-                            with gzip.open(f'{self.folder}/{self.cache_filename.format(i)}', 'rb') as cache:
-                                self.regions_cache[i] = pickle.load(cache)
-                            print('...Done')
-                    # Concentrate output for all regions
-                    if output == None:
-                        output = self.regions_cache[i]
-                    else:
-                        for j in range(0,len(output[1])):
-                            output[1][j] = numpy.concatenate(
-                                (output[1][j],self.regions_cache[i][1][j]), axis=0)
-            else:
-                raise NotImplementedError(f"ERROR: {regions} not found")
+        with span("get_list", regions=regions, columns=columns, years=years) as s:
+            output = self.collect(regions, columns, years)
+            # Fingerprint of the data: checksums of the region caches and selection
+            tag(output, "get_list", regions, columns, years,
+                {region: (self.manifest.get(self.cache_filename.format(region)) or {}).get("sha256")
+                 for region in (regions or regions_files)})
+            s.rows = len(output[1][0])
+            s.bytes = sum(array.nbytes for array in output[1])
 
-        # Print logs and return output
+        # Print summary and return output
         if regions is None:
             print('\nDATASET for all regions:')
         else:
             print(f'\nDATASET for regions: {regions}:')
-        for i in range(0,len(output[1])):
-            print(f'...{i}.\t<{output[0][i]}> --- <{output[1][i]}> --- "{output[1][i][0].dtype}"')
+        print(f'...{len(output[1][0])} rows, {len(output[0])} columns, '
+              f'{sum(array.nbytes for array in output[1]) / 1048576:.1f} MB')
         print('DATASET collecting is finished\n')
         return(output)
 
 
+    def collect(self, regions = None, columns = None, years = None):
+        """
+        Collect defined regions from program cache, cache files
+        or archives (see get_list)
+
+        Returns
+        -------
+        data object : tuple(list[str], list[np.ndarray])
+            Processed data object for defined regions.
+        """
+        where = None
+        fetch = columns
+        if years is not None:
+            where = {block_store.DATE_COLUMN: (f"{years[0]}-01-01", f"{years[1]}-12-31")}
+            # Date column is needed to filter rows in memory
+            if columns is not None and block_store.DATE_COLUMN not in columns:
+                fetch = list(columns) + [block_store.DATE_COLUMN]
+
+        # Regions without file cache are built by the download -> parse -> cache pipeline,
+        # regions claimed by other threads are awaited in load_shared below
+        cold = dict.fromkeys(i for i in (regions_files if regions is None else regions)
+                             if not self.has_cache(i))
+        owned = {}
+        for region in cold:
+            future, owner = self.claim(region)
+            if owner:
+                owned[region] = future
+        try:
+            # Cache could be built by another thread before the region was claimed
+            build = [region for region in owned if not self.has_cache(region)]
+            if build:
+                for region, data in self.build_regions(build):
+                    self.publish(region, owned.pop(region), data)
+            # Regions cached meanwhile or not built by the pipeline
+            for region in list(owned):
+                self.publish(region, owned[region], self.load_region(region))
+                del owned[region]
+        except BaseException as e:
+            for region, future in owned.items():
+                self.publish(region, future, error=e)
+            raise
+
+        # Check program cache, then verified file cache for each region
+        parts = []
+        for i in (regions_files if regions is None else regions):
+            data = self.regions_cache.get(self.cache_namespace, i, fetch)
+            if data is None and where is not None:
+                # Time range query reads only needed blocks of the file cache
+                data = self.read_cache(i, columns, where)
+                if data is not None:
+                    parts.append(data)
+                    continue
+            if data is None:
+                data = self.load_shared(i)
+            data = filter_rows(data, where)
+            if columns is not None:
+                data = (columns, [data[1][data[0].index(column)] for column in columns])
+            parts.append(data)
+
+        # Concentrate output for all regions into new arrays
+        return (list(parts[0][0]),
+                [numpy.concatenate([part[1][j] for part in parts], axis=0)
+                 for j in range(0, len(parts[0][1]))])
+
+
 if __name__ == "__main__":
     """
     Main:
@@ -0,0 +1,212 @@
+"""
+| Project Implementation for IZV 2020/2021
+| Script figure_cache.py
+| Date: 18.10.2026
+| Author: Mikhail Abramov
+| xabram00@stud.fit.vutbr.cz
+"""
+
+import os
+import sys
+import json
+import time
+import pickle
+import atexit
+import shutil
+import hashlib
+import inspect
+import functools
+import threading
+import numpy
+import pandas as pd
+
+from storage import atomic_write, digest, tagged
+
+"""
+Folder of the rendered figures (IZV_FIGURE_CACHE env. variable, '0' disables the cache)
+"""
+CACHE_FOLDER = os.environ.get("IZV_FIGURE_CACHE", "data/figure_cache")
+
+_lock = threading.Lock()
+_state = {"enabled": CACHE_FOLDER != "0", "folder": CACHE_FOLDER, "registered": False,
+          "hits": 0, "misses": 0, "saved_s": 0.0, "render_s": 0.0}
+
+
+def enable(flag=True, folder=None):
+    """
+    Enable or disable the cache (e.g. benchmarks measure rendering)
+
+    Parameters
+    ----------
+    flag : bool
+    folder : str
+        Cache folder, unchanged if None.
+    """
+    _state["enabled"] = flag
+    if folder is not None:
+        _state["folder"] = folder
+
+
+def content_digest(obj):
+    """
+    Fingerprint of untagged data computed from its content:
+    bytes of numeric columns, pandas hashes of the other columns
+
+    Parameters
+    ----------
+    obj : pd.DataFrame, data object tuple(list[str], list[np.ndarray]), np.ndarray
+        or other picklable object (data cube)
+
+    Returns
+    -------
+    fingerprint : str
+    """
+    checksum = hashlib.sha256()
+
+    def update(name, values):
+        values = numpy.asarray(values)
+        checksum.update(f"{name}:{values.dtype}:{len(values)};".encode())
+        if values.dtype.kind in "biufcmM":
+            checksum.update(numpy.ascontiguousarray(values).view(numpy.uint8))
+        else:
+            hashed = pd.util.hash_array(values.astype(str).astype(object))
+            checksum.update(hashed.view(numpy.uint8))
+
+    if isinstance(obj, pd.DataFrame):
+        for column in obj.columns:
+            update(column, obj[column].to_numpy())
+    elif isinstance(obj, tuple) and len(obj) == 2 and isinstance(obj[1], list):
+        for name, values in zip(*obj):
+            update(name, values)
+    elif isinstance(obj, numpy.ndarray):
+        update("array", obj)
+    else:
+        checksum.update(pickle.dumps(obj, protocol=4))
+    return checksum.hexdigest()
+
+
+def fingerprint(obj):
+    """
+    Fingerprint of the data: tag of the data layer (cache manifest checksums
+    or stamp of the loaded file, and selection) or content digest of untagged data
+    """
+    return tagged(obj) or content_digest(obj)
+
+
+def source_version(func):
+    """
+    Digest of the function source, changed code invalidates its figures
+    """
+    try:
+        return digest(inspect.getsource(func))
+    except (OSError, TypeError):
+        return ""
+
+
+def cached_figure(data=("df",), ignore=()):
+    """
+    Decorator of plot functions with fig_location and show_figure parameters.
+    Figure is looked up in the cache by key of the data fingerprints,
+    the other arguments, function source and file format; if it exists,
+    it is copied to fig_location instead of rendering. Figures are rendered
+    when the cache is disabled, fig_location is not set or figure is shown.
+
+    Parameters
+    ----------
+    data : tuple(str)
+        Data arguments (fingerprinted).
+    ignore : tuple(str)
+        Arguments not changing the figure (indexes, precomputed codes).
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        version = source_version(func)
+        skip = set(data) | set(ignore) | {"fig_location", "show_figure"}
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            fig_location = bound.arguments.get("fig_location")
+            if (not _state["enabled"] or not fig_location
+                    or bound.arguments.get("show_figure")):
+                return func(*args, **kwargs)
+
+            extension = os.path.splitext(fig_location)[1].lower()
+            key = digest(func.__module__, func.__qualname__, version, extension,
+                         {name: fingerprint(bound.arguments[name]) for name in data},
+                         {name: value for name, value in bound.arguments.items()
+                          if name not in skip})
+            path = os.path.join(_state["folder"], key[:2], f"{key}{extension}")
+            meta = f"{path}.json"
+            register()
+
+            if os.path.isfile(path) and os.path.isfile(meta):
+                with open(meta) as f:
+                    seconds = json.load(f)["render_s"]
+                folder = os.path.dirname(fig_location)
+                if folder:
+                    os.makedirs(folder, exist_ok=True)
+                shutil.copyfile(path, fig_location)
+                with _lock:
+                    _state["hits"] += 1
+                    _state["saved_s"] += seconds
+                print(f"Figure {fig_location} from cache ({func.__name__}, "
+                      f"saved {seconds:.2f} s)")
+                return None
+
+            before = os.stat(fig_location).st_mtime_ns if os.path.isfile(fig_location) else None
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            seconds = time.perf_counter() - start
+            with _lock:
+                _state["misses"] += 1
+                _state["render_s"] += seconds
+            # Only newly saved figure is stored (never stale file of older run)
+            if os.path.isfile(fig_location) and os.stat(fig_location).st_mtime_ns != before:
+                with atomic_write(path) as f, open(fig_location, "rb") as figure:
+                    shutil.copyfileobj(figure, f)
+                with atomic_write(meta, "w") as f:
+                    json.dump({"function": func.__qualname__, "render_s": seconds}, f)
+            return result
+        return wrapper
+    return decorator
+
+
+def register():
+    """
+    Register report of the cache at exit (once)
+    """
+    with _lock:
+        if not _state["registered"]:
+            _state["registered"] = True
+            atexit.register(report)
+
+
+def stats():
+    """
+    Statistics of the cache in this process
+
+    Returns
+    -------
+    stats : dict
+        hits, misses, hit_ratio, saved_s (render time of the hits),
+        render_s (render time of the misses)
+    """
+    with _lock:
+        calls = _state["hits"] + _state["misses"]
+        return {"hits": _state["hits"], "misses": _state["misses"],
+                "hit_ratio": _state["hits"] / calls if calls else 0.0,
+                "saved_s": _state["saved_s"], "render_s": _state["render_s"]}
+
+
+def report(file=None):
+    """
+    Print hit ratio and saved time of the cache
+    """
+    total = stats()
+    if not total["hits"] + total["misses"]:
+        return
+    print(f'Figure cache: {total["hits"]}/{total["hits"] + total["misses"]} hits '
+          f'({total["hit_ratio"]:.0%}), saved {total["saved_s"]:.2f} s, '
+          f'rendered {total["render_s"]:.2f} s', file=file or sys.stderr)
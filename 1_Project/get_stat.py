@@ -14,6 +14,9 @@ import matplotlib.pyplot as plt
 from datetime import datetime
 from matplotlib import gridspec
 from download import DataDownloader
+from cube import AccidentCube
+import profiling
+from figure_cache import cached_figure
 
 """
 Colors variables dictionary: {region:color}
@@ -85,6 +88,11 @@ def parse_arguments():
                         '--cache_filename',
                         default = "data_{}.pkl.gz",
                         help = 'Cache files name')
+    parser.add_argument('-p',
+                        '--profile',
+                        default = None,
+                        choices = profiling.MODES,
+                        help = 'Report stages timing as summary table or JSON lines')
 
     return parser.parse_args()
 
@@ -147,6 +155,8 @@ def round1000(x):
         return x if x % 1000 == 0 else x + 1000 - x % 1000
 
 
+@profiling.profiled()
+@cached_figure(data=('data_source',))
 def plot_stat(data_source,
               fig_location = None,
               show_figure = False):
@@ -155,8 +165,8 @@ def plot_stat(data_source,
 
     Parameters
     ----------
-    data_source : tuple(list[str], list[np.ndarray])
-        Object containing processed statistics
+    data_source : tuple(list[str], list[np.ndarray]) or AccidentCube
+        Object containing processed statistics or materialized data cube
     fig_location : str
         If “fig_location” is set, the image will be saved in the given address.
         If the folder where the image is to be saved does not exist, creates it.
@@ -165,9 +175,27 @@ def plot_stat(data_source,
         If the parameter is 'True', the graph will be displayed in the window
         The default value is 'False'.
     """
+    # Take (region, year) pairs from cube or from statistics object
+    if isinstance(data_source, AccidentCube):
+        table = data_source.rollup(['region', 'year'], ['count'])
+        region_values = table['region'].to_numpy()
+        year_values = table['year'].to_numpy().astype('datetime64[Y]')
+        weights = table['count'].to_numpy()
+    else:
+        region_values = data_source[1][0]
+        year_values = data_source[1][4].astype('datetime64[Y]')
+        weights = None
+
     # Define number of regions and years
-    regions = numpy.unique(data_source[1][0])
-    years = numpy.unique(data_source[1][4].astype('datetime64[Y]'))
+    regions, region_codes = numpy.unique(region_values, return_inverse=True)
+    years, year_codes = numpy.unique(year_values, return_inverse=True)
+    region_index = {region: i for i, region in enumerate(regions)}
+
+    # Count accidents by region and year in one pass
+    counts = numpy.bincount(region_codes * len(years) + year_codes,
+                            weights=weights,
+                            minlength=len(regions) * len(years)
+                            ).reshape(len(regions), len(years)).astype(int)
 
     # Init fig. object with grid spec. based on region and years 
     fig = plt.figure(figsize=(1*len(regions) if 1*len(regions) > 4 else 4,
@@ -186,17 +214,14 @@ def plot_stat(data_source,
 
         # Fill accidents list with values by regions
         for region in regions:
-            accidents.append(numpy.count_nonzero(numpy.logical_and(
-                            data_source[1][0] == region,
-                            data_source[1][4].astype('datetime64[Y]') == year)))
+            accidents.append(counts[region_index[region], i])
 
         # Fill average_accidents list with values by regions only for last year
         if  (today.astype('datetime64[Y]') == year or
              today.astype('datetime64[M]') == numpy.datetime64(f'{year+1}-01')):
             for region in regions:
-                average_accidents.append(numpy.count_nonzero(numpy.logical_and(
-                                        data_source[1][0] == region,
-                                        data_source[1][4].astype('datetime64[Y]') != year))/(len(years)-1))
+                row = counts[region_index[region]]
+                average_accidents.append((row.sum() - row[i])/(len(years)-1))
 
         # Sort all values
         average_accidents = [x for _,x in sorted(zip(accidents,average_accidents), reverse=True)]
@@ -252,6 +277,8 @@ if __name__ == "__main__":
     """
     
     parsed_args = parse_arguments()
+    if parsed_args.profile:
+        profiling.enable(parsed_args.profile)
 
     plot_stat(DataDownloader(parsed_args.url,
                              parsed_args.folder,
@@ -0,0 +1,156 @@
+"""
+| Project Implementation for IZV 2020/2021
+| Script id_index.py
+| Date: 18.10.2026
+| Author: Mikhail Abramov
+| xabram00@stud.fit.vutbr.cz
+"""
+
+import numpy
+
+from storage import atomic_write
+
+
+def id_keys(ids):
+    """
+    Convert accident IDs to sortable keys, numeric IDs are stored as int64
+    (8 bytes instead of 48 bytes of '=U12').
+
+    Parameters
+    ----------
+    ids : array-like
+        Accident IDs.
+
+    Returns
+    -------
+    keys : np.ndarray
+    """
+    ids = numpy.asarray(ids)
+    if ids.dtype.kind in "iu":
+        return ids.astype(numpy.int64)
+    try:
+        return ids.astype(numpy.int64)
+    except ValueError:
+        return ids.astype(str)
+
+
+def deduplicate(ids, rank):
+    """
+    Find rows to keep when the same accident ID occurs several times,
+    the row with the highest rank (newest archive) wins,
+    among rows of the same rank the last one wins.
+
+    Parameters
+    ----------
+    ids : array-like
+        Accident IDs.
+    rank : np.ndarray
+        Source rank of each row (higher is newer).
+
+    Returns
+    -------
+    keep : np.ndarray[int64]
+        Ascending positions of the rows to keep
+    duplicates : int
+        Number of dropped rows
+    """
+    keys = id_keys(ids)
+    if not len(keys):
+        return numpy.arange(0), 0
+    positions = numpy.arange(len(keys))
+    # Sort by ID, then newest rank first, then last row first
+    order = numpy.lexsort((-positions, -numpy.asarray(rank), keys))
+    sorted_keys = keys[order]
+    first = numpy.ones(len(keys), dtype=bool)
+    first[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    keep = numpy.sort(order[first])
+    return keep, len(keys) - len(keep)
+
+
+class IdIndex:
+    """
+    Sorted index of accident IDs for O(log n) point lookups
+
+    Attributes
+    ----------
+    keys : np.ndarray
+        Sorted ID keys.
+    positions : np.ndarray[int64]
+        Row position of each key.
+    source : str
+        Checksum of the indexed cache file.
+
+    Methods
+    -------
+    build(ids):
+        Build index from ID column
+    lookup(ids):
+        Row positions of the IDs (-1 if not found)
+    save(path), load(path):
+        Persist index into npz file
+    """
+
+    def __init__(self, keys, positions, source=""):
+        self.keys = keys
+        self.positions = positions
+        self.source = source
+
+    @classmethod
+    def build(cls, ids, source=""):
+        """
+        Build index from ID column
+
+        Parameters
+        ----------
+        ids : array-like
+        source : str
+            Checksum of the indexed cache file.
+
+        Returns
+        -------
+        index : IdIndex
+        """
+        keys = id_keys(ids)
+        order = numpy.argsort(keys, kind="stable")
+        return cls(keys[order], order.astype(numpy.int64), source)
+
+    def lookup(self, ids):
+        """
+        Vectorized binary search of the IDs
+
+        Parameters
+        ----------
+        ids : array-like or str
+            One or many accident IDs.
+
+        Returns
+        -------
+        positions : np.ndarray[int64]
+            Row position of each ID, -1 if ID is not indexed
+        """
+        try:
+            keys = numpy.atleast_1d(numpy.asarray(ids).astype(self.keys.dtype))
+        except ValueError:
+            return numpy.full(numpy.size(ids), -1, dtype=numpy.int64)
+        found = numpy.searchsorted(self.keys, keys)
+        found = numpy.minimum(found, len(self.keys) - 1)
+        if not len(self.keys):
+            return numpy.full(len(keys), -1, dtype=numpy.int64)
+        hit = self.keys[found] == keys
+        return numpy.where(hit, self.positions[found], -1)
+
+    def save(self, path):
+        """
+        Atomically save index into npz file
+        """
+        with atomic_write(path) as f:
+            numpy.savez(f, keys=self.keys, positions=self.positions,
+                        source=numpy.array(self.source))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load index from npz file
+        """
+        with numpy.load(path, allow_pickle=False) as f:
+            return cls(f["keys"], f["positions"], str(f["source"]))
@@ -0,0 +1,191 @@
+"""
+| Project Implementation for IZV 2020/2021
+| Script parquet_store.py
+| Date: 18.10.2026
+| Author: Mikhail Abramov
+| xabram00@stud.fit.vutbr.cz
+"""
+
+import os
+import shutil
+import tempfile
+import numpy
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from download import columns_names_dtypes, columns_codes
+
+"""
+Partition columns of the dataset
+"""
+REGION_COLUMN = columns_names_dtypes[0][0]
+DATE_COLUMN = columns_names_dtypes[4][0]
+YEAR_COLUMN = "Year"
+
+"""
+Column name -> short code and short code -> column name dictionaries
+"""
+names_codes = {columns_names_dtypes[i][0]: columns_codes[i] for i in columns_codes}
+codes_names = {code: name for name, code in names_codes.items()}
+
+
+def to_table(data):
+    """
+    Convert data object into Arrow table with additional year column
+
+    Parameters
+    ----------
+    data : tuple(list[str], list[np.ndarray])
+        Data object from DataDownloader.get_list
+
+    Returns
+    -------
+    table : pa.Table
+    """
+    arrays = []
+    for array in data[1]:
+        # Unicode numpy arrays are converted through python strings
+        if array.dtype.kind == 'U':
+            array = array.astype(object)
+        arrays.append(pa.array(array))
+    dates = data[1][data[0].index(DATE_COLUMN)]
+    years = dates.astype('datetime64[Y]').astype(numpy.int64) + 1970
+    arrays.append(pa.array(years.astype(numpy.int16)))
+    return pa.Table.from_arrays(arrays, names=list(data[0]) + [YEAR_COLUMN])
+
+
+def export_parquet(data, path, compression="snappy"):
+    """
+    Export data object into Parquet dataset partitioned by region and year
+    (path/Region=PHA/Year=2020/*.parquet).
+    Dataset is written into temporary folder and renamed at the end,
+    so readers never see half written dataset.
+
+    Parameters
+    ----------
+    data : tuple(list[str], list[np.ndarray])
+        Data object from DataDownloader.get_list
+    path : str
+        Dataset root folder.
+    compression : str
+        Parquet compression codec.
+    """
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=f".{os.path.basename(path)}.", dir=parent)
+    try:
+        pq.write_to_dataset(to_table(data),
+                            root_path=tmp,
+                            partition_cols=[REGION_COLUMN, YEAR_COLUMN],
+                            compression=compression)
+        if os.path.isdir(path):
+            old = f"{tmp}.old"
+            os.replace(path, old)
+            os.replace(tmp, path)
+            shutil.rmtree(old)
+        else:
+            os.replace(tmp, path)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    print(f"Parquet dataset saved - {path}")
+
+
+def read_parquet(path, columns=None, regions=None, years=None, filter=None):
+    """
+    Read Parquet dataset with column and partition pruning
+
+    Parameters
+    ----------
+    path : str
+        Dataset root folder.
+    columns : list[str]
+        Needed column names (from columns_names_dtypes), all if None.
+    regions : list[str]
+        Needed regions, all if None.
+    years : list[int]
+        Needed years, all if None.
+    filter : ds.Expression
+        Additional row filter pushed down to the scan.
+
+    Returns
+    -------
+    table : pa.Table
+    """
+    dataset = ds.dataset(path, format="parquet", partitioning="hive")
+    expression = filter
+    for column, values in ((REGION_COLUMN, regions), (YEAR_COLUMN, years)):
+        if values is not None:
+            condition = ds.field(column).isin(list(values))
+            expression = condition if expression is None else expression & condition
+    if columns is not None:
+        columns = [name for name in columns if name != YEAR_COLUMN]
+    return dataset.to_table(columns=columns, filter=expression)
+
+
+def read_accidents(path, columns=None, regions=None, years=None, filter=None):
+    """
+    Read Parquet dataset into dataframe with short column codes
+    (p1, p2a, ..., region), the same layout as accidents.pkl.gz
+
+    Parameters
+    ----------
+    path : str
+        Dataset root folder.
+    columns : list[str]
+        Needed column codes, all if None.
+    regions : list[str]
+        Needed regions, all if None.
+    years : list[int]
+        Needed years, all if None.
+    filter : ds.Expression
+        Additional row filter, use column_field(code) to build it.
+
+    Returns
+    -------
+    df : pd.DataFrame
+    """
+    if columns is not None:
+        columns = [codes_names[code] for code in columns]
+    table = read_parquet(path, columns, regions, years, filter)
+    df = table.to_pandas()
+    df = df.drop(columns=[YEAR_COLUMN], errors="ignore")
+    df = df.rename(columns=names_codes)
+    # Partition column is read as dictionary
+    if "region" in df:
+        df["region"] = df["region"].astype(str)
+    if "p2a" in df:
+        df["p2a"] = df["p2a"].astype("datetime64[ns]")
+    return df
+
+
+def column_field(code):
+    """
+    Dataset field for the column short code, e.g. column_field('p12').isin([...])
+
+    Parameters
+    ----------
+    code : str
+        Column short code.
+
+    Returns
+    -------
+    field : ds.Expression
+    """
+    return ds.field(codes_names[code])
+
+
+def is_parquet(path):
+    """
+    Check if path is Parquet dataset folder or file
+
+    Parameters
+    ----------
+    path : str
+
+    Returns
+    -------
+    bool
+    """
+    return os.path.isdir(path) or path.endswith(".parquet")
@@ -0,0 +1,131 @@
+"""
+| Project Implementation for IZV 2020/2021
+| Script pipeline.py
+| Date: 18.10.2026
+| Author: Mikhail Abramov
+| xabram00@stud.fit.vutbr.cz
+"""
+
+import queue
+import functools
+import threading
+
+"""
+Default capacity of the queues between stages
+"""
+QUEUE_SIZE = 2
+
+"""
+Interval of checking the stop flag by blocked stages [s]
+"""
+POLL_INTERVAL = 0.1
+
+"""
+End of stream marker
+"""
+DONE = object()
+
+
+class Failure:
+    """
+    Exception raised by the stage, passed to the next stage
+    """
+
+    def __init__(self, error):
+        self.error = error
+
+
+def put(output, item, stop):
+    """
+    Put item into bounded queue, give up when the pipeline is stopped
+
+    Returns
+    -------
+    bool
+        False if the pipeline was stopped
+    """
+    while not stop.is_set():
+        try:
+            output.put(item, timeout=POLL_INTERVAL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def consume(source, stop):
+    """
+    Iterate items of the queue until end of stream,
+    exception of the previous stage is re-raised
+    """
+    while not stop.is_set():
+        try:
+            item = source.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            continue
+        if item is DONE:
+            return
+        if isinstance(item, Failure):
+            raise item.error
+        yield item
+
+
+def run(produce, output, stop):
+    """
+    Thread body of the stage: move produced items into the output queue
+    """
+    items = produce()
+    try:
+        for item in items:
+            if not put(output, item, stop):
+                return
+    except BaseException as e:
+        put(output, Failure(e), stop)
+    else:
+        put(output, DONE, stop)
+    finally:
+        # Release resources (locks, files) of stopped generators
+        close = getattr(items, "close", None)
+        if close is not None:
+            close()
+
+
+def pipeline(source, stages=(), queue_size=QUEUE_SIZE):
+    """
+    Run source and stages concurrently, connected by bounded queues:
+        source -> queue -> stages[0] -> queue -> ... -> stages[-1] -> caller
+    Every stage except the last one runs in its own thread, the last stage
+    runs in the calling thread. Stage is a function taking an iterator
+    of input items and returning an iterator of output items, so it can
+    keep state between items and emit items at the end of stream.
+    Exception of any stage is re-raised in the caller.
+
+    Parameters
+    ----------
+    source : function() -> iterable
+        First stage producing items.
+    stages : list[function(iterator) -> iterable]
+        Next stages.
+    queue_size : int
+        Capacity of each queue (back pressure on faster stages).
+
+    Yields
+    ------
+    item
+        Items produced by the last stage
+    """
+    stop = threading.Event()
+    threads = []
+    produce = source
+    for stage in stages:
+        connection = queue.Queue(queue_size)
+        thread = threading.Thread(target=run, args=(produce, connection, stop), daemon=True)
+        thread.start()
+        threads.append(thread)
+        produce = functools.partial(stage, consume(connection, stop))
+    try:
+        yield from produce()
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
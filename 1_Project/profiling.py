@@ -0,0 +1,243 @@
+"""
+| Project Implementation for IZV 2020/2021
+| Script profiling.py
+| Date: 18.10.2026
+| Author: Mikhail Abramov
+| xabram00@stud.fit.vutbr.cz
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import inspect
+import functools
+import threading
+import tracemalloc
+
+"""
+Profiling mode (IZV_PROFILE env. variable):
+    '' or '0' - disabled, 'table' or '1' - summary table at exit,
+    'json' - JSON line per span (IZV_PROFILE_OUT file or stderr)
+"""
+MODES = ("table", "json")
+
+
+class Span:
+    """
+    Measured stage of the program: wall time, CPU time (process),
+    rows processed, bytes read/written and peak traced memory.
+    Spans are nested per thread, peak memory of the child span
+    is propagated to its parent (peak is reset per span on Python 3.9+,
+    older versions report the peak since the tracing start).
+
+    Attributes
+    ----------
+    name : str
+        Stage name.
+    fields : dict
+        Additional fields of the record (region, file, ...).
+    rows, bytes : int
+        Rows processed and bytes read or written, set by the stage.
+    """
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+        self.rows = None
+        self.bytes = None
+        self.parent = None
+        self.peak = 0
+
+    def __enter__(self):
+        stack = _local.__dict__.setdefault("stack", [])
+        self.parent = stack[-1] if stack else None
+        stack.append(self)
+        self.memory = tracemalloc.get_traced_memory()[0]
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        self.cpu = time.process_time()
+        self.wall = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+        _local.stack.pop()
+        if self.parent is not None:
+            self.parent.peak = max(self.parent.peak, self.peak)
+        record = {"span": self.name,
+                  "parent": self.parent.name if self.parent is not None else None,
+                  "thread": threading.current_thread().name,
+                  "wall_s": round(wall, 6),
+                  "cpu_s": round(cpu, 6),
+                  "rows": self.rows,
+                  "bytes": self.bytes,
+                  "peak_bytes": max(self.peak - self.memory, 0)}
+        record.update(self.fields)
+        _emit(record)
+        return False
+
+
+class NoSpan:
+    """
+    Disabled span, all operations are no-ops
+    """
+    rows = None
+    bytes = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+NOSPAN = NoSpan()
+
+_local = threading.local()
+_lock = threading.Lock()
+_state = {"mode": None, "output": None, "summary": {}}
+
+
+def enable(mode="table", path=None):
+    """
+    Enable profiling and start memory tracing
+
+    Parameters
+    ----------
+    mode : str
+        'table' - summary table at exit, 'json' - JSON line per span.
+    path : str
+        File for JSON lines, stderr if None.
+    """
+    if mode not in MODES:
+        raise ValueError(f"ERROR: profiling mode {mode} is not supported, use {MODES}")
+    if _state["mode"] is None:
+        atexit.register(report)
+    _state["mode"] = mode
+    _state["output"] = open(path, "a") if path else sys.stderr
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def enabled():
+    """
+    Check if profiling is enabled
+    """
+    return _state["mode"] is not None
+
+
+def span(name, **fields):
+    """
+    Context manager measuring the stage, e.g.:
+        with span("read_cache", region=region) as s:
+            ...
+            s.rows = len(data[1][0])
+
+    Returns
+    -------
+    span : Span
+        Measured span or shared no-op span when profiling is disabled
+    """
+    if _state["mode"] is None:
+        return NOSPAN
+    return Span(name, fields)
+
+
+def current():
+    """
+    The innermost active span of the thread (no-op span if there is none)
+    """
+    stack = getattr(_local, "stack", None)
+    return stack[-1] if stack else NOSPAN
+
+
+def profiled(name=None, rows=None):
+    """
+    Decorator measuring each call of the function
+
+    Parameters
+    ----------
+    name : str
+        Span name, function name if None.
+    rows : str
+        Argument name whose len() is recorded as rows,
+        'return' records len() of the returned value.
+    """
+    def decorator(func):
+        span_name = name or func.__name__
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _state["mode"] is None:
+                return func(*args, **kwargs)
+            with Span(span_name, {}) as s:
+                if rows is not None and rows != "return":
+                    value = signature.bind_partial(*args, **kwargs).arguments.get(rows)
+                    s.rows = len(value) if hasattr(value, "__len__") else None
+                result = func(*args, **kwargs)
+                if rows == "return" and hasattr(result, "__len__"):
+                    s.rows = len(result)
+            return result
+        return wrapper
+    return decorator
+
+
+def _emit(record):
+    """
+    Write JSON line of the span and add it to the summary
+    """
+    with _lock:
+        total = _state["summary"].setdefault(record["span"], {
+            "calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "rows": 0, "bytes": 0, "peak_bytes": 0})
+        total["calls"] += 1
+        total["wall_s"] += record["wall_s"]
+        total["cpu_s"] += record["cpu_s"]
+        total["rows"] += record["rows"] or 0
+        total["bytes"] += record["bytes"] or 0
+        total["peak_bytes"] = max(total["peak_bytes"], record["peak_bytes"])
+        if _state["mode"] == "json":
+            _state["output"].write(json.dumps(record, default=str) + "\n")
+            _state["output"].flush()
+
+
+def summary():
+    """
+    Totals of the spans by name
+
+    Returns
+    -------
+    summary : dict{str: dict}
+        calls, wall_s, cpu_s, rows, bytes, peak_bytes of each span name
+    """
+    with _lock:
+        return {name: dict(total) for name, total in _state["summary"].items()}
+
+
+def report(file=None):
+    """
+    Print summary table of the spans (table mode)
+    """
+    if _state["mode"] != "table" or not _state["summary"]:
+        return
+    file = file or sys.stderr
+    print(f'\n{"span":<22}{"calls":>7}{"wall [s]":>11}{"cpu [s]":>11}{"rows":>11}'
+          f'{"MB":>10}{"peak MB":>10}{"rows/s":>12}', file=file)
+    for name, total in sorted(summary().items(), key=lambda item: -item[1]["wall_s"]):
+        speed = total["rows"] / total["wall_s"] if total["wall_s"] else 0
+        print(f'{name:<22}{total["calls"]:>7}{total["wall_s"]:>11.3f}{total["cpu_s"]:>11.3f}'
+              f'{total["rows"]:>11}{total["bytes"] / 1048576:>10.1f}'
+              f'{total["peak_bytes"] / 1048576:>10.1f}{speed:>12.0f}', file=file)
+
+
+# Enable from environment
+if os.environ.get("IZV_PROFILE", "") not in ("", "0"):
+    enable("table" if os.environ["IZV_PROFILE"] == "1" else os.environ["IZV_PROFILE"],
+           os.environ.get("IZV_PROFILE_OUT"))
@@ -0,0 +1,133 @@
+"""
+| Project Implementation for IZV 2020/2021
+| Script raster.py
+| Date: 18.10.2026
+| Author: Mikhail Abramov
+| xabram00@stud.fit.vutbr.cz
+"""
+
+import os
+import time
+import tempfile
+import argparse
+import numpy
+
+"""
+Default DPI of rasterized point layers in vector outputs
+(IZV_RASTER_DPI env. variable, 0 keeps all layers vector)
+"""
+RASTER_DPI = int(os.environ.get("IZV_RASTER_DPI", "200"))
+
+"""
+Minimum number of points in the axes to rasterize its point layers
+"""
+MIN_POINTS = 2000
+
+"""
+Vector formats of matplotlib (raster formats are not affected)
+"""
+VECTOR_FORMATS = ("pdf", "svg", "svgz", "eps", "ps", "pgf")
+
+
+def rasterize_points(ax, dpi=RASTER_DPI, min_points=MIN_POINTS):
+    """
+    Mark point layers (scatter collections) plotted into the axes so far
+    as rasterized when they hold at least min_points points together,
+    axes, labels, legends and later added layers stay vector
+
+    Parameters
+    ----------
+    ax : matplotlib.axes.Axes
+    dpi : int
+        Raster DPI, nothing is rasterized if 0 or None.
+    min_points : int
+        Minimum number of points of all layers of the axes.
+
+    Returns
+    -------
+    layers : int
+        Number of rasterized layers
+    """
+    if not dpi:
+        return 0
+    layers = [collection for collection in ax.collections
+              if len(collection.get_offsets()) > 1]
+    if sum(len(layer.get_offsets()) for layer in layers) < min_points:
+        return 0
+    for layer in layers:
+        layer.set_rasterized(True)
+    return len(layers)
+
+
+def savefig_options(fig_location, dpi=RASTER_DPI):
+    """
+    savefig arguments of the output: DPI of the rasterized layers
+    for vector formats (raster formats keep their resolution)
+
+    Returns
+    -------
+    options : dict
+    """
+    extension = os.path.splitext(fig_location)[1].lstrip(".").lower()
+    if dpi and extension in VECTOR_FORMATS:
+        return {"dpi": dpi}
+    return {}
+
+
+def benchmark(points=(1000, 10000, 100000, 1000000), formats=("pdf", "svg", "png"),
+              dpis=(0, 150, 300), seed=0):
+    """
+    File size and save time of scatter map (axes, title, legend)
+    by number of points, format and raster DPI (0 - vector points)
+
+    Returns
+    -------
+    results : list[dict]
+        points, format, dpi, size_kb, save_s
+    """
+    # Imported here, the module is used by scripts selecting backend
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    rng = numpy.random.default_rng(seed)
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        for n in points:
+            x = rng.normal(1_850_000, 40_000, n)
+            y = rng.normal(6_300_000, 30_000, n)
+            for extension in formats:
+                for dpi in dpis:
+                    fig, ax = plt.subplots(figsize=(8, 10))
+                    ax.scatter(x, y, s=0.25, color='tab:gray', label='accidents')
+                    ax.set_title(f'{n} points')
+                    ax.legend()
+                    rasterize_points(ax, dpi)
+                    path = f"{folder}/figure.{extension}"
+                    start = time.perf_counter()
+                    fig.savefig(path, bbox_inches='tight', **savefig_options(path, dpi))
+                    seconds = time.perf_counter() - start
+                    plt.close(fig)
+                    results.append({"points": n, "format": extension, "dpi": dpi,
+                                    "size_kb": os.path.getsize(path) / 1024,
+                                    "save_s": seconds})
+    return results
+
+
+"""
+Main:
+    Benchmark of the rasterized point layers
+"""
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rasterized point layers benchmark")
+    parser.add_argument("-p", "--points", type=int, nargs="+",
+                        default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("-f", "--formats", nargs="+", default=["pdf", "svg", "png"])
+    parser.add_argument("-d", "--dpi", type=int, nargs="+", default=[0, 150, 300],
+                        help="raster DPI, 0 - vector points")
+    args = parser.parse_args()
+
+    print(f'{"points":>10}{"format":>8}{"dpi":>8}{"size [kB]":>12}{"save [s]":>10}')
+    for result in benchmark(args.points, args.formats, args.dpi):
+        print(f'{result["points"]:>10}{result["format"]:>8}{result["dpi"] or "vector":>8}'
+              f'{result["size_kb"]:>12.1f}{result["save_s"]:>10.3f}')
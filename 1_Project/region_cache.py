@@ -0,0 +1,215 @@
+"""
+| Project Implementation for IZV 2020/2021
+| Script region_cache.py
+| Date: 18.10.2026
+| Author: Mikhail Abramov
+| xabram00@stud.fit.vutbr.cz
+"""
+
+import os
+import threading
+
+from collections import OrderedDict
+
+"""
+Default memory budget of the shared cache in bytes (IZV_CACHE_BYTES env. variable)
+"""
+DEFAULT_BUDGET = int(os.environ.get("IZV_CACHE_BYTES", 2 * 1024 ** 3))
+
+
+class RegionCache:
+    """
+    Thread-safe in-process LRU cache of parsed regions with memory budget.
+    Every column of every region is stored as separate entry,
+    so eviction can drop whole regions or only cold columns.
+
+    Attributes
+    ----------
+    max_bytes : int
+        Memory budget in bytes, None means unbounded cache.
+    granularity : str
+        'region' - evict all columns of the least recently used region,
+        'column' - evict least recently used columns only.
+    hits, misses, evictions : int
+        Cache counters.
+
+    Methods
+    -------
+    get(namespace, region, columns=None):
+        Return (names, arrays) for region or None on miss
+    put(namespace, region, data):
+        Store region data object
+    stats():
+        Counters and current size
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_bytes=DEFAULT_BUDGET, granularity="region"):
+        """
+        Parameters
+        ----------
+        max_bytes : int
+            Memory budget in bytes, None means unbounded cache.
+        granularity : str
+            Eviction unit - 'region' or 'column'.
+        """
+        if granularity not in ("region", "column"):
+            raise ValueError(f"ERROR: unknown granularity {granularity}")
+        self.max_bytes = max_bytes
+        self.granularity = granularity
+        self.entries = OrderedDict()
+        self.names = {}
+        # Recency of the regions, the most recently used is the last
+        self.regions = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.RLock()
+
+    @classmethod
+    def shared(cls):
+        """
+        Process-wide cache instance shared by all DataDownloader objects
+
+        Returns
+        -------
+        cache : RegionCache
+        """
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def get(self, namespace, region, columns=None):
+        """
+        Return cached region data and mark it as recently used
+
+        Parameters
+        ----------
+        namespace : str
+            Cache namespace (data folder and cache file name).
+        region : str
+            Region name.
+        columns : list[str]
+            Needed columns, all columns if None.
+
+        Returns
+        -------
+        data object : tuple(list[str], list[np.ndarray])
+            Cached columns or None if any of the columns is not cached
+        """
+        with self.lock:
+            names = self.names.get((namespace, region))
+            if names is None:
+                self.misses += 1
+                return None
+            if columns is None:
+                columns = names
+            keys = [(namespace, region, column) for column in columns]
+            if not all(key in self.entries for key in keys):
+                self.misses += 1
+                return None
+            for key in keys:
+                self.entries.move_to_end(key)
+            self.regions.move_to_end((namespace, region))
+            self.hits += 1
+            return (list(columns), [self.entries[key] for key in keys])
+
+    def put(self, namespace, region, data):
+        """
+        Store region data object and evict entries over the budget
+
+        Parameters
+        ----------
+        namespace : str
+            Cache namespace (data folder and cache file name).
+        region : str
+            Region name.
+        data : tuple(list[str], list[np.ndarray])
+            Region data object (all or some columns).
+        """
+        with self.lock:
+            names = self.names.setdefault((namespace, region), [])
+            self.regions[(namespace, region)] = None
+            self.regions.move_to_end((namespace, region))
+            for name, array in zip(*data):
+                key = (namespace, region, name)
+                if key in self.entries:
+                    self.bytes -= self.entries[key].nbytes
+                elif name not in names:
+                    names.append(name)
+                self.entries[key] = array
+                self.bytes += array.nbytes
+            self.evict()
+
+    def evict(self):
+        """
+        Evict least recently used regions (or columns) until the cache fits
+        the budget. Recency of a region is its last get or put of any columns.
+        The most recently used region is never evicted completely,
+        so a single region bigger than the budget can still be served.
+        """
+        with self.lock:
+            if self.max_bytes is None:
+                return
+            if self.granularity == "region":
+                while self.bytes > self.max_bytes and len(self.regions) > 1:
+                    self.drop(*next(iter(self.regions)))
+                return
+            while self.bytes > self.max_bytes and len(self.entries) > 1:
+                self.drop_column(*next(iter(self.entries)))
+
+    def drop(self, namespace, region):
+        """
+        Remove all columns of the region
+        """
+        with self.lock:
+            self.regions.pop((namespace, region), None)
+            for name in self.names.pop((namespace, region), []):
+                array = self.entries.pop((namespace, region, name), None)
+                if array is not None:
+                    self.bytes -= array.nbytes
+                    self.evictions += 1
+
+    def drop_column(self, namespace, region, name):
+        """
+        Remove one column of the region
+        """
+        with self.lock:
+            array = self.entries.pop((namespace, region, name), None)
+            if array is not None:
+                self.bytes -= array.nbytes
+                self.evictions += 1
+            if not any(key[:2] == (namespace, region) for key in self.entries):
+                self.names.pop((namespace, region), None)
+                self.regions.pop((namespace, region), None)
+
+    def clear(self):
+        """
+        Remove all entries (counters are kept)
+        """
+        with self.lock:
+            self.entries.clear()
+            self.names.clear()
+            self.regions.clear()
+            self.bytes = 0
+
+    def stats(self):
+        """
+        Cache counters and current size
+
+        Returns
+        -------
+        stats : dict
+        """
+        with self.lock:
+            return {"hits": self.hits,
+                    "misses": self.misses,
+                    "evictions": self.evictions,
+                    "bytes": self.bytes,
+                    "max_bytes": self.max_bytes,
+                    "regions": len(self.names),
+                    "columns": len(self.entries)}
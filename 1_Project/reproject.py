@@ -0,0 +1,185 @@
+"""
+| Project Implementation for IZV 2020/2021
+| Script reproject.py
+| Date: 18.10.2026
+| Author: Mikhail Abramov
+| xabram00@stud.fit.vutbr.cz
+"""
+
+import os
+import time
+import hashlib
+import argparse
+import threading
+import concurrent.futures
+import numpy
+from pyproj import Transformer
+
+from storage import atomic_write, digest
+
+"""
+Coordinate systems of the accident coordinates (S-JTSK) and of the maps (Web Mercator)
+"""
+SOURCE_CRS = "EPSG:5514"
+TARGET_CRS = "EPSG:3857"
+
+"""
+Folder of the projected coordinates (IZV_PROJECTION_CACHE env. variable, '0' disables the cache)
+"""
+CACHE_FOLDER = os.environ.get("IZV_PROJECTION_CACHE", "data/projection_cache")
+
+"""
+Default number of points projected by one task
+"""
+CHUNK = 1 << 16
+
+"""
+Coordinate of the parse_f fallback for unparsable values
+"""
+SENTINEL = -1
+
+_local = threading.local()
+
+
+def transformer(source=SOURCE_CRS, target=TARGET_CRS):
+    """
+    Transformer of the current thread (pyproj transformers must not be
+    shared between threads), created once per thread and pair of systems
+    with x/y (easting/northing) axis order as geopandas to_crs
+    """
+    cache = getattr(_local, "transformers", None)
+    if cache is None:
+        cache = _local.transformers = {}
+    if (source, target) not in cache:
+        cache[(source, target)] = Transformer.from_crs(source, target, always_xy=True)
+    return cache[(source, target)]
+
+
+def missing(x, y):
+    """
+    Points without coordinates: NaN, infinite or the parse_f sentinel (-1)
+
+    Returns
+    -------
+    mask : np.ndarray[bool]
+    """
+    return ~(numpy.isfinite(x) & numpy.isfinite(y)) | (x == SENTINEL) | (y == SENTINEL)
+
+
+def project(x, y, source=SOURCE_CRS, target=TARGET_CRS):
+    """
+    Project one chunk of points by the transformer of the current thread
+
+    Returns
+    -------
+    x, y : np.ndarray[float]
+    """
+    return transformer(source, target).transform(x, y)
+
+
+def reproject(x, y, source=SOURCE_CRS, target=TARGET_CRS, chunk=CHUNK,
+              executor=None, workers=None, cache=True):
+    """
+    Project coordinate columns: located points are split into chunks projected
+    in parallel, missing points (NaN, -1 sentinel) get NaN. Results are cached
+    by digest of the input coordinates, so later runs (geo.py, doc.py)
+    load the projected columns instead of projecting them again.
+
+    Parameters
+    ----------
+    x, y : array-like
+        Coordinates in the source system (d, e columns).
+    source, target : str
+        Coordinate systems.
+    chunk : int
+        Points of one task.
+    executor : concurrent.futures.Executor
+        Executor of the chunks, own ThreadPoolExecutor if None.
+    workers : int
+        Workers of own executor.
+    cache : bool
+        Use the cache folder (CACHE_FOLDER).
+
+    Returns
+    -------
+    x, y : np.ndarray[float64]
+        Projected coordinates, NaN for missing points
+    """
+    x = numpy.ascontiguousarray(x, dtype=numpy.float64)
+    y = numpy.ascontiguousarray(y, dtype=numpy.float64)
+    path = None
+    if cache and CACHE_FOLDER != "0":
+        checksum = hashlib.sha256(x.view(numpy.uint8))
+        checksum.update(y.view(numpy.uint8))
+        key = digest(source, target, len(x), checksum.hexdigest())
+        path = os.path.join(CACHE_FOLDER, key[:2], f"{key}.npz")
+        if os.path.isfile(path):
+            with numpy.load(path, allow_pickle=False) as f:
+                return f["x"], f["y"]
+
+    out_x = numpy.full(len(x), numpy.nan)
+    out_y = numpy.full(len(y), numpy.nan)
+    located = numpy.flatnonzero(~missing(x, y))
+    starts = range(0, len(located), chunk)
+    if len(starts) > 1:
+        own = executor is None
+        if own:
+            executor = concurrent.futures.ThreadPoolExecutor(workers)
+        try:
+            futures = [(rows, executor.submit(project, x[rows], y[rows], source, target))
+                       for rows in (located[start:start + chunk] for start in starts)]
+            for rows, future in futures:
+                out_x[rows], out_y[rows] = future.result()
+        finally:
+            if own:
+                executor.shutdown()
+    elif len(located):
+        out_x[located], out_y[located] = project(x[located], y[located], source, target)
+
+    if path is not None:
+        with atomic_write(path) as f:
+            numpy.savez(f, x=out_x, y=out_y)
+    return out_x, out_y
+
+
+def benchmark(points=1_000_000, repeat=3, workers=(1, 2, 4, 8), seed=0):
+    """
+    Projection time of one transformer call and of chunks by number of workers
+
+    Returns
+    -------
+    results : dict{str: float}
+        Best time in seconds
+    """
+    rng = numpy.random.default_rng(seed)
+    x = rng.uniform(-900_000, -430_000, points)
+    y = rng.uniform(-1_230_000, -935_000, points)
+    x[rng.random(points) < 0.01] = SENTINEL
+
+    def best(func):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    results = {"single": best(lambda: Transformer.from_crs(
+        SOURCE_CRS, TARGET_CRS, always_xy=True).transform(x, y))}
+    for n in workers:
+        results[f"chunks x{n}"] = best(lambda: reproject(x, y, workers=n, cache=False))
+    return results
+
+
+"""
+Main:
+    Benchmark of the chunked reprojection
+"""
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chunked reprojection benchmark")
+    parser.add_argument("-p", "--points", type=int, default=1_000_000)
+    parser.add_argument("-w", "--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    for name, seconds in benchmark(args.points, workers=args.workers).items():
+        print(f"{name:>12}: {seconds:.3f} s")
@@ -0,0 +1,398 @@
+"""
+| Project Implementation for IZV 2020/2021
+| Script storage.py
+| Date: 18.10.2026
+| Author: Mikhail Abramov
+| xabram00@stud.fit.vutbr.cz
+"""
+
+import os
+import json
+import time
+import hashlib
+import weakref
+import tempfile
+
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+"""
+Read block size for checksums
+"""
+BLOCK_SIZE = 1048576
+
+
+class FileLock:
+    """
+    Inter-process lock based on lock file (flock on POSIX, msvcrt on Windows).
+    Used as context manager, so several worker processes on the same host
+    can share one data folder.
+
+    Attributes
+    ----------
+    path : str
+        Lock file path.
+    """
+
+    def __init__(self, path):
+        """
+        Parameters
+        ----------
+        path : str
+            Lock file path.
+        """
+        self.path = path
+        self.fd = None
+
+    def acquire(self):
+        """
+        Block until the lock is acquired
+        """
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    msvcrt.locking(self.fd, msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.1)
+
+    def release(self):
+        """
+        Release the lock
+        """
+        if self.fd is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(self.fd, 0, os.SEEK_SET)
+            msvcrt.locking(self.fd, msvcrt.LK_UNLCK, 1)
+        os.close(self.fd)
+        self.fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+
+@contextmanager
+def atomic_write(path, mode="wb"):
+    """
+    Write file into the temporary file in the same folder
+    and rename it to the final name only after successful write.
+    A crash never leaves truncated file under the final name.
+
+    Parameters
+    ----------
+    path : str
+        Final file path.
+    mode : str
+        Open mode ('wb' or 'w').
+
+    Yields
+    ------
+    file object
+        Temporary file object
+    """
+    folder = os.path.dirname(path) or "."
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=folder)
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class HashingWriter:
+    """
+    File object wrapper computing sha256 checksum of written data
+
+    Attributes
+    ----------
+    size : int
+        Number of written bytes.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.hash.update(data)
+        self.size += len(data)
+        return self.f.write(data)
+
+    def flush(self):
+        self.f.flush()
+
+    def hexdigest(self):
+        return self.hash.hexdigest()
+
+
+def file_checksum(path):
+    """
+    Compute sha256 checksum of the file
+
+    Parameters
+    ----------
+    path : str
+        File path.
+
+    Returns
+    -------
+    checksum : str
+        Hex digest
+    """
+    checksum = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(BLOCK_SIZE), b""):
+            checksum.update(block)
+    return checksum.hexdigest()
+
+
+def file_stamp(path):
+    """
+    Cheap fingerprint of the file from its path, size and modification time
+    (changes whenever the file is rewritten), the content is not read
+
+    Parameters
+    ----------
+    path : str
+        File path.
+
+    Returns
+    -------
+    stamp : str
+        Hex digest
+    """
+    stat = os.stat(path)
+    return digest(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+
+class Manifest:
+    """
+    Sidecar manifest with checksums of the files in the data folder:
+    {file name: {"sha256": str, "size": int, "mtime_ns": int, ...}}
+
+    Attributes
+    ----------
+    folder : str
+        Data folder.
+    filename : str
+        Manifest file name in the folder.
+
+    Methods
+    -------
+    lock(name):
+        Inter-process lock for defined file
+    record(name, checksum, size, **meta):
+        Record checksum and stamp (size, mtime) of the file
+    verify(name, full=False):
+        Check file against recorded stamp or checksum
+    """
+
+    def __init__(self, folder, filename="manifest.json"):
+        self.folder = folder
+        self.filename = filename
+
+    @property
+    def path(self):
+        """
+        Manifest file path
+        """
+        return os.path.join(self.folder, self.filename)
+
+    def lock(self, name):
+        """
+        Inter-process lock for defined file of the folder
+
+        Parameters
+        ----------
+        name : str
+            File name in the folder.
+
+        Returns
+        -------
+        lock : FileLock
+        """
+        return FileLock(os.path.join(self.folder, f".{name}.lock"))
+
+    def load(self):
+        """
+        Read manifest entries
+
+        Returns
+        -------
+        entries : dict
+        """
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, name):
+        """
+        Manifest entry of the file or None
+        """
+        return self.load().get(name)
+
+    def record(self, name, checksum, size, **meta):
+        """
+        Record checksum of the file with its modification time
+        (read-modify-write under manifest lock)
+
+        Parameters
+        ----------
+        name : str
+            File name in the folder.
+        checksum : str
+            sha256 hex digest.
+        size : int
+            File size in bytes.
+        meta : dict
+            Additional metadata stored with the entry.
+        """
+        path = os.path.join(self.folder, name)
+        if os.path.isfile(path):
+            meta["mtime_ns"] = os.stat(path).st_mtime_ns
+        with self.lock(self.filename):
+            entries = self.load()
+            entries[name] = dict(meta, sha256=checksum, size=size)
+            with atomic_write(self.path, "w") as f:
+                json.dump(entries, f, indent=1, sort_keys=True)
+
+    def forget(self, name):
+        """
+        Remove file entry from the manifest
+        """
+        with self.lock(self.filename):
+            entries = self.load()
+            if entries.pop(name, None) is not None:
+                with atomic_write(self.path, "w") as f:
+                    json.dump(entries, f, indent=1, sort_keys=True)
+
+    def verify(self, name, full=False):
+        """
+        Check file against the manifest entry: file with unchanged size
+        and modification time is trusted without reading it, otherwise
+        (or when full is set) its checksum is compared. Matching file
+        with new modification time gets the new time recorded.
+
+        Parameters
+        ----------
+        name : str
+            File name in the folder.
+        full : bool
+            Always compare the checksum.
+
+        Returns
+        -------
+        bool
+            True if file exists and matches the manifest entry
+        """
+        path = os.path.join(self.folder, name)
+        entry = self.get(name)
+        if entry is None or not os.path.isfile(path):
+            return False
+        stat = os.stat(path)
+        if stat.st_size != entry.get("size"):
+            return False
+        if not full and stat.st_mtime_ns == entry.get("mtime_ns"):
+            return True
+        if file_checksum(path) != entry.get("sha256"):
+            return False
+        if stat.st_mtime_ns != entry.get("mtime_ns"):
+            meta = {key: value for key, value in entry.items() if key not in ("sha256", "size")}
+            self.record(name, entry["sha256"], entry["size"], **meta)
+        return True
+
+
+_tags = {}
+
+
+def digest(*parts):
+    """
+    sha256 of JSON representation of the parts
+    """
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def anchors(obj):
+    """
+    Objects identifying the data: arrays of DataDownloader data object
+    (regions cache may share arrays between data objects of different columns),
+    the object itself otherwise
+    """
+    if isinstance(obj, tuple) and len(obj) == 2 and isinstance(obj[1], list) and obj[1]:
+        return obj[1]
+    return [obj]
+
+
+def tag(obj, *parts):
+    """
+    Attach fingerprint of the data (digest of the parts, e.g. checksums
+    of the source files and selection arguments) to data object or dataframe,
+    it is forgotten when the object is garbage collected.
+    The data are expected not to be modified in place after tagging.
+
+    Returns
+    -------
+    obj
+        The tagged object
+    """
+    targets = anchors(obj)
+    key = tuple(id(target) for target in targets)
+    try:
+        refs = [weakref.ref(target, lambda _, key=key: _tags.pop(key, None))
+                for target in targets]
+    except TypeError:
+        return obj
+    _tags[key] = (refs, digest(*parts))
+    return obj
+
+
+def tagged(obj):
+    """
+    Fingerprint attached by tag(), None if the object is not tagged
+    """
+    targets = anchors(obj)
+    entry = _tags.get(tuple(id(target) for target in targets))
+    if entry is None or any(ref() is not target for ref, target in zip(entry[0], targets)):
+        return None
+    return entry[1]
+
+
+def derive(obj, source, *parts):
+    """
+    Tag object derived from tagged source (fingerprint of the source + parts),
+    untagged source leaves the object untagged
+
+    Returns
+    -------
+    obj
+        The derived object
+    """
+    fingerprint = tagged(source)
+    if fingerprint is not None:
+        tag(obj, fingerprint, *parts)
+    return obj
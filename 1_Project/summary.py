@@ -0,0 +1,332 @@
+"""
+| Project Implementation for IZV 2020/2021
+| Script summary.py
+| Date: 18.10.2026
+| Author: Mikhail Abramov
+| xabram00@stud.fit.vutbr.cz
+"""
+
+import math
+import numpy
+import pandas as pd
+
+from aggregate import encode
+
+"""
+Relative accuracy of the quantile sketch
+"""
+ACCURACY = 0.01
+
+"""
+Largest bucket index of the sketch (values up to gamma ** LIMIT)
+"""
+LIMIT = 2048
+
+"""
+Default quantiles of Summary.frame()
+"""
+QUANTILES = (0.5, 0.9, 0.99)
+
+"""
+Statistics of Summary.get()
+"""
+STATS = ("rows", "sum", "count", "nonzero", "min", "max", "mean")
+
+
+class Summary:
+    """
+    Streaming summary of numeric columns, optionally grouped:
+    rows, sums, non-missing and non-zero counts, min/max, means
+    and mergeable quantile sketch (logarithmic buckets with relative
+    accuracy, exact zero bucket). Chunks are processed in one pass
+    with bincounts over group codes, results of chunks, threads
+    or processes can be merged.
+
+    Attributes
+    ----------
+    columns : list[str]
+        Summarized columns.
+    by : str
+        Group column, one group 'all' if None.
+    labels : list
+        Group labels in order of their first occurrence.
+    """
+
+    def __init__(self, columns, by=None, accuracy=ACCURACY):
+        self.columns = list(columns)
+        self.by = by
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.width = 4 * LIMIT + 3
+        self.labels = []
+        self.slots = {}
+        n = len(self.columns)
+        self.rows = numpy.zeros(0, dtype=numpy.int64)
+        self.sums = numpy.zeros((0, n))
+        self.counts = numpy.zeros((0, n), dtype=numpy.int64)
+        self.nonzero = numpy.zeros((0, n), dtype=numpy.int64)
+        self.mins = numpy.zeros((0, n))
+        self.maxs = numpy.zeros((0, n))
+        self.integer = [True] * n
+        # Sparse sketch of each column: sorted bucket keys and their counts
+        self.keys = [numpy.zeros(0, dtype=numpy.int64) for _ in self.columns]
+        self.weights = [numpy.zeros(0, dtype=numpy.int64) for _ in self.columns]
+
+    def slot(self, labels):
+        """
+        Slots of the group labels, new groups are appended
+        """
+        for label in labels:
+            if label not in self.slots:
+                self.slots[label] = len(self.labels)
+                self.labels.append(label)
+        grow = len(self.labels) - len(self.rows)
+        if grow:
+            n = len(self.columns)
+            self.rows = numpy.append(self.rows, numpy.zeros(grow, dtype=numpy.int64))
+            self.sums = numpy.vstack([self.sums, numpy.zeros((grow, n))])
+            self.counts = numpy.vstack([self.counts, numpy.zeros((grow, n), dtype=numpy.int64)])
+            self.nonzero = numpy.vstack([self.nonzero, numpy.zeros((grow, n), dtype=numpy.int64)])
+            self.mins = numpy.vstack([self.mins, numpy.full((grow, n), numpy.inf)])
+            self.maxs = numpy.vstack([self.maxs, numpy.full((grow, n), -numpy.inf)])
+        return numpy.array([self.slots[label] for label in labels], dtype=numpy.int64)
+
+    def bucket(self, values):
+        """
+        Signed sketch bucket of each value, 0 for zero (NaN must be removed)
+        """
+        with numpy.errstate(divide='ignore'):
+            index = numpy.ceil(numpy.log(numpy.abs(values)) / math.log(self.gamma))
+        index = numpy.clip(numpy.nan_to_num(index, neginf=-LIMIT), -LIMIT, LIMIT)
+        bucket = index.astype(numpy.int64) + LIMIT + 1
+        return numpy.where(values > 0, bucket, numpy.where(values < 0, -bucket, 0))
+
+    def update(self, chunk):
+        """
+        Add chunk of rows
+
+        Parameters
+        ----------
+        chunk : pd.DataFrame or dict{str: array-like}
+            Chunk with the summarized columns (and the group column).
+
+        Returns
+        -------
+        self : Summary
+        """
+        if self.by is None:
+            n = len(chunk[self.columns[0]])
+            groups = numpy.repeat(self.slot(["all"]), n)
+        else:
+            codes, labels = encode(chunk[self.by])
+            groups = numpy.append(self.slot(list(labels)), -1)[codes]
+        valid = groups >= 0
+        groups = groups[valid]
+        size = len(self.labels)
+        self.rows += numpy.bincount(groups, minlength=size)
+        order = numpy.argsort(groups, kind="stable")
+
+        for i, column in enumerate(self.columns):
+            values = numpy.asarray(chunk[column])[valid]
+            self.integer[i] &= values.dtype.kind in "iub"
+            values = values.astype(float)
+            present = ~numpy.isnan(values)
+            self.sums[:, i] += numpy.bincount(groups[present], weights=values[present],
+                                              minlength=size)
+            self.counts[:, i] += numpy.bincount(groups[present], minlength=size)
+            # NaN is non-zero as in df.astype(bool)
+            self.nonzero[:, i] += numpy.bincount(groups[values != 0], minlength=size)
+
+            # Min/max of sorted groups by reduceat (NaN ignored)
+            sorted_groups = groups[order]
+            starts = numpy.flatnonzero(numpy.r_[True, sorted_groups[1:] != sorted_groups[:-1]]) \
+                if len(sorted_groups) else numpy.zeros(0, dtype=numpy.int64)
+            if len(starts):
+                found = sorted_groups[starts]
+                self.mins[found, i] = numpy.fmin(self.mins[found, i],
+                                                 numpy.fmin.reduceat(values[order], starts))
+                self.maxs[found, i] = numpy.fmax(self.maxs[found, i],
+                                                 numpy.fmax.reduceat(values[order], starts))
+
+            keys = groups[present] * self.width + self.bucket(values[present]) + 2 * LIMIT + 1
+            self.add_sketch(i, keys, numpy.ones(len(keys), dtype=numpy.int64))
+        return self
+
+    def add_sketch(self, i, keys, weights):
+        """
+        Merge bucket keys and counts into the sketch of the column
+        """
+        keys, inverse = numpy.unique(numpy.concatenate([self.keys[i], keys]),
+                                     return_inverse=True)
+        self.weights[i] = numpy.bincount(inverse, weights=numpy.concatenate(
+            [self.weights[i], weights]), minlength=len(keys)).astype(numpy.int64)
+        self.keys[i] = keys
+
+    def merge(self, other):
+        """
+        Add results of other summary of the same columns
+
+        Returns
+        -------
+        self : Summary
+        """
+        if other.columns != self.columns or other.accuracy != self.accuracy:
+            raise ValueError("ERROR: summaries of different columns or accuracy")
+        slots = self.slot(other.labels)
+        self.rows[slots] += other.rows
+        self.sums[slots] += other.sums
+        self.counts[slots] += other.counts
+        self.nonzero[slots] += other.nonzero
+        self.mins[slots] = numpy.fmin(self.mins[slots], other.mins)
+        self.maxs[slots] = numpy.fmax(self.maxs[slots], other.maxs)
+        self.integer = [a and b for a, b in zip(self.integer, other.integer)]
+        for i in range(len(self.columns)):
+            group, bucket = numpy.divmod(other.keys[i], self.width)
+            self.add_sketch(i, slots[group] * self.width + bucket, other.weights[i])
+        return self
+
+    def total(self):
+        """
+        Summary of all groups together
+
+        Returns
+        -------
+        summary : Summary
+            Summary with one group 'all'
+        """
+        total = Summary(self.columns, None, self.accuracy)
+        total.slot(["all"])
+        total.rows[0] = self.rows.sum()
+        total.sums[0] = self.sums.sum(axis=0)
+        total.counts[0] = self.counts.sum(axis=0)
+        total.nonzero[0] = self.nonzero.sum(axis=0)
+        total.mins[0] = numpy.min(self.mins, axis=0, initial=numpy.inf)
+        total.maxs[0] = numpy.max(self.maxs, axis=0, initial=-numpy.inf)
+        total.integer = list(self.integer)
+        for i in range(len(self.columns)):
+            total.add_sketch(i, self.keys[i] % self.width, self.weights[i])
+        return total
+
+    def order(self):
+        """
+        Slots of the groups sorted by label
+        """
+        return numpy.asarray(pd.Index(self.labels).argsort(), dtype=numpy.int64)
+
+    def get(self, stat):
+        """
+        One statistic of all groups and columns
+
+        Parameters
+        ----------
+        stat : str
+            One of STATS.
+
+        Returns
+        -------
+        result : pd.DataFrame or pd.Series
+            Groups (sorted) x columns, 'rows' returns pd.Series
+        """
+        order = self.order()
+        index = pd.Index([self.labels[i] for i in order], name=self.by)
+        if stat == "rows":
+            return pd.Series(self.rows[order], index=index, name="rows")
+        if stat == "mean":
+            with numpy.errstate(divide='ignore', invalid='ignore'):
+                values = self.sums / self.counts
+        else:
+            values = {"sum": self.sums, "count": self.counts, "nonzero": self.nonzero,
+                      "min": self.mins, "max": self.maxs}[stat]
+        result = pd.DataFrame(values[order], index=index, columns=self.columns)
+        if stat in ("min", "max"):
+            result = result.replace([numpy.inf, -numpy.inf], numpy.nan)
+        if stat == "sum":
+            for column, integer in zip(self.columns, self.integer):
+                if integer:
+                    result[column] = result[column].round().astype(numpy.int64)
+        return result
+
+    def quantile(self, q):
+        """
+        Approximate quantile of all groups and columns from the sketch
+        (relative error <= accuracy, clipped to min/max,
+        rounded for integer columns)
+
+        Returns
+        -------
+        result : pd.DataFrame
+            Groups (sorted) x columns
+        """
+        result = numpy.full((len(self.labels), len(self.columns)), numpy.nan)
+        for i in range(len(self.columns)):
+            group, bucket = numpy.divmod(self.keys[i], self.width)
+            bucket = bucket - 2 * LIMIT - 1
+            cumulative = numpy.cumsum(self.weights[i])
+            starts = numpy.searchsorted(group, numpy.arange(len(self.labels)))
+            ends = numpy.searchsorted(group, numpy.arange(len(self.labels)), side="right")
+            for g in numpy.flatnonzero(ends > starts):
+                before = cumulative[starts[g] - 1] if starts[g] else 0
+                rank = q * (cumulative[ends[g] - 1] - before - 1)
+                found = starts[g] + numpy.searchsorted(
+                    cumulative[starts[g]:ends[g]] - before, rank, side="right")
+                result[g, i] = self.value(bucket[min(found, ends[g] - 1)])
+        result = numpy.clip(result, self.mins, self.maxs)
+        # Integer columns get the nearest integer of the bucket
+        result[:, self.integer] = numpy.round(result[:, self.integer])
+        order = self.order()
+        return pd.DataFrame(result[order], columns=self.columns,
+                            index=pd.Index([self.labels[i] for i in order], name=self.by))
+
+    def value(self, bucket):
+        """
+        Representative value of the signed sketch bucket
+        """
+        if bucket == 0:
+            return 0.0
+        index = abs(bucket) - LIMIT - 1
+        value = 2 * self.gamma ** index / (self.gamma + 1)
+        return value if bucket > 0 else -value
+
+    def frame(self, quantiles=QUANTILES):
+        """
+        All statistics in long format
+
+        Returns
+        -------
+        result : pd.DataFrame
+            One row per (group, column): rows, sum, count, nonzero,
+            min, max, mean and the quantiles q50, q90, ...
+        """
+        parts = {stat: self.get(stat).stack() for stat in STATS if stat != "rows"}
+        for q in quantiles:
+            parts[f"q{q * 100:g}"] = self.quantile(q).stack()
+        result = pd.DataFrame(parts)
+        result.index.names = [self.by or "group", "column"]
+        result.insert(0, "rows", self.get("rows").reindex(
+            result.index.get_level_values(0)).to_numpy())
+        return result.reset_index()
+
+
+def summarize(data, columns, by=None, accuracy=ACCURACY):
+    """
+    Summary of dataframe or of iterable of chunks in one pass
+
+    Parameters
+    ----------
+    data : pd.DataFrame or iterable[pd.DataFrame or dict{str: array-like}]
+        Whole data or chunks (e.g. pd.read_csv(..., chunksize=N)).
+    columns : list[str]
+        Summarized columns.
+    by : str
+        Group column (p12, region, ...).
+
+    Returns
+    -------
+    summary : Summary
+    """
+    summary = Summary(columns, by, accuracy)
+    if isinstance(data, (pd.DataFrame, dict)):
+        data = [data]
+    for chunk in data:
+        summary.update(chunk)
+    return summary
@@ -0,0 +1,304 @@
+"""
+| Project Implementation for IZV 2020/2021
+| Script synthetic.py
+| Date: 18.10.2026
+| Author: Mikhail Abramov
+| xabram00@stud.fit.vutbr.cz
+"""
+
+import os
+import zipfile
+import argparse
+import threading
+import numpy
+
+from functools import partial
+from datetime import datetime
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+from download import columns_codes, regions_files
+
+"""
+Accidents per year in the whole country (scale 1.0)
+"""
+NATIONAL_ROWS = 105_000
+
+"""
+Share of the accidents of each region
+"""
+REGION_WEIGHTS = {
+    "PHA": 0.190, "STC": 0.135, "JHC": 0.060, "PLK": 0.055, "ULK": 0.070,
+    "HKK": 0.050, "JHM": 0.100, "MSK": 0.100, "OLK": 0.050, "ZLK": 0.045,
+    "VYS": 0.040, "PAK": 0.040, "LBK": 0.035, "KVK": 0.030,
+}
+
+"""
+S-JTSK coordinates of the region centres (x, y)
+"""
+REGION_CENTRES = {
+    "PHA": (-742000, -1045000), "STC": (-730000, -1060000), "JHC": (-760000, -1160000),
+    "PLK": (-830000, -1080000), "ULK": (-770000, -980000), "HKK": (-630000, -1025000),
+    "JHM": (-595000, -1165000), "MSK": (-475000, -1110000), "OLK": (-545000, -1120000),
+    "ZLK": (-520000, -1175000), "VYS": (-640000, -1135000), "PAK": (-630000, -1065000),
+    "LBK": (-690000, -985000), "KVK": (-865000, -1015000),
+}
+
+"""
+Accident main causes (p12) grouped as in the reports
+"""
+CAUSES = numpy.concatenate(([100], numpy.arange(201, 210), numpy.arange(301, 312),
+                            numpy.arange(401, 415), numpy.arange(501, 517),
+                            numpy.arange(601, 616)))
+
+"""
+Street and place names of the text columns (cp1250 characters)
+"""
+WORDS = numpy.array(["Praha", "Brno-střed", "Žižkov", "Plzeň", "Ústí nad Labem",
+                     "České Budějovice", "Hradec Králové", "Olomouc", "Zlín", "Jihlava",
+                     "Pardubice", "Liberec", "Karlovy Vary", "Ostrava-Poruba",
+                     "Náměstí Míru", "Vinohradská", "GN_V0.1UIR_ADR", "Silnice I/3"])
+
+
+def integers(low, high, rng, n):
+    """
+    Uniform integer cells
+    """
+    return rng.integers(low, high, n).astype(str)
+
+
+def rare(values, probabilities, rng, n):
+    """
+    Integer cells with defined probabilities of the values
+    """
+    return rng.choice(numpy.asarray(values), n, p=probabilities).astype(str)
+
+
+def decimals(low, high, rng, n):
+    """
+    Uniform float cells with decimal comma as in the source tables
+    """
+    return numpy.char.replace(numpy.round(rng.uniform(low, high, n), 2).astype(str), ".", ",")
+
+
+def quoted(values):
+    """
+    Quote string cells
+    """
+    return numpy.char.add(numpy.char.add('"', values), '"')
+
+
+def generate_table(region, year, rows, rng, dirty=0.01, months=12, first_id=0):
+    """
+    Generate csv table of the region in the source layout
+    (64 columns, ';' delimiter, quoted strings, decimal comma)
+
+    Parameters
+    ----------
+    region : str
+        Region name.
+    year : int
+    rows : int
+        Number of accidents.
+    rng : numpy.random.Generator
+    dirty : float
+        Share of invalid cells (empty, non-numeric, out of range time).
+    months : int
+        Accidents are dated in the first `months` months of the year.
+    first_id : int
+        Sequence number of the first accident ID.
+
+    Returns
+    -------
+    lines : list[str]
+    """
+    region_number = int(regions_files[region].split(".")[0])
+    days = (numpy.datetime64(f"{year}-{months + 1:02d}-01") if months < 12
+            else numpy.datetime64(f"{year + 1}-01-01")) - numpy.datetime64(f"{year}-01-01")
+    dates = numpy.sort(numpy.datetime64(f"{year}-01-01") +
+                       rng.integers(0, days.astype(int), rows).astype("timedelta64[D]"))
+    weekdays = (dates.astype(numpy.int64) + 4) % 7
+    x, y = REGION_CENTRES[region]
+    n = rows
+
+    columns = {
+        "p1": quoted(numpy.char.zfill((region_number * 10 ** 10 + (year % 100) * 10 ** 8 +
+                                       first_id + numpy.arange(n)).astype(str), 12)),
+        "p36": integers(0, 9, rng, n),
+        "p37": numpy.where(rng.random(n) < 0.3, "", integers(1, 9999, rng, n)),
+        "p2a": quoted(dates.astype(str)),
+        "weekday(p2a)": weekdays.astype(str),
+        "p2b": quoted(numpy.char.add(numpy.char.zfill(integers(0, 24, rng, n), 2),
+                                     numpy.char.zfill(integers(0, 60, rng, n), 2))),
+        "p6": integers(0, 10, rng, n),
+        "p7": integers(0, 5, rng, n),
+        "p8": integers(0, 10, rng, n),
+        "p9": integers(1, 3, rng, n),
+        "p10": integers(0, 8, rng, n),
+        "p11": rare([0, 1, 2, 3, 4, 5, 6, 7, 8, 9],
+                    [0.70, 0.05, 0.10, 0.02, 0.04, 0.02, 0.02, 0.02, 0.02, 0.01], rng, n),
+        "p12": CAUSES[rng.integers(0, len(CAUSES), n)].astype(str),
+        "p13a": rare([0, 1, 2], [0.995, 0.004, 0.001], rng, n),
+        "p13b": rare([0, 1, 2], [0.97, 0.025, 0.005], rng, n),
+        "p13c": rare([0, 1, 2, 3], [0.80, 0.15, 0.04, 0.01], rng, n),
+        "p14": numpy.round(rng.gamma(1.5, 400, n)).astype(numpy.int64).astype(str),
+        "p53": numpy.round(rng.gamma(1.5, 300, n)).astype(numpy.int64).astype(str),
+        "d": decimals(x - 40000, x + 40000, rng, n),
+        "e": decimals(y - 40000, y + 40000, rng, n),
+        "a": decimals(-1000, 1000, rng, n),
+        "b": decimals(-1000, 1000, rng, n),
+        "f": decimals(-1000, 1000, rng, n),
+        "g": decimals(-1000, 1000, rng, n),
+        "p5a": rare([1, 2], [0.6, 0.4], rng, n),
+    }
+    for code in ("h", "i", "j", "k", "l", "n", "o", "p", "q", "r", "s", "t"):
+        columns[code] = quoted(WORDS[rng.integers(0, len(WORDS), n)])
+    # Other classification columns are small integers
+    for code in columns_codes.values():
+        if code not in columns and code != "region":
+            columns[code] = integers(0, 10, rng, n)
+
+    if dirty:
+        for code in list(columns):
+            if code in ("p1", "p2a", "weekday(p2a)"):
+                continue
+            # Object arrays, invalid values can be longer than the valid ones
+            values = columns[code] = columns[code].astype(object)
+            broken = rng.random(n) < dirty
+            if code == "p2b":
+                # Time out of range: hour > 24 or minutes > 59
+                values[broken] = rng.choice(['"2560"', '"1299"', '""'], broken.sum())
+            elif code in ("a", "b", "d", "e", "f", "g"):
+                values[broken] = rng.choice(['""', '"A:"', "1,2,3"], broken.sum())
+            elif code not in ("h", "i", "j", "k", "l", "n", "o", "p", "q", "r", "s", "t"):
+                values[broken] = rng.choice(['""', '"XX"', "", "?"], broken.sum())
+
+    order = [columns_codes[i] for i in range(1, 65)]
+    return [";".join(row) for row in zip(*(columns[code].tolist() for code in order))]
+
+
+def generate_archives(folder, scale=1.0, years=None, month=None, dirty=0.01,
+                      duplicates=0.001, seed=0):
+    """
+    Generate yearly archives (datagis-rok-{year}.zip) for finished years,
+    monthly archive (datagis-{month}-{year}.zip) for the last year
+    and listing page (index.html) readable by ArchiveCatalog.
+    A share of the accidents of each year is repeated in the next year
+    archive (late reports), so parsing has to de-duplicate them by ID.
+
+    Parameters
+    ----------
+    folder : str
+        Output folder.
+    scale : float
+        Multiple of the national volume (1.0, 10.0, 100.0, or 0.01 for quick runs).
+    years : list[int]
+        Generated years, 2016 .. current year if None.
+    month : int
+        Last month of the last year, yearly archive if None.
+    dirty : float
+        Share of invalid cells.
+    duplicates : float
+        Share of the accidents repeated in the next year archive.
+    seed : int
+        Random generator seed (the same seed gives the same archives).
+
+    Returns
+    -------
+    names : list[str]
+        Generated archive names
+    """
+    rng = numpy.random.default_rng(seed)
+    years = list(years or range(2016, datetime.now().year + 1))
+    os.makedirs(folder, exist_ok=True)
+    names = []
+    previous = {}
+    for year in years:
+        last = year == years[-1] and month is not None
+        name = f"datagis-{month}-{year}.zip" if last else f"datagis-rok-{year}.zip"
+        tables = {}
+        for region, weight in REGION_WEIGHTS.items():
+            rows = max(1, int(NATIONAL_ROWS * scale * weight * ((month or 12) / 12 if last else 1)))
+            lines = generate_table(region, year, rows, rng, dirty, month if last else 12)
+            late = previous.get(region, [])
+            if late:
+                late = [late[i] for i in rng.choice(len(late), int(len(late) * duplicates),
+                                                     replace=False)]
+            tables[region] = late + lines
+            previous[region] = lines
+        with zipfile.ZipFile(os.path.join(folder, name), "w", zipfile.ZIP_DEFLATED) as zf:
+            for region, lines in tables.items():
+                zf.writestr(regions_files[region], ("\r\n".join(lines) + "\r\n").encode("cp1250"))
+        names.append(name)
+        print(f"...Generated {folder}/{name} ({sum(len(t) for t in tables.values())} rows)")
+
+    listing = "".join(f'<tr><td><a href="{name}">{name}</a></td>'
+                      f'<td>{datetime.fromtimestamp(os.path.getmtime(os.path.join(folder, name))):%Y-%m-%d %H:%M}</td>'
+                      f'<td>{os.path.getsize(os.path.join(folder, name))}</td></tr>\n'
+                      for name in names)
+    with open(os.path.join(folder, "index.html"), "w") as f:
+        f.write(f"<html><body><table>\n{listing}</table></body></html>\n")
+    return names
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    """
+    Static file handler without request logging
+    """
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(folder, port=0):
+    """
+    Serve the folder by local HTTP server in background thread
+
+    Parameters
+    ----------
+    folder : str
+    port : int
+        Server port, random free port if 0.
+
+    Returns
+    -------
+    server : ThreadingHTTPServer
+        Running server (stop it by server.shutdown())
+    url : str
+        Listing url for DataDownloader
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port),
+                                 partial(QuietHandler, directory=os.path.abspath(folder)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+if __name__ == "__main__":
+    """
+    Main:
+        generate synthetic archives and optionally serve them
+    """
+    parser = argparse.ArgumentParser(description='Generate synthetic accident archives.')
+    parser.add_argument('folder', nargs='?', default='synthetic',
+                        help='Output folder')
+    parser.add_argument('-x', '--scale', type=float, default=1.0,
+                        help='Multiple of the national volume (1, 10, 100)')
+    parser.add_argument('-y', '--years', type=int, nargs='+', default=None,
+                        help='Generated years, 2016 .. current year if not set')
+    parser.add_argument('-m', '--month', type=int, default=None,
+                        help='Last month of the last year (monthly archive)')
+    parser.add_argument('-d', '--dirty', type=float, default=0.01,
+                        help='Share of invalid cells')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Random generator seed')
+    parser.add_argument('--serve', type=int, default=None, metavar='PORT',
+                        help='Serve generated archives on the port')
+    parsed_args = parser.parse_args()
+    generate_archives(parsed_args.folder, parsed_args.scale, parsed_args.years,
+                      parsed_args.month, parsed_args.dirty, seed=parsed_args.seed)
+    if parsed_args.serve is not None:
+        http_server, listing_url = serve(parsed_args.folder, parsed_args.serve)
+        print(f"Serving {listing_url} (Ctrl+C to stop)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            http_server.shutdown()
@@ -0,0 +1,81 @@
+"""
+| Project Implementation for IZV 2020/2021
+| Script test_aggregate.py
+| Date: 18.10.2026
+| Author: Mikhail Abramov
+| xabram00@stud.fit.vutbr.cz
+"""
+
+import numpy
+import pandas as pd
+import pytest
+
+from aggregate import crosstab, groupby_agg
+
+
+@pytest.fixture
+def df():
+    """
+    Accidents-like dataframe with categorical region (two unused categories),
+    integer and float measures and missing values
+    """
+    rng = numpy.random.default_rng(0)
+    rows = 500
+    df = pd.DataFrame({
+        'region': pd.Categorical(rng.choice(['JHM', 'PHA', 'ZLK'], rows),
+                                 categories=['JHM', 'KVK', 'PHA', 'VYS', 'ZLK']),
+        'p12': rng.choice([100, 201, 202, 301, 501], rows),
+        'p16': rng.integers(0, 9, rows),
+        'date': pd.Timestamp('2019-01-01') + pd.to_timedelta(rng.integers(0, 24, rows) * 31, 'D'),
+        'p1': numpy.arange(rows),
+        'p13a': rng.integers(0, 3, rows),
+        'p53': rng.normal(100, 10, rows),
+    })
+    df.loc[rng.random(rows) < 0.05, 'p53'] = numpy.nan
+    df['p53'] = df['p53'].astype(float)
+    return df
+
+
+def plain(df, by):
+    """
+    Key columns as plain arrays (categorical dtype is not kept by groupby_agg)
+    """
+    df = df.reset_index(drop=True)
+    for column in by:
+        df[column] = numpy.asarray(df[column])
+    return df
+
+
+@pytest.mark.parametrize('by', [['p12'], ['region'], ['region', 'p12'], ['p12', 'region']])
+@pytest.mark.parametrize('observed', [False, True])
+def test_groupby_agg(df, by, observed):
+    """
+    Same groups and values as pandas groupby, including empty
+    combinations of unused categories
+    """
+    agg = {'p13a': 'sum', 'p53': 'sum', 'p1': 'count'}
+    expected = df.groupby(by, as_index=False, observed=observed).agg(agg)
+    result = groupby_agg(df, by, agg, observed=observed)
+    pd.testing.assert_frame_equal(plain(result, by), plain(expected, by))
+
+
+def test_groupby_agg_empty_categories(df):
+    """
+    Unused categories are kept as rows of zeros unless observed is set
+    """
+    result = groupby_agg(df, ['region'], {'p13a': 'sum', 'p1': 'count'})
+    assert list(result['region']) == ['JHM', 'KVK', 'PHA', 'VYS', 'ZLK']
+    assert result.set_index('region').loc[['KVK', 'VYS']].eq(0).all(axis=None)
+    result = groupby_agg(df, ['region'], {'p13a': 'sum'}, observed=True)
+    assert list(result['region']) == ['JHM', 'PHA', 'ZLK']
+
+
+@pytest.mark.parametrize('index', [['date'], ['p12', 'date']])
+def test_crosstab(df, index):
+    """
+    Same table as pd.crosstab
+    """
+    expected = pd.crosstab(index=[df[c] for c in index], columns=df['p16'])
+    result = crosstab([df[c] for c in index], df['p16'])
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_names=False)
+    assert list(result.index.names) == index and result.columns.name == 'p16'
@@ -0,0 +1,80 @@
+"""
+| Project Implementation for IZV 2020/2021
+| Script test_binning.py
+| Date: 18.10.2026
+| Author: Mikhail Abramov
+| xabram00@stud.fit.vutbr.cz
+"""
+
+import os
+import numpy
+import pandas as pd
+import pytest
+
+from binning import BINS, BinCodes, Bins, CAUSES, DAMAGE
+
+
+def reference(values, bins):
+    """
+    Labels of plot_damage: pd.cut with IntervalIndex and renamed categories
+    """
+    intervals = [(low, high) for low, high in zip(bins.lows, bins.highs)]
+    index = pd.IntervalIndex.from_tuples(intervals)
+    return pd.Categorical(pd.CategoricalIndex(pd.cut(values, index)).rename_categories(
+        {interval: name for interval, name in zip(index.values, bins.labels)}))
+
+
+@pytest.fixture
+def df():
+    """
+    p12 codes of all groups and outside of them, p53 with edges and NaN
+    """
+    rng = numpy.random.default_rng(0)
+    rows = 2000
+    p53 = rng.choice([-5, -1, 0, 499.99, 500, 1999.99, 2000, 4999.99, 5000, 10000, 10001,
+                      numpy.nan], rows)
+    p53[:1000] = rng.uniform(-2, 20000, 1000)
+    return pd.DataFrame({'p12': rng.integers(90, 620, rows),
+                         'p53': p53})
+
+
+@pytest.mark.parametrize('column, bins', [('p12', CAUSES), ('p53', DAMAGE)])
+def test_codes(df, column, bins):
+    """
+    Labels equal pd.cut, values outside of the intervals and NaN are missing
+    """
+    expected = reference(df[column], bins)
+    result = bins.categorical(df[column])
+    assert list(result.categories) == list(expected.categories)
+    numpy.testing.assert_array_equal(result.codes, expected.codes)
+
+
+def test_unsorted_intervals():
+    """
+    Intervals are sorted by upper edge, labels follow them
+    """
+    bins = Bins([(10, 20), (0, 5)], ['high', 'low'])
+    values = pd.Series([0, 3, 5, 7, 10, 15, 20, 21])
+    assert list(pd.Series(bins.categorical(values)).astype(object).fillna('-')) == \
+        ['-', 'low', 'low', '-', '-', 'high', 'high', '-']
+
+
+def test_for_file(df, tmp_path):
+    """
+    Codes are cached next to the file and recomputed when the file is rewritten
+    """
+    filename = str(tmp_path / 'accidents.pkl.gz')
+    df.to_pickle(filename)
+    codes = BinCodes.for_file(filename)
+    assert os.path.isfile(f'{filename}.bins.npz')
+    cached = BinCodes.for_file(filename)
+    assert cached.source == codes.source
+    for column in BINS:
+        numpy.testing.assert_array_equal(cached.codes[column], codes.codes[column])
+    rows = numpy.array([3, 1, 2])
+    numpy.testing.assert_array_equal(cached.categorical('p12', rows).codes,
+                                     reference(df['p12'], CAUSES).codes[rows])
+
+    df.iloc[:500].to_pickle(filename)
+    os.utime(filename, ns=(0, os.stat(filename).st_mtime_ns + 1))
+    assert len(BinCodes.for_file(filename).codes['p53']) == 500
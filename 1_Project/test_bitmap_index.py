@@ -0,0 +1,73 @@
+"""
+| Project Implementation for IZV 2020/2021
+| Script test_bitmap_index.py
+| Date: 18.10.2026
+| Author: Mikhail Abramov
+| xabram00@stud.fit.vutbr.cz
+"""
+
+import os
+import numpy
+import pandas as pd
+import pytest
+
+from bitmap_index import BitmapIndex
+
+
+@pytest.fixture
+def df():
+    """
+    Dataframe with region strings, integer codes and row count not divisible by 8
+    """
+    rng = numpy.random.default_rng(0)
+    rows = 1003
+    return pd.DataFrame({'region': rng.choice(['JHM', 'PHA', 'ZLK', 'OLK'], rows),
+                         'p5a': rng.integers(1, 3, rows),
+                         'p12': rng.choice([100, 201, 202, 209, 301, 501, 601], rows)})
+
+
+@pytest.mark.parametrize('column, values', [('region', ['JHM']), ('region', ['PHA', 'OLK']),
+                                            ('p12', [201, 202, 203, 209]), ('p12', [999]),
+                                            ('p5a', [1, 2])])
+def test_isin(df, column, values):
+    """
+    Bitmap of the values selects the same rows as Series.isin
+    """
+    index = BitmapIndex.from_dataframe(df, ['region', 'p5a', 'p12'])
+    bitmap = index.isin(column, values)
+    expected = df[column].isin(values).to_numpy()
+    numpy.testing.assert_array_equal(bitmap.mask(), expected)
+    numpy.testing.assert_array_equal(bitmap.rows(), numpy.flatnonzero(expected))
+    assert bitmap.count() == expected.sum()
+
+
+def test_combine(df):
+    """
+    AND, OR and NOT of bitmaps equal boolean mask operations (padding stays clear)
+    """
+    index = BitmapIndex.from_dataframe(df, ['region', 'p5a'])
+    jhm = df['region'].eq('JHM').to_numpy()
+    inside = df['p5a'].eq(1).to_numpy()
+    numpy.testing.assert_array_equal(index.select(region=['JHM'], p5a=[1]).mask(), jhm & inside)
+    numpy.testing.assert_array_equal((index.eq('region', 'JHM') | index.eq('p5a', 1)).mask(),
+                                     jhm | inside)
+    negation = ~index.eq('region', 'JHM')
+    numpy.testing.assert_array_equal(negation.mask(), ~jhm)
+    assert negation.count() == (~jhm).sum()
+    assert index.all().count() == len(df) and index.empty().count() == 0
+
+
+def test_for_file(df, tmp_path):
+    """
+    Index is cached next to the file and rebuilt when the file is rewritten
+    """
+    filename = str(tmp_path / 'accidents.pkl.gz')
+    df.to_pickle(filename)
+    index = BitmapIndex.for_file(filename, ['region', 'p5a'])
+    cached = BitmapIndex.for_file(filename, ['region', 'p5a'])
+    assert os.path.isfile(f'{filename}.bitmaps.npz') and cached.source == index.source
+    numpy.testing.assert_array_equal(cached.eq('region', 'PHA').mask(), df['region'].eq('PHA'))
+
+    df.iloc[:500].to_pickle(filename)
+    os.utime(filename, ns=(0, os.stat(filename).st_mtime_ns + 1))
+    assert BitmapIndex.for_file(filename, ['region']).size == 500
@@ -0,0 +1,93 @@
+"""
+| Project Implementation for IZV 2020/2021
+| Script test_block_store.py
+| Date: 18.10.2026
+| Author: Mikhail Abramov
+| xabram00@stud.fit.vutbr.cz
+"""
+
+import numpy
+
+import block_store
+
+
+def save(path, data, block_rows=block_store.BLOCK_ROWS):
+    """
+    Write data object into block store file
+    """
+    with open(path, "wb") as f:
+        block_store.write(f, data, block_rows, codec="gzip-1")
+    return str(path)
+
+
+def sample(rows=1000):
+    """
+    Date-sorted data object with float, integer, date and string columns
+    """
+    rng = numpy.random.default_rng(0)
+    dates = numpy.sort(numpy.datetime64("2016-01-01") + rng.integers(0, 1500, rows))
+    return (["YYYY-MM-DD", "x", "p13a", "region"],
+            [dates, rng.normal(size=rows), rng.integers(0, 5, rows),
+             rng.choice(numpy.array(["PHA", "JHM", "ZLK"]), rows)])
+
+
+def test_round_trip(tmp_path):
+    """
+    All blocks read back equal the written data
+    """
+    data = sample()
+    path = save(tmp_path / "cache.blk", data, block_rows=100)
+    names, arrays = block_store.read(path)
+    assert names == data[0]
+    for array, expected in zip(arrays, data[1]):
+        assert array.dtype == expected.dtype
+        numpy.testing.assert_array_equal(array, expected)
+    names, arrays = block_store.read(path, ["region", "x"])
+    assert names == ["region", "x"]
+    numpy.testing.assert_array_equal(arrays[0], data[1][3])
+
+
+def test_where(tmp_path):
+    """
+    Range filters return the same rows as a full scan and prune blocks
+    """
+    data = sample()
+    path = save(tmp_path / "cache.blk", data, block_rows=100)
+    dates, x = data[1][0], data[1][1]
+    low, high = numpy.datetime64("2017-03-01"), numpy.datetime64("2017-09-30")
+
+    _, arrays = block_store.read(path, where={"YYYY-MM-DD": ("2017-03-01", "2017-09-30")})
+    numpy.testing.assert_array_equal(arrays[0], dates[(dates >= low) & (dates <= high)])
+    _, arrays = block_store.read(path, ["x"], where={"x": (0.5, None)})
+    numpy.testing.assert_array_equal(arrays[0], x[x >= 0.5])
+    _, arrays = block_store.read(path, ["x"], where={"YYYY-MM-DD": ("2030-01-01", None)})
+    assert arrays[0].dtype == x.dtype and not len(arrays[0])
+
+    with open(path, "rb") as f:
+        footer = block_store.read_footer(f)
+    selected = block_store.select_blocks(footer, {"YYYY-MM-DD": ("2017-03-01", "2017-09-30")})
+    assert 0 < selected.sum() < len(selected)
+
+
+def test_where_missing(tmp_path):
+    """
+    NaN and NaT values do not hide the other rows of their block,
+    blocks of missing values only are not pruned
+    """
+    data = (["x", "d"],
+            [numpy.array([1., numpy.nan, 5., numpy.nan, numpy.nan]),
+             numpy.array(["2019-01-01", "NaT", "2020-01-01", "NaT", "NaT"], dtype="datetime64[ns]")])
+    path = save(tmp_path / "cache.blk", data, block_rows=3)
+
+    _, arrays = block_store.read(path, where={"x": (4, 6)})
+    numpy.testing.assert_array_equal(arrays[0], [5.])
+    _, arrays = block_store.read(path, ["d"], where={"d": ("2019-06-01", None)})
+    numpy.testing.assert_array_equal(arrays[0], numpy.array(["2020-01-01"], dtype="datetime64[ns]"))
+
+    with open(path, "rb") as f:
+        footer = block_store.read_footer(f)
+    mins, maxs = footer["zones"]["x"]
+    assert (mins[0], maxs[0]) == (1., 5.)
+    assert numpy.isnan(mins[1]) and numpy.isnan(maxs[1])
+    assert block_store.select_blocks(footer, {"x": (4, 6)}).all()
+    assert block_store.select_blocks(footer, {"d": (None, "2018-01-01")}).tolist() == [False, True]
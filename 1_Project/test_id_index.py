@@ -0,0 +1,52 @@
+"""
+| Project Implementation for IZV 2020/2021
+| Script test_id_index.py
+| Date: 18.10.2026
+| Author: Mikhail Abramov
+| xabram00@stud.fit.vutbr.cz
+"""
+
+import numpy
+import pandas as pd
+import pytest
+
+from id_index import IdIndex, deduplicate
+
+
+@pytest.mark.parametrize('kind', ['int', 'str'])
+def test_deduplicate(kind):
+    """
+    Kept rows equal pandas drop_duplicates of rows sorted by archive rank
+    (newest archive wins, last row wins within one archive)
+    """
+    rng = numpy.random.default_rng(0)
+    rows = 3000
+    ids = rng.integers(0, 2000, rows) + 10 ** 11
+    ids = ids if kind == 'int' else numpy.char.add('A', ids.astype(str))
+    rank = rng.integers(0, 3, rows)
+    keep, duplicates = deduplicate(ids, rank)
+
+    df = pd.DataFrame({'id': ids, 'rank': rank, 'row': numpy.arange(rows)})
+    expected = df.sort_values(['rank', 'row'], kind='stable').drop_duplicates('id', keep='last')
+    numpy.testing.assert_array_equal(keep, numpy.sort(expected['row'].to_numpy()))
+    assert duplicates == rows - len(expected)
+
+
+def test_lookup(tmp_path):
+    """
+    Lookup returns the row of each ID, -1 for unknown IDs, index survives save/load
+    """
+    ids = numpy.array(['190000000003', '190000000001', '190000000002'])
+    index = IdIndex.build(ids, source='stamp')
+    assert index.keys.dtype == numpy.int64
+    numpy.testing.assert_array_equal(index.lookup(['190000000002', '190000000003', '42']),
+                                     [2, 0, -1])
+    numpy.testing.assert_array_equal(index.lookup('190000000001'), [1])
+    numpy.testing.assert_array_equal(index.lookup(['not an id']), [-1])
+
+    path = str(tmp_path / 'ids.npz')
+    index.save(path)
+    loaded = IdIndex.load(path)
+    assert loaded.source == 'stamp'
+    numpy.testing.assert_array_equal(loaded.lookup(ids), [0, 1, 2])
+    numpy.testing.assert_array_equal(IdIndex.build([]).lookup([1]), [-1])
@@ -0,0 +1,82 @@
+"""
+| Project Implementation for IZV 2020/2021
+| Script test_summary.py
+| Date: 18.10.2026
+| Author: Mikhail Abramov
+| xabram00@stud.fit.vutbr.cz
+"""
+
+import numpy
+import pandas as pd
+import pytest
+
+from summary import ACCURACY, summarize
+
+COLUMNS = ['p13a', 'p13b', 'p13c', 'p53']
+
+
+@pytest.fixture
+def df():
+    """
+    Injured persons counts, skewed damage with zeros and NaN, cause groups
+    """
+    rng = numpy.random.default_rng(0)
+    rows = 5000
+    p53 = numpy.round(rng.lognormal(6, 1.5, rows))
+    p53[rng.random(rows) < 0.2] = 0
+    p53[rng.random(rows) < 0.01] = numpy.nan
+    return pd.DataFrame({'p12': rng.choice([100, 201, 301, 501], rows),
+                         'p13a': (rng.random(rows) < 0.02).astype(int),
+                         'p13b': rng.poisson(0.1, rows),
+                         'p13c': rng.poisson(0.5, rows),
+                         'p53': p53})
+
+
+def test_counts(df):
+    """
+    Totals equal make_counts: len(df), df.sum() and df.astype(bool).sum()
+    """
+    total = summarize(df, COLUMNS).total()
+    assert total.get('rows').iloc[0] == len(df.index)
+    pd.testing.assert_series_equal(total.get('sum').iloc[0], df[COLUMNS].sum(),
+                                   check_names=False, check_dtype=False)
+    pd.testing.assert_series_equal(total.get('nonzero').iloc[0], df[COLUMNS].astype(bool).sum(),
+                                   check_names=False)
+
+
+def test_groups(df):
+    """
+    Grouped statistics equal pandas groupby
+    """
+    summary = summarize(df, COLUMNS, by='p12')
+    grouped = df.groupby('p12')[COLUMNS]
+    pd.testing.assert_series_equal(summary.get('rows'), grouped.size(), check_names=False)
+    for stat in ('sum', 'count', 'min', 'max', 'mean'):
+        pd.testing.assert_frame_equal(summary.get(stat), grouped.agg(stat),
+                                      check_dtype=False, check_names=False)
+    assert summary.get('sum')['p13c'].dtype == numpy.int64
+
+
+@pytest.mark.parametrize('q', [0.1, 0.5, 0.9, 0.99])
+def test_quantile(df, q):
+    """
+    Sketch quantiles are within the relative accuracy of the exact ones
+    """
+    summary = summarize(df, ['p53'], by='p12')
+    result = summary.quantile(q)['p53']
+    for group, values in df.groupby('p12')['p53']:
+        values = numpy.sort(values.dropna().to_numpy())
+        exact = values[int(numpy.floor(q * (len(values) - 1)))]
+        assert abs(result[group] - exact) <= ACCURACY * abs(exact) + 0.5
+
+
+def test_chunks(df):
+    """
+    Chunks and merged partial summaries give the same result as one pass
+    """
+    whole = summarize(df, COLUMNS, by='p12').frame()
+    chunks = summarize((df.iloc[i:i + 700] for i in range(0, len(df), 700)), COLUMNS, by='p12')
+    pd.testing.assert_frame_equal(chunks.frame(), whole)
+    merged = summarize(df.iloc[:2000], COLUMNS, by='p12').merge(
+        summarize(df.iloc[2000:], COLUMNS, by='p12'))
+    pd.testing.assert_frame_equal(merged.frame(), whole)
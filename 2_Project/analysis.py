@@ -15,14 +15,31 @@ import pandas as pd
 import seaborn as sns
 import numpy as np
 import os
+import sys
 import gzip
 import pickle
 
+# Data layer modules from 1_Project
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, '1_Project'))
+from parquet_store import is_parquet, read_accidents  # noqa: E402
+from aggregate import groupby_agg, crosstab  # noqa: E402
+from cube import AccidentCube  # noqa: E402
+from bitmap_index import BitmapIndex  # noqa: E402
+from binning import BinCodes, CAUSES, DAMAGE  # noqa: E402
+from profiling import profiled  # noqa: E402
+from figure_cache import cached_figure  # noqa: E402
+from storage import tag, file_stamp  # noqa: E402
 
-def get_dataframe(filename: str, verbose: bool = False) -> pd.DataFrame:
+
+@profiled(rows='return')
+def get_dataframe(filename: str, verbose: bool = False,
+                  columns: list = None, regions: list = None,
+                  years: list = None) -> pd.DataFrame:
     """
     get_dataframe
-        - Reading the incoming dataframe from the pickle.gz file.
+        - Reading the incoming dataframe from the pickle.gz file
+          or from the Parquet dataset (only needed partitions and columns).
         - Rename 'p2p' column to date and change datatype to datetime64[ns].
         - Copy region column.
         - Replace empty strings to np.NaN and save as category datatype
@@ -33,8 +50,15 @@ def get_dataframe(filename: str, verbose: bool = False) -> pd.DataFrame:
     ----------
     filename : str
         Directory and filename of dataframe in pickle.gz format
+        or Parquet dataset folder
     verbose : bool
         Verbose parameter to print out information about dataframes size
+    columns : list
+        Needed columns (p1, p2a, region, ...), all columns if None
+    regions : list
+        Needed regions, all regions if None
+    years : list
+        Needed years, all years if None
 
     Returns
     -------
@@ -42,10 +66,20 @@ def get_dataframe(filename: str, verbose: bool = False) -> pd.DataFrame:
         new dataframe, lightweight and ready for further processing
     """
 
-    # Reading the incoming dataframe from the pickle.gz file
+    # Reading the incoming dataframe from the Parquet dataset or pickle.gz file
     try:
-        with gzip.open(filename) as cache:
-            raw_df = pickle.load(cache)
+        if is_parquet(filename):
+            raw_df = read_accidents(filename, columns, regions, years)
+        else:
+            with gzip.open(filename) as cache:
+                raw_df = pickle.load(cache)
+            if regions is not None:
+                raw_df = raw_df.loc[raw_df['region'].isin(regions)]
+            if years is not None:
+                raw_df = raw_df.loc[pd.to_datetime(raw_df['p2a'], errors='coerce'
+                                                   ).dt.year.isin(years)]
+            if columns is not None:
+                raw_df = raw_df[columns]
         df = pd.DataFrame()
     except:
         raise OSError(f"ERROR: {filename} not found or has the wrong format")
@@ -74,42 +108,51 @@ def get_dataframe(filename: str, verbose: bool = False) -> pd.DataFrame:
             ns = round(df.memory_usage(deep=True).sum()/1_048_576, 1)
             print(f'orig_size={os} MB')
             print(f'new_size={ns} MB')
+        # Fingerprint of the data for the figure cache
+        if not is_parquet(filename):
+            tag(df, file_stamp(filename), columns, regions, years)
         return df
     except:
         raise NotImplementedError(f"ERROR: OoOops something went wrong...")
 
 
+@profiled(rows='df')
+@cached_figure()
 def plot_conseq(df: pd.DataFrame, fig_location: str = None,
                 show_figure: bool = False):
     """
     plot_conseq
         - Prepare appropriate dataframe with functions:
-            pd.melt, groupby, agg(sum/count).
+            pd.melt, groupby_agg(sum/count) bincount kernel.
         - Show/Save bar blot for each parameter:
             p13a, p13b, p13c, total accidents by regions.
 
     Parameters
     ----------
-    df : pd.DataFrame
-        Incoming dataframe
+    df : pd.DataFrame or AccidentCube
+        Incoming dataframe or materialized data cube
     fig_location : str
         Directory and filename to save figure
     show_figure : bool
         True/False parameter to choose possibility to show the figure
     """
 
-    # Select needed columns
-    df = df[['p1', 'region', 'p13a', 'p13b', 'p13c']]
-    # Detect some -1 value in p13a, p13b and p13c and replace to 0
-    df = df.replace({'p13a': -1, 'p13b': -1, 'p13c': -1}, 0)
-    # Rename column region for future needs
-    df = df.rename(columns={'region': 'Regions'})
-    # Group future variables value and aggregate it in the needed way
-    df = df.groupby(['Regions'], as_index=False).agg({
-                                    'p13a': 'sum',
-                                    'p13b': 'sum',
-                                    'p13c': 'sum',
-                                    'p1': 'count'})
+    if isinstance(df, AccidentCube):
+        # Take aggregates from the cube (-1 values are not summed in cube)
+        df = df.rollup(['region'], ['p13a', 'p13b', 'p13c', 'count']
+                       ).rename(columns={'region': 'Regions', 'count': 'p1'})
+    else:
+        # Select needed columns
+        df = df[['p1', 'region', 'p13a', 'p13b', 'p13c']]
+        # Detect some -1 value in p13a, p13b and p13c and replace to 0
+        df = df.replace({'p13a': -1, 'p13b': -1, 'p13c': -1}, 0)
+        # Rename column region for future needs
+        df = df.rename(columns={'region': 'Regions'})
+        # Group future variables value and aggregate it in the needed way
+        df = groupby_agg(df, ['Regions'], {'p13a': 'sum',
+                                           'p13b': 'sum',
+                                           'p13c': 'sum',
+                                           'p1': 'count'})
     # Melt dataframe to see variable and value in better view form
     df = pd.melt(df,
                  id_vars='Regions',
@@ -167,12 +210,15 @@ def plot_conseq(df: pd.DataFrame, fig_location: str = None,
     plt.close()
 
 
+@profiled(rows='df')
+@cached_figure(ignore=('bitmaps', 'bins'))
 def plot_damage(df: pd.DataFrame, fig_location: str = None,
-                show_figure: bool = False):
+                show_figure: bool = False, bitmaps: BitmapIndex = None,
+                bins: BinCodes = None):
     """
     plot_damage
         - Prepare appropriate dataframe with functions:
-                pd.cut, groupby, agg(sum/count).
+                precompiled bins, groupby, agg(sum/count).
         - Show the number of accidents depending on damage to vehicles (p53)
           stated in thousands CZK, what will be divided into several classes.
 
@@ -184,46 +230,27 @@ def plot_damage(df: pd.DataFrame, fig_location: str = None,
         Directory and filename to save figure
     show_figure : bool
         True/False parameter to choose possibility to show the figure
+    bitmaps : BitmapIndex
+        Bitmap index built for the rows of df (e.g. BitmapIndex.for_file),
+        used instead of scanning region column
+    bins : BinCodes
+        Bin codes computed for the rows of df (e.g. BinCodes.for_file),
+        used instead of binning p12 and p53 columns
     """
 
-    # Select needed regions and columns
-    df = df[['region', 'p12', 'p53']]
-    df = df.loc[df['region'].isin(['JHM', 'HKK', 'PLK', 'PHA'])]
-    # Prepare p12 bins
-    p12 = ['Not caused by the driver',
-           'Speeding',
-           'Incorrect overtaking',
-           'Not giving priority in driving',
-           'Wrong way of driving',
-           'Technical defect of the vehicle']
-    bins = [(99, 100),
-            (200, 209),
-            (300, 311),
-            (400, 414),
-            (500, 516),
-            (600, 616)]
-    index = pd.IntervalIndex.from_tuples(bins)
-    df['p12'] = pd.CategoricalIndex(pd.cut(df['p12'], index)
-                                    ).rename_categories(
-                                     {interval: name for interval,
-                                      name in zip(index.values, p12)})
-    # Prepare p53b bins
-    p53 = ['<50',
-           '50-199',
-           '200-499',
-           '500-1000',
-           '>1000']
-    # Convert data from hundreds to thousends 500h -> 50th
-    bins = [(-1, 499.99),
-            (499.99, 1999.99),
-            (1999.99, 4999.99),
-            (4999.99, 10000),
-            (10000, float('inf'))]
-    index = pd.IntervalIndex.from_tuples(bins)
-    df['p53b'] = pd.CategoricalIndex(pd.cut(df['p53'], index)
-                                     ).rename_categories(
-                                      {interval: name for interval,
-                                       name in zip(index.values, p53)})
+    # Select needed regions (with bitmap index if available) and columns
+    if bitmaps is not None:
+        rows = bitmaps.isin('region', ['JHM', 'HKK', 'PLK', 'PHA']).rows()
+    else:
+        rows = np.flatnonzero(df['region'].isin(['JHM', 'HKK', 'PLK', 'PHA']))
+    df = df.iloc[rows][['region', 'p12', 'p53']]
+    # Cause groups (p12) and damage classes (p53b, hundreds -> thousands CZK)
+    if bins is not None:
+        df['p12'] = bins.categorical('p12', rows)
+        df['p53b'] = bins.categorical('p53', rows)
+    else:
+        df['p12'] = CAUSES.categorical(df['p12'])
+        df['p53b'] = DAMAGE.categorical(df['p53'])
     # Group by objects to get better view
     df = df.groupby(['region', 'p53b', 'p12']
                     ).agg({'p53': 'count'}).reset_index()
@@ -243,8 +270,8 @@ def plot_damage(df: pd.DataFrame, fig_location: str = None,
           'p53b',
           'p53',
           'p12',
-          order=p53,
-          hue_order=p12,
+          order=DAMAGE.labels,
+          hue_order=CAUSES.labels,
           palette="deep")
     # Make individual settings for subplots
     for ax in p.axes.flat:
@@ -272,34 +299,54 @@ def plot_damage(df: pd.DataFrame, fig_location: str = None,
     plt.close()
 
 
+@profiled(rows='df')
+@cached_figure(ignore=('bitmaps',))
 def plot_surface(df: pd.DataFrame, fig_location: str = None,
-                 show_figure: bool = False):
+                 show_figure: bool = False, bitmaps: BitmapIndex = None):
     """
     plot_surface
         - Prepare appropriate dataframe with ( Variant 2) functions:
-            pd.crosstab, pd.rename, pd.stack.
+            crosstab (bincount kernel), pd.rename, pd.stack.
         - Show/Save a line graph that will show for each month
           (X axis - date column) the number of accidents
           at different conditions of the road surface (P16).
 
     Parameters
     ----------
-    df : pd.DataFrame
-        Incoming dataframe
+    df : pd.DataFrame or AccidentCube
+        Incoming dataframe or materialized data cube
     fig_location : str
         Directory and filename to save figure
     show_figure : bool
         True/False parameter to choose possibility to show the figure
+    bitmaps : BitmapIndex
+        Bitmap index built for the rows of df (e.g. BitmapIndex.for_file),
+        used instead of scanning region column
     """
 
-    # Select needed regions and columns
-    df = df[['region', 'p16', 'date']]
-    df = df.loc[df['region'].isin(['JHM', 'HKK', 'PLK', 'PHA'])]
-    df['date'] = df['date'].astype('datetime64[M]').copy()
-    # Detect some -1 value in p16 replace to 0
-    df = df.replace({'p16': -1}, 0)
-    # Create crosstab
-    df = pd.crosstab(index=[df['region'], df['date']], columns=df['p16'])
+    if isinstance(df, AccidentCube):
+        # Take monthly counts from the cube
+        df = df.slice(region=['JHM', 'HKK', 'PLK', 'PHA']
+                      ).rollup(['region', 'month', 'p16'], ['count'])
+        df = df.rename(columns={'month': 'date'}).replace({'p16': -1}, 0)
+        # Create crosstab from aggregated counts
+        df = groupby_agg(df, ['region', 'date', 'p16'], {'count': 'sum'}
+                         ).set_index(['region', 'date', 'p16']
+                                     )['count'].unstack(fill_value=0)
+    else:
+        # Select needed regions (with bitmap index if available) and columns
+        if bitmaps is not None:
+            df = df.iloc[bitmaps.isin('region', ['JHM', 'HKK', 'PLK', 'PHA']
+                                      ).rows()]
+            df = df[['region', 'p16', 'date']]
+        else:
+            df = df[['region', 'p16', 'date']]
+            df = df.loc[df['region'].isin(['JHM', 'HKK', 'PLK', 'PHA'])]
+        df['date'] = df['date'].astype('datetime64[M]').copy()
+        # Detect some -1 value in p16 replace to 0
+        df = df.replace({'p16': -1}, 0)
+        # Create crosstab
+        df = crosstab([df['region'], df['date']], df['p16'])
     # Rename p16 columns
     df = df.rename(columns={
                     0: 'other state',
@@ -360,6 +407,8 @@ if __name__ == "__main__":
     # skript nebude pri testovani pousten primo, ale budou volany konkreni ¨
     # funkce.
     df = get_dataframe("accidents.pkl.gz", verbose=True)
+    bitmaps = BitmapIndex.for_file("accidents.pkl.gz")
+    bins = BinCodes.for_file("accidents.pkl.gz")
     plot_conseq(df, fig_location="01_nasledky.png", show_figure=False)
-    plot_damage(df, "02_priciny.png", False)
-    plot_surface(df, "03_stav.png", False)
+    plot_damage(df, "02_priciny.png", False, bitmaps, bins)
+    plot_surface(df, "03_stav.png", False, bitmaps)
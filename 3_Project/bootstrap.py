@@ -0,0 +1,271 @@
+#!/usr/bin/env python3.8
+# coding=utf-8
+
+"""
+| Project Implementation for IZV 2020/2021
+| Script bootstrap.py
+| Date: 18.10.2026
+| Author: Mikhail Abramov
+| xabram00@stud.fit.vutbr.cz
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+# Data layer modules from 1_Project
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, '1_Project'))
+from aggregate import encode  # noqa: E402
+
+"""
+Default number of bootstrap replicates
+"""
+REPLICATES = 10000
+
+"""
+Default number of replicates resampled at once (memory bound of the chunk:
+CHUNK * groups * cells * 8 bytes), None resamples all replicates at once
+"""
+CHUNK = 1000
+
+"""
+Default seed, the same seed and chunk size give the same intervals
+"""
+SEED = 2020
+
+"""
+Rates of make_counts: {NAME: function(df) -> boolean pd.Series}
+"""
+METRICS = {
+    'death': lambda df: df['p13a'] > 0,
+    'severe injury': lambda df: df['p13b'] > 0,
+    'slight injury': lambda df: df['p13c'] > 0,
+    'death or severe injury': lambda df: (df['p13a'] > 0) | (df['p13b'] > 0),
+}
+
+
+def resample(counts, replicates, rng):
+    """
+    Resample the rows of each group: multinomial draw of the cell counts,
+    computed as a chain of conditional binomial draws over the cells
+    (numpy 1.19 multinomial accepts only one probability vector),
+    so all replicates and groups are drawn at once.
+
+    Parameters
+    ----------
+    counts : np.ndarray[int]
+        Cell counts of shape (groups, cells).
+    replicates : int
+        Number of replicates.
+    rng : np.random.Generator
+        Random generator.
+
+    Returns
+    -------
+    samples : np.ndarray[int64]
+        Resampled counts of shape (replicates, groups, cells)
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    samples = np.empty((replicates,) + counts.shape, dtype=np.int64)
+    remaining = np.repeat(counts.sum(axis=-1)[None], replicates, axis=0)
+    left = counts.sum(axis=-1).astype(float)
+    for cell in range(counts.shape[-1] - 1):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            p = np.where(left > 0, counts[..., cell] / left, 0.0).clip(0, 1)
+        samples[..., cell] = rng.binomial(remaining, p)
+        remaining -= samples[..., cell]
+        left -= counts[..., cell]
+    samples[..., -1] = remaining
+    return samples
+
+
+def bootstrap(counts, statistic, replicates=REPLICATES, level=0.95,
+              seed=SEED, chunk=CHUNK):
+    """
+    Percentile bootstrap confidence interval of the statistic of cell counts
+
+    Parameters
+    ----------
+    counts : np.ndarray[int]
+        Cell counts of shape (groups, cells), groups are resampled independently.
+    statistic : function(np.ndarray) -> np.ndarray
+        Vectorized statistic of counts of shape (replicates, groups, cells),
+        returning shape (replicates, ...).
+    replicates : int
+        Number of replicates.
+    level : float
+        Confidence level.
+    seed : int
+        Seed of the random generator.
+    chunk : int
+        Replicates resampled at once, all if None.
+
+    Returns
+    -------
+    estimate, low, high : np.ndarray[float]
+        Statistic of the counts and bounds of the interval
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    rng = np.random.default_rng(seed)
+    chunk = chunk or replicates
+    values = np.concatenate([statistic(resample(counts, min(chunk, replicates - start), rng))
+                             for start in range(0, replicates, chunk)])
+    alpha = (1 - level) / 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        estimate = statistic(counts[None])[0]
+    low, high = np.nanquantile(values, [alpha, 1 - alpha], axis=0)
+    return estimate, low, high
+
+
+def cells(indicators, by=None):
+    """
+    Joint cell counts of binary indicators (cell code = bit mask
+    of the true indicators) for each group in one bincount
+
+    Parameters
+    ----------
+    indicators : list[array-like]
+        Boolean columns (at most 16).
+    by : array-like
+        Group column, one group if None.
+
+    Returns
+    -------
+    counts : np.ndarray[int64]
+        Counts of shape (groups, 2 ** len(indicators))
+    labels : pd.Index
+        Group of each row of the counts
+    """
+    n_cells = 1 << len(indicators)
+    code = np.zeros(len(indicators[0]), dtype=np.int64)
+    for bit, values in enumerate(indicators):
+        code |= np.asarray(values, dtype=bool).astype(np.int64) << bit
+    if by is None:
+        groups, labels = np.zeros(len(code), dtype=np.int64), pd.Index(['all'])
+    else:
+        groups, labels = encode(by)
+    valid = groups >= 0
+    counts = np.bincount(groups[valid] * n_cells + code[valid],
+                         minlength=len(labels) * n_cells)
+    return counts.reshape(len(labels), n_cells), labels
+
+
+def indicator_rates(n_indicators):
+    """
+    Statistic: rate of each indicator from joint cell counts
+
+    Returns
+    -------
+    statistic : function(np.ndarray) -> np.ndarray
+        Counts (replicates, groups, cells) -> rates (replicates, groups, indicators)
+    """
+    masks = (np.arange(1 << n_indicators)[:, None] >> np.arange(n_indicators)) & 1
+
+    def statistic(counts):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (counts @ masks) / counts.sum(axis=-1, keepdims=True)
+    return statistic
+
+
+def rates_ci(df, metrics=None, by=None, replicates=REPLICATES, level=0.95,
+             seed=SEED, chunk=CHUNK):
+    """
+    Confidence intervals of the make_counts rates, overall or per group
+    (region, p12 cause, ...). Rates of one group are resampled jointly.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Accidents with p13a, p13b, p13c columns.
+    metrics : dict{str: function(df) -> boolean pd.Series}
+        Rates to estimate, METRICS if None.
+    by : str
+        Group column, whole dataframe if None.
+
+    Returns
+    -------
+    result : pd.DataFrame
+        group, metric, n, rate, low, high and 'each' (each Nth accident)
+        with its bounds each_low, each_high
+    """
+    metrics = METRICS if metrics is None else metrics
+    counts, labels = cells([func(df) for func in metrics.values()],
+                           None if by is None else df[by])
+    rate, low, high = bootstrap(counts, indicator_rates(len(metrics)),
+                                replicates, level, seed, chunk)
+    result = pd.DataFrame({
+        by or 'group': np.repeat(labels, len(metrics)),
+        'metric': np.tile(list(metrics), len(labels)),
+        'n': np.repeat(counts.sum(axis=-1), len(metrics)),
+        'rate': rate.ravel(), 'low': low.ravel(), 'high': high.ravel()})
+    return each(result)
+
+
+def binomial_ci(successes, trials, names, replicates=REPLICATES, level=0.95,
+                seed=SEED, chunk=CHUNK):
+    """
+    Confidence intervals of independent rates successes / trials,
+    e.g. non-zero counts of summary.Summary columns and its rows
+
+    Parameters
+    ----------
+    successes : array-like
+        Number of successes of each rate.
+    trials : int or array-like
+        Number of trials.
+    names : list[str]
+        Name of each rate.
+
+    Returns
+    -------
+    result : pd.DataFrame
+        metric, n, rate, low, high, each, each_low, each_high
+    """
+    successes = np.asarray(successes, dtype=np.int64)
+    trials = np.broadcast_to(np.asarray(trials, dtype=np.int64), successes.shape)
+    counts = np.stack([trials - successes, successes], axis=-1)
+
+    def statistic(counts):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return counts[..., 1] / counts.sum(axis=-1)
+
+    rate, low, high = bootstrap(counts, statistic, replicates, level, seed, chunk)
+    return each(pd.DataFrame({'metric': list(names), 'n': trials,
+                              'rate': rate, 'low': low, 'high': high}))
+
+
+def each(result):
+    """
+    Add 'each Nth accident' form of the rates and their intervals
+    """
+    with np.errstate(divide='ignore'):
+        result['each'] = 1 / result['rate']
+        result['each_low'] = 1 / result['high']
+        result['each_high'] = 1 / result['low']
+    return result
+
+
+def difference_ci(table, replicates=REPLICATES, level=0.95, seed=SEED, chunk=CHUNK):
+    """
+    Confidence interval of PYY - PNY of stat.ipynb,
+    rows (condition no/yes) are resampled independently
+
+    Parameters
+    ----------
+    table : array-like
+        2x2 crosstab: rows condition 0/1, columns result 0/1.
+
+    Returns
+    -------
+    estimate, low, high : float
+    """
+    def statistic(counts):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rate = counts[..., 1] / counts.sum(axis=-1)
+        return rate[..., 1] - rate[..., 0]
+
+    estimate, low, high = bootstrap(np.asarray(table), statistic,
+                                    replicates, level, seed, chunk)
+    return float(estimate), float(low), float(high)
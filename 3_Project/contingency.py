@@ -0,0 +1,329 @@
+#!/usr/bin/env python3.8
+# coding=utf-8
+
+"""
+| Project Implementation for IZV 2020/2021
+| Script contingency.py
+| Date: 18.10.2026
+| Author: Mikhail Abramov
+| xabram00@stud.fit.vutbr.cz
+"""
+
+import os
+import sys
+import argparse
+import concurrent.futures
+import numpy as np
+import pandas as pd
+from scipy.stats import chi2
+
+# Data layer modules from 1_Project
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, '1_Project'))
+from aggregate import encode  # noqa: E402
+from profiling import profiled  # noqa: E402
+
+"""
+Default categorical columns screened against the outcomes
+"""
+FACTORS = ['p5a', 'p6', 'p7', 'p8', 'p9', 'p10', 'p11', 'p12', 'p15', 'p16',
+           'p17', 'p18', 'p19', 'p20', 'p21', 'p22', 'p23', 'p24', 'p27',
+           'p28', 'p35', 'p39', 'p44', 'p45a', 'p48a', 'p49', 'p50a', 'p50b',
+           'p51', 'p55a', 'p57', 'p58']
+
+"""
+Default outcomes: {NAME: function(df) -> boolean pd.Series}
+"""
+OUTCOMES = {
+    'killed': lambda df: df['p13a'] > 0,
+    'serious': lambda df: df['p13a'] + df['p13b'] > 0,
+    'injured': lambda df: df['p13a'] + df['p13b'] + df['p13c'] > 0,
+}
+
+
+def alcohol(df):
+    """
+    Culprit under the strong influence of alcohol (p11 >= 7) as in stat.ipynb,
+    accidents under influence of drugs (p11 == 4 or p11 == 5) are excluded
+
+    Returns
+    -------
+    factor : pd.Series
+        1.0 - drunk, 0.0 - not drunk, NaN - excluded
+    """
+    factor = (df['p11'] >= 7).astype(float)
+    return factor.mask(df['p11'].isin([4, 5]))
+
+
+"""
+Derived factors: {NAME: function(df) -> pd.Series}, NaN values are excluded
+"""
+DERIVED = {'alcohol': alcohol}
+
+
+def binary(values):
+    """
+    Encode boolean or 0/1 outcome to codes 0/1, missing values to -1
+    """
+    values = pd.Series(values)
+    codes = np.where(values.astype(float) > 0, 1, 0).astype(np.int8)
+    codes[values.isna().to_numpy()] = -1
+    return codes
+
+
+def tables(strata, n_strata, factors, outcomes, shape):
+    """
+    Count contingency tables of every factor and outcome for each stratum,
+    one bincount over combined integer codes per factor (all outcomes
+    and strata at once). Module level function, so it can run in process pool.
+
+    Parameters
+    ----------
+    strata : np.ndarray[int]
+        Stratum code of each row 0..n_strata-1.
+    n_strata : int
+        Number of strata.
+    factors : list[np.ndarray[int]]
+        Codes of each factor 0..K-1, missing -1.
+    outcomes : list[np.ndarray[int]]
+        Codes of each outcome 0..M-1, missing -1.
+    shape : tuple(int, int)
+        Maximum number of factor levels K and outcome levels M.
+
+    Returns
+    -------
+    counts : np.ndarray[int64]
+        Tables of shape (strata, factors, outcomes, K, M)
+    """
+    k, m = shape
+    n_outcomes = len(outcomes)
+    counts = np.zeros((n_strata, len(factors), n_outcomes, k, m), dtype=np.int64)
+    outcome = np.stack(outcomes, axis=1).astype(np.int64)
+    # Cell of each (row, outcome) pair without the factor level
+    base = (strata.astype(np.int64)[:, None] * n_outcomes
+            + np.arange(n_outcomes)) * (k * m) + outcome
+    for f, codes in enumerate(factors):
+        valid = (codes >= 0)[:, None] & (outcome >= 0)
+        cells = base + codes.astype(np.int64)[:, None] * m
+        size = n_strata * n_outcomes * k * m
+        counts[:, f] = np.bincount(cells[valid], minlength=size).reshape(
+            n_strata, n_outcomes, k, m)
+    return counts
+
+
+def chi2_batch(observed, correction=True):
+    """
+    Pearson's chi-squared test of independence of all tables at once,
+    same results as scipy.stats.chi2_contingency for each table
+    (empty rows and columns of the padded tables are ignored).
+
+    Parameters
+    ----------
+    observed : np.ndarray
+        Tables of shape (..., K, M).
+    correction : bool
+        Yates' correction for tables with 1 degree of freedom.
+
+    Returns
+    -------
+    stat : np.ndarray[float]
+        Test statistics (NaN for tables with 0 degrees of freedom)
+    p : np.ndarray[float]
+        p-values
+    dof : np.ndarray[int]
+        Degrees of freedom
+    expected : np.ndarray[float]
+        Expected frequencies of shape (..., K, M)
+    """
+    observed = observed.astype(float)
+    rows = observed.sum(axis=-1)
+    cols = observed.sum(axis=-2)
+    total = rows.sum(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        expected = rows[..., :, None] * cols[..., None, :] / total[..., None, None]
+    expected = np.nan_to_num(expected)
+    dof = (((rows > 0).sum(axis=-1) - 1) * ((cols > 0).sum(axis=-1) - 1)).clip(0)
+
+    if correction:
+        diff = expected - observed
+        yates = np.minimum(0.5, np.abs(diff)) * np.sign(diff)
+        observed = np.where((dof == 1)[..., None, None], observed + yates, observed)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        terms = np.where(expected > 0, (observed - expected) ** 2 / expected, 0.0)
+    stat = np.where(dof > 0, terms.sum(axis=(-2, -1)), np.nan)
+    p = np.where(dof > 0, chi2.sf(np.nan_to_num(stat), np.maximum(dof, 1)), np.nan)
+    return stat, p, dof, expected
+
+
+def rates(counts):
+    """
+    Conditional probability of the outcome (code 1) for each factor level
+
+    Parameters
+    ----------
+    counts : np.ndarray
+        Tables of shape (..., K, M).
+
+    Returns
+    -------
+    rates : np.ndarray[float]
+        P(outcome | factor level) of shape (..., K), NaN for empty levels
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return counts[..., 1] / counts.sum(axis=-1)
+
+
+@profiled(rows='df')
+def screen(df, factors=None, outcomes=None, by=('region', 'year'),
+           correction=True, executor=None, workers=None):
+    """
+    Test every factor against every outcome in each group (region, year),
+    tables are counted in parallel per region and tested in one batch.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Accidents with p-code columns, 'region' and 'date' (or 'p2a').
+    factors : list[str] or dict{str: array-like}
+        Factor columns or derived factors, FACTORS + DERIVED if None.
+    outcomes : dict{str: array-like or function(df)}
+        Binary outcomes, OUTCOMES if None.
+    by : tuple(str)
+        Grouping columns, 'year' is derived from the date,
+        empty tuple tests the whole dataframe.
+    correction : bool
+        Yates' correction for 2x2 tables.
+    executor : concurrent.futures.Executor
+        Executor counting the regions, thread pool if None.
+    workers : int
+        Workers of the default thread pool.
+
+    Returns
+    -------
+    result : pd.DataFrame
+        One row per (group, factor, outcome): n, chi2, p, dof, PYY and PNY
+        (binary factors: P(outcome | factor) and P(outcome | not factor))
+        and rates (P(outcome | level) for each level)
+    """
+    if factors is None:
+        factors = [c for c in FACTORS if c in df.columns]
+        factors = {**{c: df[c] for c in factors},
+                   **{name: func(df) for name, func in DERIVED.items()}}
+    elif not isinstance(factors, dict):
+        factors = {c: DERIVED[c](df) if c in DERIVED else df[c] for c in factors}
+    outcomes = OUTCOMES if outcomes is None else outcomes
+    outcomes = {name: value(df) if callable(value) else value
+                for name, value in outcomes.items()}
+
+    # Encode whole columns once, so the levels are shared by all groups
+    encoded = [encode(values) for values in factors.values()]
+    factor_codes = [codes for codes, _ in encoded]
+    outcome_codes = [binary(values) for values in outcomes.values()]
+    shape = (max(2, max(len(labels) for _, labels in encoded)), 2)
+
+    keys = []
+    for column in by:
+        if column == 'year' and 'year' not in df.columns:
+            date = df['date'] if 'date' in df.columns else df['p2a']
+            keys.append(pd.DatetimeIndex(date).year.to_numpy())
+        else:
+            keys.append(df[column].to_numpy())
+    if not keys:
+        keys = [np.zeros(len(df), dtype=np.int8)]
+    encoded_keys = [encode(key) for key in keys]
+
+    # Regions (first key) are counted in parallel, other keys form strata
+    outer, outer_labels = encoded_keys[0]
+    inner_shape = tuple(len(labels) for _, labels in encoded_keys[1:])
+    n_inner = int(np.prod(inner_shape, dtype=np.int64))
+    inner = (np.ravel_multi_index(tuple(codes for codes, _ in encoded_keys[1:]), inner_shape)
+             if inner_shape else np.zeros(len(df), dtype=np.int64))
+    valid = outer >= 0
+    for codes, _ in encoded_keys[1:]:
+        valid &= codes >= 0
+    # Rows with missing key are moved behind the last region
+    outer = np.where(valid, outer, len(outer_labels))
+    order = np.argsort(outer, kind='stable')
+    bounds = np.searchsorted(outer[order], np.arange(len(outer_labels) + 1))
+
+    own = executor is None
+    if own:
+        executor = concurrent.futures.ThreadPoolExecutor(workers)
+    try:
+        futures = []
+        for g in range(len(outer_labels)):
+            rows = order[bounds[g]:bounds[g + 1]]
+            futures.append(executor.submit(tables, inner[rows], n_inner,
+                                           [codes[rows] for codes in factor_codes],
+                                           [codes[rows] for codes in outcome_codes],
+                                           shape))
+        counts = np.concatenate([future.result() for future in futures])
+    finally:
+        if own:
+            executor.shutdown()
+
+    # counts: (groups, factors, outcomes, K, 2)
+    stat, p, dof, _ = chi2_batch(counts, correction)
+    rate = rates(counts)
+    group_index = pd.MultiIndex.from_product(
+        [labels for _, labels in encoded_keys], names=list(by) or ['all'])
+    groups, f, o = np.indices(stat.shape).reshape(3, -1)
+    n = counts.sum(axis=(-2, -1)).ravel()
+
+    result = group_index[groups].to_frame(index=False)
+    result['factor'] = np.array(list(factors))[f]
+    result['outcome'] = np.array(list(outcomes))[o]
+    result['n'] = n
+    result['chi2'] = stat.ravel()
+    result['p'] = p.ravel()
+    result['dof'] = dof.ravel()
+    # PYY/PNY of binary factors (0/1 or False/True levels)
+    levels = np.array([len(labels) for _, labels in encoded])
+    flat = rate.reshape(-1, shape[0])
+    is_binary = levels[f] == 2
+    result['PYY'] = np.where(is_binary, flat[:, 1], np.nan)
+    result['PNY'] = np.where(is_binary, flat[:, 0], np.nan)
+    result['rates'] = [dict(zip(encoded[i][1], r[:levels[i]])) for i, r in zip(f, flat)]
+    return result[result['n'] > 0].reset_index(drop=True)
+
+
+def hypothesis(df, factor='alcohol', outcome='serious', alpha=0.05):
+    """
+    Test of one hypothesis of stat.ipynb over the whole dataframe:
+    'factor -> outcome was more common'
+
+    Returns
+    -------
+    result : pd.Series
+        n, chi2, p, dof, PYY, PNY and 'dependent' (p <= alpha),
+        'confirmed' (dependent and PYY > PNY)
+    """
+    result = screen(df, [factor], {outcome: OUTCOMES[outcome]}, by=()).iloc[0]
+    result['dependent'] = result['p'] <= alpha
+    result['confirmed'] = result['dependent'] and result['PYY'] > result['PNY']
+    return result
+
+
+"""
+Main:
+    Screen factors of accidents.pkl.gz (2_Project get_dataframe output)
+    and print significant pairs
+"""
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chi-squared screening of accident factors")
+    parser.add_argument("filename", nargs="?", default="accidents.pkl.gz")
+    parser.add_argument("-b", "--by", nargs="*", default=["region", "year"],
+                        help="grouping columns (region, year)")
+    parser.add_argument("-a", "--alpha", type=float, default=0.05,
+                        help="significance level")
+    parser.add_argument("-w", "--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    df = pd.read_pickle(args.filename)
+    result = screen(df, by=tuple(args.by), workers=args.workers)
+    significant = result[result['p'] <= args.alpha]
+    print(f"{len(result)} tests, {len(significant)} significant (p <= {args.alpha})")
+    with pd.option_context('display.max_rows', 50, 'display.width', 120):
+        print(significant.drop(columns='rates').sort_values('p').head(50))
+    print(hypothesis(df, alpha=args.alpha).drop('rates'))
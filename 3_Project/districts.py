@@ -0,0 +1,251 @@
+#!/usr/bin/env python3.8
+# coding=utf-8
+
+"""
+| Project Implementation for IZV 2020/2021
+| Script districts.py
+| Date: 18.10.2026
+| Author: Mikhail Abramov
+| xabram00@stud.fit.vutbr.cz
+"""
+
+import os
+import sys
+import argparse
+import concurrent.futures
+import numpy as np
+import pandas as pd
+from shapely.geometry import box
+from shapely.strtree import STRtree
+
+try:
+    from shapely import contains_xy
+except ImportError:
+    # shapely < 2.0
+    from shapely.vectorized import contains as contains_xy
+
+# Data layer modules from 1_Project
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, '1_Project'))
+from aggregate import groupby_agg  # noqa: E402
+from storage import atomic_write, digest, file_stamp  # noqa: E402
+
+"""
+Default side of the grid cells (chunks of points) in EPSG:3857 metres
+"""
+CELL = 20000
+
+"""
+Default column with the district code in the boundary file (okresy of CZSO)
+"""
+CODE = 'KOD_OKRES'
+
+
+def load_boundaries(path, code=CODE):
+    """
+    Polygons of the districts from local boundary file (shapefile, GeoJSON, ...)
+    in EPSG:3857 of make_geo, parts of the same district are dissolved
+
+    Parameters
+    ----------
+    path : str
+        Boundary file.
+    code : str
+        Column with the district code (name).
+
+    Returns
+    -------
+    polygons : list[shapely.geometry.base.BaseGeometry]
+    labels : pd.Index
+        Code of each polygon
+    """
+    # geopandas is needed only to read and project the boundaries
+    import geopandas
+
+    boundaries = geopandas.read_file(path).to_crs(epsg=3857)
+    if boundaries[code].duplicated().any():
+        boundaries = boundaries.dissolve(by=code).reset_index()
+    return list(boundaries.geometry), pd.Index(boundaries[code])
+
+
+def candidates(tree, polygons, area):
+    """
+    Positions of the polygons whose bounding box intersects the area
+    (shapely < 2.0 STRtree returns geometries, newer returns positions)
+    """
+    found = tree.query(area)
+    if isinstance(found, np.ndarray) and found.dtype.kind in 'iu':
+        return sorted(found.tolist())
+    positions = {id(polygon): i for i, polygon in enumerate(polygons)}
+    return sorted(positions[id(polygon)] for polygon in found)
+
+
+def assign(x, y, cell, polygons, codes):
+    """
+    District of the points of one chunk: candidate polygons are tested
+    by vectorized point-in-polygon, polygon containing the whole cell
+    assigns all its points at once
+
+    Parameters
+    ----------
+    x, y : np.ndarray[float]
+        Points of the chunk.
+    cell : shapely.geometry.Polygon
+        Bounding box of the points.
+    polygons : list[shapely.geometry.base.BaseGeometry]
+        Candidate polygons.
+    codes : list[int]
+        Position of each candidate polygon.
+
+    Returns
+    -------
+    result : np.ndarray[int32]
+        Position of the polygon of each point, -1 outside of all polygons
+    """
+    result = np.full(len(x), -1, dtype=np.int32)
+    for polygon, code in zip(polygons, codes):
+        if polygon.contains(cell):
+            result[result < 0] = code
+            break
+        left = np.flatnonzero(result < 0)
+        if not len(left):
+            break
+        result[left[contains_xy(polygon, x[left], y[left])]] = code
+    return result
+
+
+def join(x, y, polygons, cell=CELL, executor=None, workers=None):
+    """
+    Spatial join of the points to the polygons: points are split into chunks
+    by grid cells, STRtree finds candidate polygons of each chunk
+    and chunks are processed in parallel
+
+    Parameters
+    ----------
+    x, y : array-like
+        EPSG:3857 coordinates (make_geo geometry), NaN points get -1.
+    polygons : list[shapely.geometry.base.BaseGeometry]
+        Polygons (load_boundaries), the first containing polygon wins.
+    cell : float
+        Side of the grid cells.
+    executor : concurrent.futures.Executor
+        Executor of the chunks, own ThreadPoolExecutor if None.
+    workers : int
+        Workers of own executor.
+
+    Returns
+    -------
+    codes : np.ndarray[int32]
+        Position of the polygon of each point, -1 outside of all polygons
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    codes = np.full(len(x), -1, dtype=np.int32)
+    valid = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+    if not len(valid) or not len(polygons):
+        return codes
+
+    cx = np.floor(x[valid] / cell).astype(np.int64)
+    cy = np.floor(y[valid] / cell).astype(np.int64)
+    keys = (cx - cx.min()) * (cy.max() - cy.min() + 1) + (cy - cy.min())
+    order = np.argsort(keys, kind='stable')
+    bounds = np.flatnonzero(np.r_[True, keys[order][1:] != keys[order][:-1], True])
+
+    tree = STRtree(polygons)
+    own = executor is None
+    if own:
+        executor = concurrent.futures.ThreadPoolExecutor(workers)
+    try:
+        futures = []
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            rows = valid[order[start:end]]
+            area = box(x[rows].min(), y[rows].min(), x[rows].max(), y[rows].max())
+            found = candidates(tree, polygons, area)
+            if found:
+                futures.append((rows, executor.submit(assign, x[rows], y[rows], area,
+                                                      [polygons[i] for i in found], found)))
+        for rows, future in futures:
+            codes[rows] = future.result()
+    finally:
+        if own:
+            executor.shutdown()
+    return codes
+
+
+def districts(filename, boundaries, code=CODE, name='district', cell=CELL, workers=None):
+    """
+    District of each accident of accidents pickle.gz file, cached next to it
+    ({filename}.{name}.npz), the join is recomputed when the accidents
+    or the boundary file are rewritten (size, mtime) or the code column changes.
+
+    Parameters
+    ----------
+    filename : str
+        Accidents dataframe in pickle.gz format.
+    boundaries : str
+        Boundary file.
+    code : str
+        Column with the district code (name) in the boundary file.
+    name : str
+        Name of the column.
+
+    Returns
+    -------
+    column : pd.Categorical
+        District of each row of the dataframe (by position), NaN if unknown
+    """
+    path = f"{filename}.{name}.npz"
+    source = digest(file_stamp(filename), file_stamp(boundaries), code)
+    if os.path.isfile(path):
+        with np.load(path, allow_pickle=False) as f:
+            if str(f['source']) == source:
+                return pd.Categorical.from_codes(f['codes'], pd.Index(f['labels']))
+
+    # geopandas is needed only to project the coordinates
+    from geo import make_geo
+
+    df = pd.read_pickle(filename).reset_index(drop=True)
+    gdf = make_geo(df)
+    polygons, labels = load_boundaries(boundaries, code)
+    codes = np.full(len(df), -1, dtype=np.int32)
+    codes[gdf.index.to_numpy()] = join(gdf.geometry.x.to_numpy(), gdf.geometry.y.to_numpy(),
+                                       polygons, cell, workers=workers)
+    labels = labels.astype(str)
+    with atomic_write(path) as f:
+        np.savez_compressed(f, source=np.array(source), codes=codes,
+                            labels=np.array(list(labels)))
+    return pd.Categorical.from_codes(codes, labels)
+
+
+def counts(df, by='district'):
+    """
+    Accidents, killed, seriously and slightly injured persons per district
+    (groupby_agg as in region statistics)
+
+    Returns
+    -------
+    counts : pd.DataFrame
+    """
+    return groupby_agg(df, [by], {'p1': 'count', 'p13a': 'sum', 'p13b': 'sum', 'p13c': 'sum'})
+
+
+"""
+Main:
+    Join accidents of accidents.pkl.gz (2_Project get_dataframe output)
+    to the districts of the boundary file and print counts per district
+"""
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Spatial join of accidents to districts")
+    parser.add_argument("boundaries", help="boundary file (shapefile, GeoJSON, ...)")
+    parser.add_argument("filename", nargs="?", default="accidents.pkl.gz")
+    parser.add_argument("-c", "--code", default=CODE, help="district code column")
+    parser.add_argument("-n", "--name", default="district", help="name of the column")
+    parser.add_argument("-w", "--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    df = pd.read_pickle(args.filename).reset_index(drop=True)
+    df[args.name] = districts(args.filename, args.boundaries, args.code, args.name,
+                              workers=args.workers)
+    print(f'{df[args.name].isna().sum()} of {len(df)} accidents outside of the districts')
+    with pd.option_context('display.max_rows', None, 'display.width', 120):
+        print(counts(df, args.name).sort_values('p1', ascending=False))
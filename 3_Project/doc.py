@@ -17,15 +17,38 @@ import pandas as pd
 import seaborn as sns
 import numpy as np
 import os
+import sys
 import gzip
 import pickle
 import datetime as dt
 
+# Data layer modules from 1_Project
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, '1_Project'))
+from parquet_store import is_parquet, read_accidents, column_field  # noqa: E402
+from aggregate import crosstab  # noqa: E402
+from cube import AccidentCube  # noqa: E402
+from bitmap_index import BitmapIndex  # noqa: E402
+from profiling import profiled  # noqa: E402
+from figure_cache import cached_figure  # noqa: E402
+from storage import tag, derive, file_stamp  # noqa: E402
+from raster import RASTER_DPI, rasterize_points, savefig_options  # noqa: E402
+from summary import Summary, summarize  # noqa: E402
+from bootstrap import binomial_ci  # noqa: E402
+from reproject import TARGET_CRS, reproject  # noqa: E402
 
+"""
+Columns of make_counts (deaths, severe and slight injuries, damage)
+"""
+COUNTS_COLUMNS = ['p13a', 'p13b', 'p13c', 'p53']
+
+
+@profiled(rows='return')
 def make_dataframe(filename: str, verbose: bool = False) -> pd.DataFrame:
     """
     make_dataframe
-        - Reading the incoming dataframe from the pickle.gz file.
+        - Reading the incoming dataframe from the pickle.gz file
+          or from the Parquet dataset (only 2020+ partitions).
         - Rename 'p2p' column to date and change datatype to datetime64[ns].
         - Copy region column.
         - Replace empty strings to np.NaN and save as category datatype
@@ -36,6 +59,7 @@ def make_dataframe(filename: str, verbose: bool = False) -> pd.DataFrame:
     ----------
     filename : str
         Directory and filename of dataframe in pickle.gz format
+        or Parquet dataset folder
     verbose : bool
         Verbose parameter to print out information about dataframes size
 
@@ -45,16 +69,25 @@ def make_dataframe(filename: str, verbose: bool = False) -> pd.DataFrame:
         new dataframe, lightweight and ready for further processing
     """
 
-    # Reading the incoming dataframe from the pickle.gz file
+    # Reading the incoming dataframe from the Parquet dataset
+    # (only 2020+ partitions and speeding causes) or from the pickle.gz file
     try:
-        with gzip.open(filename) as cache:
-            rdf = pickle.load(cache)
+        speeding = [201, 202, 203, 204, 205, 206, 207, 208, 209]
+        if is_parquet(filename):
+            rdf = read_accidents(filename,
+                                 years=range(2020, dt.date.today().year + 1),
+                                 filter=column_field('p12').isin(speeding))
+            rdf['p2a'] = rdf['p2a'].astype('datetime64[M]').copy()
+        else:
+            bitmaps = BitmapIndex.for_file(filename)
+            with gzip.open(filename) as cache:
+                rdf = pickle.load(cache)
+            # Select speeding causes with bitmap index, then dates
+            rdf = rdf.iloc[bitmaps.isin('p12', speeding).rows()]
             rdf['p2a'] = rdf['p2a'].astype('datetime64[M]').copy()
             start_2020 = dt.datetime.strptime('2020-01-01 00:00:00',
                                               '%Y-%m-%d %H:%M:%S')
             rdf = rdf.loc[(rdf['p2a'] >= start_2020)]
-            rdf = rdf[rdf['p12'].isin([201, 202, 203, 204,
-                                       205, 206, 207, 208, 209])]
         df = pd.DataFrame()
     except:
         raise OSError(f"ERROR: {filename} not found or has the wrong format")
@@ -87,19 +120,23 @@ def make_dataframe(filename: str, verbose: bool = False) -> pd.DataFrame:
             print(f'new_size={ns} MB')
             print(df)
             print("-----> Edn   get_dataframe verbose <-----")
+        # Fingerprint of the data for the figure cache
+        if not is_parquet(filename):
+            tag(df, file_stamp(filename), 'make_dataframe')
         return df
     except:
         raise NotImplementedError(f"ERROR: OoOops something went wrong...")
 
 
+@profiled(rows='rdf')
 def make_geo(rdf: pd.DataFrame,
              verbose: bool = False) -> geopandas.GeoDataFrame:
     """
     make_geo
-        - Delete rows with NaN values from columns `d` and `e`.
-        - Create geometry column as point from `d` and `e` values.
         - Convert coordinates points in WGS 84 (3857) from S-JTSK (5514)
-        - Rewrite new GPS coordinates to columns `d` and `e`.
+          (chunked reprojection shared with geo.py, cached in the data folder).
+        - Delete rows with NaN or -1 values in columns `d` and `e`.
+        - Create geometry column as point from projected `d` and `e` values.
 
     Parameters
     ----------
@@ -114,27 +151,31 @@ def make_geo(rdf: pd.DataFrame,
         New dataframe with new format and prepared coordinates column
     """
 
-    # Delete rows with NaN values from columns `d` and `e`
-    rdf = rdf[['d', 'e', 'p12']]
-    rdf = rdf.dropna(subset=['d', 'e'])
-    # Create geometry column as point from `d` and `e` values
-    gdf = geopandas.GeoDataFrame(rdf,
-                                 geometry=geopandas.points_from_xy(rdf['d'],
-                                                                   rdf['e']),
-                                 crs="EPSG:5514")
     # Convert coordinates points in WGS 84 (3857) from S-JTSK (5514)
-    gdf = gdf.to_crs(epsg=3857)
+    x, y = reproject(pd.to_numeric(rdf['d'], errors='coerce'),
+                     pd.to_numeric(rdf['e'], errors='coerce'))
+    # Delete rows without coordinates (NaN, -1)
+    located = ~np.isnan(x)
+    source, rdf = rdf, rdf.loc[located, ['d', 'e', 'p12']]
+    # Create geometry column as point from projected `d` and `e` values
+    gdf = geopandas.GeoDataFrame(rdf,
+                                 geometry=geopandas.points_from_xy(x[located],
+                                                                   y[located]),
+                                 crs=TARGET_CRS)
     # Verbose condition.
     if verbose:
         print("-----> Start make_geo verbose <-----")
         print(gdf)
         print("-----> End   make_geo verbose <-----")
-    return gdf
+    return derive(gdf, source, 'make_geo', TARGET_CRS)
 
 
+@profiled(rows='gdf')
+@cached_figure(data=('gdf',))
 def make_map(gdf: geopandas.GeoDataFrame,
              fig_location: str = None,
-             show_figure: bool = False):
+             show_figure: bool = False,
+             raster_dpi: int = RASTER_DPI):
     """
     make_map
         - Show/Save map with accidents
@@ -147,6 +188,9 @@ def make_map(gdf: geopandas.GeoDataFrame,
         Directory and filename to save figure
     show_figure : bool
         True/False parameter to choose possibility to show the figure
+    raster_dpi : int
+        DPI of rasterized point layers in vector formats (pdf, svg, eps),
+        0 keeps the points vector
     """
 
     print('\n--------- Prepare Map ---------\n')
@@ -168,6 +212,7 @@ def make_map(gdf: geopandas.GeoDataFrame,
                      alpha=0.5,
                      legend=False)
 
+    rasterize_points(ax, raster_dpi)
     # Adjust maximum x/y axis
     ax.set_ylim(6_200_000, 6_640_000)
     ax.set_xlim(1_340_000, 2_110_000)
@@ -181,7 +226,8 @@ def make_map(gdf: geopandas.GeoDataFrame,
     # Save figure
     if fig_location:
         try:
-            plt.savefig(fig_location, bbox_inches='tight')
+            plt.savefig(fig_location, bbox_inches='tight',
+                        **savefig_options(fig_location, raster_dpi))
             print(f'Map saved - {fig_location}')
         except ValueError:
             raise ValueError("""ERROR: wrong image dtype, supported:
@@ -196,6 +242,7 @@ def make_map(gdf: geopandas.GeoDataFrame,
     print('\n--------- Map Done ---------\n')
 
 
+@profiled(rows='df')
 def make_table(df: pd.DataFrame):
     """
     make_table
@@ -203,15 +250,22 @@ def make_table(df: pd.DataFrame):
 
     Parameters
     ----------
-    df: pd.DataFrame
-        Incoming dataframe
+    df: pd.DataFrame, Summary or AccidentCube
+        Incoming dataframe, its summary grouped by p12
+        or materialized data cube
     """
     print('\n--------- Prepare Table ---------\n')
-    df = df[['date', 'p12', 'p13a', 'p13b', 'p13c']]
-    df = df.groupby(['p12'], as_index=False).agg({
-                                    'p13a': 'sum',
-                                    'p13b': 'sum',
-                                    'p13c': 'sum'})
+    if isinstance(df, AccidentCube):
+        # Take speeding causes since 2020 from the cube
+        df = df.slice(p12=range(201, 210),
+                      month=lambda m: m >= np.datetime64('2020-01')
+                      ).rollup(['p12'], ['p13a', 'p13b', 'p13c'])
+    else:
+        if not isinstance(df, Summary):
+            df = summarize(df, ['p13a', 'p13b', 'p13c'], by='p12')
+        elif df.by != 'p12':
+            raise ValueError(f"ERROR: summary grouped by {df.by}, p12 expected")
+        df = df.get('sum')[['p13a', 'p13b', 'p13c']].reset_index()
     df.columns = ['Reason', 'Deaths', 'Severely injured', 'Slightly injured']
     df.insert(1, "Marker", ['blue', 'orange', 'green', 'red', 'purple',
                             'olive', 'brown', 'pink', 'gray'], True)
@@ -234,6 +288,8 @@ def make_table(df: pd.DataFrame):
     print('\n--------- Table Done ---------\n')
 
 
+@profiled(rows='df')
+@cached_figure()
 def make_plot(df: pd.DataFrame,
               fig_location: str = None,
               show_figure: bool = False):
@@ -254,7 +310,7 @@ def make_plot(df: pd.DataFrame,
     # Select needed columns
     df = df[['date', 'p12']]
     # Create crosstab
-    df = pd.crosstab(index=[df['date']], columns=df['p12'])
+    df = crosstab([df['date']], df['p12'])
     # Rename p12 columns
     df = df.rename(columns={
                     201: 'non-adaptation to traffic intensity',
@@ -303,21 +359,27 @@ def make_plot(df: pd.DataFrame,
     print('\n--------- Plot Done ---------\n')
 
 
-def make_counts(df: pd.DataFrame):
+@profiled(rows='df')
+def make_counts(df: pd.DataFrame, replicates: int = 0):
     """
     make_counts
         - Stdout counts with accidents
+        - Bootstrap 95% confidence intervals of the rates
 
     Parameters
     ----------
-    df: pd.DataFrame
-        Incoming dataframe
+    df: pd.DataFrame or Summary
+        Incoming dataframe or its summary (of any grouping)
+    replicates: int
+        Number of bootstrap replicates, no intervals if 0
     """
     print('\n--------- Prepare Counts ---------\n')
-    tac = len(df.index)
-    df = df[['p13a', 'p13b', 'p13c', 'p53']]
-    rs = df.sum(axis=0, skipna=True)
-    rc = df.astype(bool).sum(axis=0)
+    if not isinstance(df, Summary):
+        df = summarize(df, COUNTS_COLUMNS)
+    total = df.total()
+    tac = int(total.get('rows').iloc[0])
+    rs = total.get('sum')[COUNTS_COLUMNS].iloc[0].rename(None)
+    rc = total.get('nonzero')[COUNTS_COLUMNS].iloc[0].rename(None)
 
     print("Total:")
     print(tac, '\n')
@@ -341,6 +403,17 @@ def make_counts(df: pd.DataFrame):
     print(f'''each {int(round(100/(awsLi),0))}\'
                     rd accident ends with slight injury\n''')
 
+    if replicates:
+        ci = binomial_ci(rc[:3], tac, ['death', 'severe injury', 'slight injury'],
+                         replicates=replicates)
+        print('95% confidence intervals:')
+        for _, row in ci.iterrows():
+            print(f"{row['metric']}: {row['rate']:.2%} "
+                  f"({row['low']:.2%} - {row['high']:.2%}), "
+                  f"each {row['each']:.1f}th "
+                  f"({row['each_low']:.1f} - {row['each_high']:.1f})")
+        print()
+
     print(f'Total damage to vehicles: {round(rs[3]/10_000, 2)} mln. CZK')
     print('\n--------- Counts Done ---------\n')
 
@@ -348,6 +421,8 @@ if __name__ == "__main__":
     df = make_dataframe("accidents.pkl.gz", verbose=False)
     gdf = make_geo(df, verbose=False)
     make_map(gdf, "map.png", False)
-    make_table(df)
+    # One scan of the dataframe for both text reports
+    summary = summarize(df, COUNTS_COLUMNS, by='p12')
+    make_table(summary)
     make_plot(df, "fig.png", False)
-    make_counts(df)
+    make_counts(summary, replicates=10000)
@@ -15,17 +15,30 @@ import matplotlib.pyplot as plt
 import contextily as ctx
 import sklearn.cluster as skl
 import numpy as np
+import os
+import sys
 from matplotlib import gridspec
 from mpl_toolkits.axes_grid1 import make_axes_locatable
 
+# Data layer modules from 1_Project
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, '1_Project'))
+from bitmap_index import BitmapIndex  # noqa: E402
+from profiling import profiled  # noqa: E402
+from figure_cache import cached_figure  # noqa: E402
+from storage import derive, tag, file_stamp  # noqa: E402
+from raster import RASTER_DPI, rasterize_points, savefig_options  # noqa: E402
+from reproject import TARGET_CRS, reproject  # noqa: E402
 
+
+@profiled(rows='df')
 def make_geo(df: pd.DataFrame) -> geopandas.GeoDataFrame:
     """
     make_geo
-        - Delete rows with NaN values from columns `d` and `e`.
-        - Create geometry column as point from `d` and `e` values.
         - Convert coordinates points in WGS 84 (3857) from S-JTSK (5514)
-        - Rewrite new GPS coordinates to columns `d` and `e`.
+          (chunked reprojection cached in the data folder).
+        - Delete rows with NaN or -1 values in columns `d` and `e`.
+        - Create geometry column as point from projected `d` and `e` values.
 
     Parameters
     ----------
@@ -38,8 +51,12 @@ def make_geo(df: pd.DataFrame) -> geopandas.GeoDataFrame:
         New dataframe with new format and prepared coordinates column
     """
 
-    # Delete rows with NaN values from columns `d` and `e`
-    df = df.dropna(subset=['d', 'e'])
+    # Convert coordinates points in WGS 84 (3857) from S-JTSK (5514)
+    x, y = reproject(pd.to_numeric(df['d'], errors='coerce'),
+                     pd.to_numeric(df['e'], errors='coerce'))
+    # Delete rows without coordinates (NaN, -1)
+    located = ~np.isnan(x)
+    source, df = df, df[located]
     gdf = pd.DataFrame()
 
     for i in df:
@@ -58,19 +75,21 @@ def make_geo(df: pd.DataFrame) -> geopandas.GeoDataFrame:
             gdf[i] = pd.to_numeric(df[i],
                                    downcast='signed',
                                    errors='coerce')
-    # Create geometry column as point from `d` and `e` values
+    # Create geometry column as point from projected `d` and `e` values
     gdf = geopandas.GeoDataFrame(gdf,
-                                 geometry=geopandas.points_from_xy(gdf['d'],
-                                                                   gdf['e']),
-                                 crs="EPSG:5514")
-    # Convert coordinates points in WGS 84 (3857) from S-JTSK (5514)
-    gdf = gdf.to_crs(epsg=3857)
-    return gdf
+                                 geometry=geopandas.points_from_xy(x[located],
+                                                                   y[located]),
+                                 crs=TARGET_CRS)
+    return derive(gdf, source, 'make_geo', TARGET_CRS)
 
 
+@profiled(rows='gdf')
+@cached_figure(data=('gdf',), ignore=('bitmaps',))
 def plot_geo(gdf: geopandas.GeoDataFrame,
              fig_location: str = None,
-             show_figure: bool = False):
+             show_figure: bool = False,
+             bitmaps: BitmapIndex = None,
+             raster_dpi: int = RASTER_DPI):
     """
     plot_conseq
         - Prepare appropriate dataframe
@@ -84,11 +103,23 @@ def plot_geo(gdf: geopandas.GeoDataFrame,
         Directory and filename to save figure
     show_figure : bool
         True/False parameter to choose possibility to show the figure
+    bitmaps : BitmapIndex
+        Bitmap index built for the rows of gdf (BitmapIndex.from_dataframe),
+        used instead of scanning region and p5a columns
+    raster_dpi : int
+        DPI of rasterized point layers in vector formats (pdf, svg, eps),
+        0 keeps the points vector
     """
 
-    # Select needed columns and rows
-    gdf = gdf.loc[gdf['region'].isin(['JHM'])]
-    gdf = gdf[['p5a', 'geometry']]
+    # Select needed columns and rows (JHM region in/outside settlements)
+    if bitmaps is not None:
+        jhm = bitmaps.eq('region', 'JHM')
+        parts = [gdf.iloc[(jhm & bitmaps.eq('p5a', i+1)).rows()][['geometry']]
+                 for i in range(2)]
+    else:
+        gdf = gdf.loc[gdf['region'].isin(['JHM'])]
+        gdf = gdf[['p5a', 'geometry']]
+        parts = [gdf[gdf["p5a"] == i+1] for i in range(2)]
 
     # Prepare figure, grid, and list of axes
     fig = plt.figure(figsize=(14, 10))
@@ -100,7 +131,8 @@ def plot_geo(gdf: geopandas.GeoDataFrame,
         # Add subplot to axes list
         axs.append(fig.add_subplot(gs[i]))
         # Put coordinates on the subplot
-        gdf[gdf["p5a"] == i+1].plot(ax=axs[i], markersize=3, color=var[0])
+        parts[i].plot(ax=axs[i], markersize=3, color=var[0])
+        rasterize_points(axs[i], raster_dpi)
         # Adjust maximum x/y axis
         axs[i].set_ylim(6_205_000, 6_390_000)
         axs[i].set_xlim(1_725_000, 1_972_500)
@@ -117,7 +149,8 @@ def plot_geo(gdf: geopandas.GeoDataFrame,
     # Save figure
     if fig_location:
         try:
-            plt.savefig(fig_location, bbox_inches='tight')
+            plt.savefig(fig_location, bbox_inches='tight',
+                        **savefig_options(fig_location, raster_dpi))
         except ValueError:
             raise ValueError("""ERROR: wrong image dtype, supported:
     eps, jpeg, jpg, pdf, pgf, png, ps, raw, rgba, svg, svgz, tif, tiff""")
@@ -127,9 +160,13 @@ def plot_geo(gdf: geopandas.GeoDataFrame,
     plt.close()
 
 
+@profiled(rows='gdf')
+@cached_figure(data=('gdf',), ignore=('bitmaps',))
 def plot_cluster(gdf: geopandas.GeoDataFrame,
                  fig_location: str = None,
-                 show_figure: bool = False):
+                 show_figure: bool = False,
+                 bitmaps: BitmapIndex = None,
+                 raster_dpi: int = RASTER_DPI):
     """
     plot_cluster
         - Prepare appropriate dataframe
@@ -143,10 +180,19 @@ def plot_cluster(gdf: geopandas.GeoDataFrame,
         Directory and filename to save figure
     show_figure : bool
         True/False parameter to choose possibility to show the figure
+    bitmaps : BitmapIndex
+        Bitmap index built for the rows of gdf (BitmapIndex.from_dataframe),
+        used instead of scanning region and p5a columns
+    raster_dpi : int
+        DPI of rasterized point layers in vector formats (pdf, svg, eps),
+        0 keeps the points vector
     """
 
     # Select needed columns and rows
-    gdf = gdf.loc[gdf['region'].isin(['JHM'])]
+    if bitmaps is not None:
+        gdf = gdf.iloc[bitmaps.eq('region', 'JHM').rows()]
+    else:
+        gdf = gdf.loc[gdf['region'].isin(['JHM'])]
     gdf = gdf[['geometry']]
 
     # Find Kmeans
@@ -165,6 +211,7 @@ def plot_cluster(gdf: geopandas.GeoDataFrame,
     ax = fig.add_subplot()
     # Put coordinates on the subplot
     gdf.plot(ax=ax, markersize=0.25, color='tab:gray')
+    rasterize_points(ax, raster_dpi)
     # Adjust maximum x/y axis
     ax.set_ylim(6_205_000, 6_390_000)
     ax.set_xlim(1_725_000, 1_972_500)
@@ -193,7 +240,8 @@ def plot_cluster(gdf: geopandas.GeoDataFrame,
     # Save figure
     if fig_location:
         try:
-            plt.savefig(fig_location, bbox_inches='tight')
+            plt.savefig(fig_location, bbox_inches='tight',
+                        **savefig_options(fig_location, raster_dpi))
         except ValueError:
             raise ValueError("""ERROR: wrong image dtype, supported:
     eps, jpeg, jpg, pdf, pgf, png, ps, raw, rgba, svg, svgz, tif, tiff""")
@@ -204,6 +252,11 @@ def plot_cluster(gdf: geopandas.GeoDataFrame,
 
 if __name__ == "__main__":
     # zde muzete delat libovolne modifikace
-    gdf = make_geo(pd.read_pickle("accidents.pkl.gz"))
+    df = pd.read_pickle("accidents.pkl.gz")
+    # Both maps show JHM region only, select its rows by the bitmap index
+    # cached next to the file before the coordinates are projected
+    bitmaps = BitmapIndex.for_file("accidents.pkl.gz")
+    df = df.iloc[bitmaps.eq('region', 'JHM').rows()]
+    gdf = make_geo(tag(df, file_stamp("accidents.pkl.gz"), 'region', 'JHM'))
     plot_geo(gdf, "geo1.png", False)
     plot_cluster(gdf, "geo2.png", False)
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3.8
+# coding=utf-8
+
+"""
+| Project Implementation for IZV 2020/2021
+| Script spatial.py
+| Date: 18.10.2026
+| Author: Mikhail Abramov
+| xabram00@stud.fit.vutbr.cz
+"""
+
+import os
+import sys
+import gzip
+import pickle
+import hashlib
+import argparse
+import numpy as np
+import pandas as pd
+import scipy
+from scipy.spatial import cKDTree
+
+# Data layer modules from 1_Project
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, '1_Project'))
+from binning import CAUSES  # noqa: E402
+from storage import atomic_write, file_stamp  # noqa: E402
+
+"""
+Earth radius of Web Mercator (EPSG:3857) in metres
+"""
+EARTH_RADIUS = 6378137.0
+
+"""
+Default number of leaf points of the KD-tree
+"""
+LEAFSIZE = 16
+
+"""
+Parallel queries of cKDTree are requested by 'workers' since scipy 1.6 ('n_jobs' before)
+"""
+WORKERS_ARGUMENT = 'workers' if tuple(
+    int(part) for part in scipy.__version__.split('.')[:2]) >= (1, 6) else 'n_jobs'
+
+
+def scale(y):
+    """
+    Scale factor of EPSG:3857 at the y coordinates (1 / cos(latitude)),
+    metres on the ground times scale are EPSG:3857 units
+    """
+    return np.cosh(np.asarray(y, dtype=float) / EARTH_RADIUS)
+
+
+def lonlat(lon, lat):
+    """
+    EPSG:3857 query points of WGS 84 longitudes and latitudes
+
+    Returns
+    -------
+    points : np.ndarray[float]
+        Shape (n, 2)
+    """
+    lon = np.radians(np.asarray(lon, dtype=float))
+    lat = np.radians(np.asarray(lat, dtype=float))
+    return np.column_stack([EARTH_RADIUS * lon,
+                            EARTH_RADIUS * np.arctanh(np.sin(lat))]).reshape(-1, 2)
+
+
+class SpatialIndex:
+    """
+    KD-tree over the projected make_geo coordinates (EPSG:3857) for batched
+    radius counts and k-nearest queries. Radii and distances are in metres
+    on the ground (EPSG:3857 units are corrected by the scale factor at the
+    query point), attribute filters use KD-trees of the selected accidents
+    (built once per filter).
+
+    Attributes
+    ----------
+    tree : scipy.spatial.cKDTree
+        Tree of the located accidents.
+    labels : np.ndarray
+        Row label (make_geo index) of each point of the tree.
+    source : str
+        Stamp of the data file.
+    """
+
+    def __init__(self, tree, labels, source=""):
+        self.tree = tree
+        self.labels = np.asarray(labels)
+        self.source = source
+        self._subsets = {}
+
+    @classmethod
+    def build(cls, x, y, labels=None, leafsize=LEAFSIZE):
+        """
+        Build the index of the points, points with NaN coordinates are skipped
+
+        Parameters
+        ----------
+        x, y : array-like
+            EPSG:3857 coordinates.
+        labels : array-like
+            Row labels, positions if None.
+
+        Returns
+        -------
+        index : SpatialIndex
+        """
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        labels = np.arange(len(x)) if labels is None else np.asarray(labels)
+        valid = np.isfinite(x) & np.isfinite(y)
+        tree = cKDTree(np.column_stack([x[valid], y[valid]]), leafsize=leafsize,
+                       balanced_tree=False)
+        return cls(tree, labels[valid])
+
+    @classmethod
+    def from_geo(cls, gdf, leafsize=LEAFSIZE):
+        """
+        Build the index of make_geo output (labels are gdf index)
+        """
+        return cls.build(gdf.geometry.x.to_numpy(), gdf.geometry.y.to_numpy(),
+                         gdf.index.to_numpy(), leafsize)
+
+    @classmethod
+    def for_file(cls, filename, leafsize=LEAFSIZE):
+        """
+        Load index cached next to accidents pickle.gz file ({filename}.kdtree.pkl),
+        index is rebuilt (make_geo) when the file is rewritten (size, mtime).
+
+        Parameters
+        ----------
+        filename : str
+            Accidents dataframe in pickle.gz format.
+
+        Returns
+        -------
+        index : SpatialIndex
+        """
+        path = f"{filename}.kdtree.pkl"
+        stamp = file_stamp(filename)
+        if os.path.isfile(path):
+            index = cls.load(path)
+            if index.source == stamp:
+                return index
+        # geopandas is needed only to project the coordinates
+        from geo import make_geo
+
+        index = cls.from_geo(make_geo(pd.read_pickle(filename)), leafsize)
+        index.save(path, stamp)
+        return index
+
+    def save(self, path, source=None):
+        """
+        Atomically save the index (tree with its points) into pickle.gz file
+        """
+        source = self.source if source is None else source
+        with atomic_write(path) as f, gzip.GzipFile(fileobj=f, mode="wb", compresslevel=1) as z:
+            pickle.dump({"source": source, "labels": self.labels, "tree": self.tree}, z,
+                        protocol=4)
+        self.source = source
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load the index saved by save()
+        """
+        with gzip.open(path) as f:
+            state = pickle.load(f)
+        return cls(state["tree"], state["labels"], state["source"])
+
+    def __len__(self):
+        return self.tree.n
+
+    def subset(self, where):
+        """
+        Index of the selected accidents (cached by the filter)
+
+        Parameters
+        ----------
+        where : pd.Series or np.ndarray[bool]
+            Boolean filter aligned by row labels (pd.Series)
+            or by points of the index (array).
+
+        Returns
+        -------
+        index : SpatialIndex
+        """
+        if isinstance(where, pd.Series):
+            where = where.reindex(self.labels, fill_value=False)
+        mask = np.asarray(where, dtype=bool)
+        if len(mask) != len(self):
+            raise ValueError("ERROR: filter does not match points of the index")
+        key = hashlib.sha256(np.packbits(mask)).hexdigest()
+        if key not in self._subsets:
+            points = self.tree.data[mask]
+            self._subsets[key] = SpatialIndex(
+                cKDTree(points, leafsize=self.tree.leafsize, balanced_tree=False),
+                self.labels[mask], self.source)
+        return self._subsets[key]
+
+    def count(self, points, radius, where=None, workers=-1):
+        """
+        Number of accidents within the radius of each query point
+
+        Parameters
+        ----------
+        points : array-like
+            EPSG:3857 query points of shape (n, 2) (lonlat() converts WGS 84).
+        radius : float or array-like
+            Radius in metres (one for all points or one per point).
+        where : pd.Series or np.ndarray[bool]
+            Attribute filter of the accidents (see subset), all if None.
+        workers : int
+            Parallel jobs of the tree, -1 uses all CPUs.
+
+        Returns
+        -------
+        counts : np.ndarray[int64]
+        """
+        index = self if where is None else self.subset(where)
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        if not len(index) or not len(points):
+            return np.zeros(len(points), dtype=np.int64)
+        radius = np.broadcast_to(np.asarray(radius, dtype=float), len(points)) * scale(points[:, 1])
+        counts = index.tree.query_ball_point(points, radius, return_length=True,
+                                             **{WORKERS_ARGUMENT: workers})
+        return np.asarray(counts, dtype=np.int64)
+
+    def nearest(self, points, k=1, max_distance=np.inf, where=None, workers=-1):
+        """
+        k nearest accidents of each query point
+
+        Parameters
+        ----------
+        points : array-like
+            EPSG:3857 query points of shape (n, 2).
+        k : int
+            Number of neighbours.
+        max_distance : float
+            Largest distance in metres.
+        where : pd.Series or np.ndarray[bool]
+            Attribute filter of the accidents, all if None.
+        workers : int
+            Parallel jobs of the tree, -1 uses all CPUs.
+
+        Returns
+        -------
+        distances : np.ndarray[float]
+            Distances in metres of shape (n, k), inf if missing
+        labels : np.ndarray
+            Row labels of the neighbours of shape (n, k),
+            missing neighbours are masked (np.ma.MaskedArray)
+        """
+        index = self if where is None else self.subset(where)
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        factor = scale(points[:, 1])[:, None]
+        if len(index):
+            distances, found = index.tree.query(points, k=k,
+                                                distance_upper_bound=max_distance * factor.max(initial=1),
+                                                **{WORKERS_ARGUMENT: workers})
+            distances = distances.reshape(len(points), k) / factor
+            found = found.reshape(len(points), k)
+        else:
+            distances = np.full((len(points), k), np.inf)
+            found = np.zeros((len(points), k), dtype=np.int64)
+        missing = ~np.isfinite(distances) | (distances > max_distance)
+        distances[missing] = np.inf
+        labels = index.labels[np.where(missing, 0, found)] if len(index) else found
+        return distances, np.ma.masked_array(labels, mask=missing)
+
+
+def causes(df, *groups):
+    """
+    Filter of the accidents by p12 cause groups (binning.CAUSES labels)
+
+    Returns
+    -------
+    where : pd.Series[bool]
+    """
+    codes = CAUSES.codes(df['p12'])
+    wanted = [CAUSES.labels.index(group) for group in groups]
+    return pd.Series(np.isin(codes, wanted), index=df.index)
+
+
+"""
+Main:
+    Count accidents of accidents.pkl.gz (2_Project get_dataframe output)
+    around WGS 84 points and find the nearest ones
+"""
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Spatial queries of accidents")
+    parser.add_argument("filename", nargs="?", default="accidents.pkl.gz")
+    parser.add_argument("-p", "--points", type=float, nargs=2, action="append",
+                        metavar=("LON", "LAT"), default=None,
+                        help="query point (default Brno centre)")
+    parser.add_argument("-r", "--radius", type=float, default=500, help="radius in metres")
+    parser.add_argument("-k", type=int, default=5, help="nearest accidents")
+    parser.add_argument("-c", "--causes", nargs="*", default=[],
+                        help="p12 cause groups (e.g. Speeding)")
+    args = parser.parse_args()
+
+    index = SpatialIndex.for_file(args.filename)
+    where = None
+    if args.causes:
+        where = causes(pd.read_pickle(args.filename), *args.causes)
+    points = np.array(args.points or [[16.6068, 49.1951]])
+    query = lonlat(points[:, 0], points[:, 1])
+    counts = index.count(query, args.radius, where)
+    distances, labels = index.nearest(query, args.k, where=where)
+    for point, count, distance, label in zip(points, counts, distances, labels):
+        print(f'{point[0]:.5f} {point[1]:.5f}: {count} accidents within {args.radius:g} m, '
+              f'nearest {np.round(distance[np.isfinite(distance)]).tolist()} m '
+              f'(rows {label.compressed().tolist()})')
@@ -0,0 +1,105 @@
+# coding=utf-8
+
+"""
+| Project Implementation for IZV 2020/2021
+| Script test_bootstrap.py
+| Date: 18.10.2026
+| Author: Mikhail Abramov
+| xabram00@stud.fit.vutbr.cz
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bootstrap import METRICS, binomial_ci, difference_ci, rates_ci, resample
+
+
+@pytest.fixture
+def df():
+    """
+    Accidents of two regions with different injury rates
+    """
+    rng = np.random.default_rng(0)
+    rows = 4000
+    region = rng.choice(['JHM', 'PHA'], rows)
+    serious = np.where(region == 'JHM', 0.15, 0.05)
+    return pd.DataFrame({'region': region,
+                         'p13a': (rng.random(rows) < 0.02).astype(int),
+                         'p13b': (rng.random(rows) < serious).astype(int),
+                         'p13c': rng.integers(0, 3, rows)})
+
+
+def row_bootstrap(values, replicates, level, rng):
+    """
+    Reference percentile interval of the mean by resampling the rows
+    """
+    values = np.asarray(values, dtype=float)
+    means = [values[rng.integers(0, len(values), len(values))].mean()
+             for _ in range(replicates)]
+    return np.quantile(means, [(1 - level) / 2, (1 + level) / 2])
+
+
+def test_resample():
+    """
+    Resampled cells keep the group totals and have the observed mean
+    """
+    counts = np.array([[10, 30, 60], [0, 5, 0], [0, 0, 0]])
+    samples = resample(counts, 20000, np.random.default_rng(1))
+    assert samples.shape == (20000, 3, 3) and (samples >= 0).all()
+    np.testing.assert_array_equal(samples.sum(axis=-1), np.broadcast_to(counts.sum(axis=-1), (20000, 3)))
+    np.testing.assert_allclose(samples.mean(axis=0), counts, atol=0.3)
+
+
+def test_rates_ci(df):
+    """
+    Rates equal pandas means and intervals agree with row resampling
+    """
+    result = rates_ci(df, by='region', replicates=2000)
+    rng = np.random.default_rng(2)
+    for region, group in df.groupby('region'):
+        for metric, func in METRICS.items():
+            row = result[(result['region'] == region) & (result['metric'] == metric)].iloc[0]
+            values = func(group)
+            assert row['n'] == len(group)
+            assert row['rate'] == pytest.approx(values.mean())
+            assert row['low'] <= row['rate'] <= row['high']
+            low, high = row_bootstrap(values, 1000, 0.95, rng)
+            np.testing.assert_allclose([row['low'], row['high']], [low, high], atol=0.006)
+            assert row['each'] == pytest.approx(1 / row['rate'])
+
+
+def test_seed(df):
+    """
+    The same seed and chunk give the same intervals, the chunk size
+    does not change the estimate
+    """
+    first = rates_ci(df, replicates=500, seed=7, chunk=100)
+    pd.testing.assert_frame_equal(first, rates_ci(df, replicates=500, seed=7, chunk=100))
+    whole = rates_ci(df, replicates=500, seed=7, chunk=None)
+    np.testing.assert_array_equal(first['rate'], whole['rate'])
+    np.testing.assert_allclose(first[['low', 'high']], whole[['low', 'high']], atol=0.01)
+
+
+def test_binomial_ci():
+    """
+    Intervals of independent rates are close to the normal approximation
+    """
+    successes, trials = np.array([50, 400, 0]), 1000
+    result = binomial_ci(successes, trials, ['a', 'b', 'c'], replicates=5000)
+    rate = successes / trials
+    se = np.sqrt(rate * (1 - rate) / trials)
+    np.testing.assert_allclose(result['rate'], rate)
+    np.testing.assert_allclose(result['low'], rate - 1.96 * se, atol=0.004)
+    np.testing.assert_allclose(result['high'], rate + 1.96 * se, atol=0.004)
+    assert result['each'].iloc[2] == np.inf
+
+
+def test_difference_ci():
+    """
+    Estimate is PYY - PNY of the crosstab, the interval covers it
+    """
+    table = np.array([[900, 100], [150, 50]])
+    estimate, low, high = difference_ci(table, replicates=2000)
+    assert estimate == pytest.approx(50 / 200 - 100 / 1000)
+    assert low < estimate < high
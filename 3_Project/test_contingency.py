@@ -0,0 +1,112 @@
+# coding=utf-8
+
+"""
+| Project Implementation for IZV 2020/2021
+| Script test_contingency.py
+| Date: 18.10.2026
+| Author: Mikhail Abramov
+| xabram00@stud.fit.vutbr.cz
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import chi2_contingency
+
+from contingency import chi2_batch, hypothesis, screen
+
+
+@pytest.fixture
+def df():
+    """
+    Accidents with dependent p11/p13b columns, a rare region and a constant factor
+    """
+    rng = np.random.default_rng(0)
+    rows = 3000
+    p11 = rng.choice([0, 1, 2, 4, 5, 7, 8, 9], rows)
+    serious = rng.random(rows) < np.where(p11 >= 7, 0.3, 0.1)
+    return pd.DataFrame({
+        'region': rng.choice(['JHM', 'PHA', 'ZLK'], rows, p=[0.5, 0.49, 0.01]),
+        'date': pd.Timestamp('2016-01-01') + pd.to_timedelta(rng.integers(0, 4 * 365, rows), 'D'),
+        'p11': p11,
+        'p12': rng.choice([100, 201, 202, 301, 501], rows),
+        'p16': rng.integers(0, 9, rows),
+        'p5a': np.ones(rows, dtype=int),
+        'p13a': (rng.random(rows) < 0.02).astype(int),
+        'p13b': serious.astype(int),
+        'p13c': rng.integers(0, 2, rows),
+    })
+
+
+def reference(table, correction=True):
+    """
+    scipy.stats.chi2_contingency of the table without empty rows and columns
+    """
+    table = np.asarray(table)
+    table = table[table.sum(axis=1) > 0][:, table.sum(axis=0) > 0]
+    if min(table.shape) < 2:
+        return np.nan, np.nan, 0
+    stat, p, dof, _ = chi2_contingency(table, correction=correction)
+    return stat, p, dof
+
+
+@pytest.mark.parametrize('correction', [True, False])
+def test_chi2_batch(correction):
+    """
+    Every table of the batch equals chi2_contingency, including 2x2 tables
+    (Yates' correction), padded tables and tables with 0 degrees of freedom
+    """
+    rng = np.random.default_rng(1)
+    tables = rng.integers(0, 50, (40, 5, 2))
+    tables[:10, 2:] = 0
+    tables[10:15, :, 1] = 0
+    tables[15:18, 1:] = 0
+    tables[18, 0, 0] = 1
+    stat, p, dof, expected = chi2_batch(tables, correction)
+    for i, table in enumerate(tables):
+        ref_stat, ref_p, ref_dof = reference(table, correction)
+        assert dof[i] == ref_dof
+        np.testing.assert_allclose([stat[i], p[i]], [ref_stat, ref_p], rtol=1e-10, equal_nan=True)
+    assert expected.shape == tables.shape
+
+
+def test_screen(df):
+    """
+    Every (group, factor, outcome) row equals chi2_contingency of pd.crosstab
+    of the group
+    """
+    result = screen(df, ['p12', 'p16', 'p5a'], by=('region', 'year'), workers=2)
+    df['year'] = df['date'].dt.year
+    outcomes = {'killed': df['p13a'] > 0, 'serious': df['p13a'] + df['p13b'] > 0,
+                'injured': df['p13a'] + df['p13b'] + df['p13c'] > 0}
+    count = 0
+    for (region, year), group in df.groupby(['region', 'year']):
+        for factor in ['p12', 'p16', 'p5a']:
+            for outcome, values in outcomes.items():
+                row = result[(result['region'] == region) & (result['year'] == year)
+                             & (result['factor'] == factor) & (result['outcome'] == outcome)]
+                assert len(row) == 1
+                table = pd.crosstab(group[factor], values[group.index])
+                stat, p, dof = reference(table.to_numpy())
+                assert row['n'].iloc[0] == len(group) and row['dof'].iloc[0] == dof
+                np.testing.assert_allclose(row[['chi2', 'p']].to_numpy()[0], [stat, p],
+                                           rtol=1e-10, equal_nan=True)
+                count += 1
+    assert count == len(result)
+
+
+def test_hypothesis(df):
+    """
+    Alcohol hypothesis of stat.ipynb: drug accidents excluded, PYY/PNY
+    are the conditional rates and the test equals chi2_contingency
+    """
+    result = hypothesis(df)
+    kept = df[~df['p11'].isin([4, 5])]
+    drunk = kept['p11'] >= 7
+    serious = kept['p13a'] + kept['p13b'] > 0
+    stat, p, _, _ = chi2_contingency(pd.crosstab(drunk, serious).to_numpy())
+    assert result['n'] == len(kept)
+    np.testing.assert_allclose([result['chi2'], result['p']], [stat, p], rtol=1e-10)
+    np.testing.assert_allclose([result['PYY'], result['PNY']],
+                               [serious[drunk].mean(), serious[~drunk].mean()])
+    assert result['confirmed']
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3.8
+# coding=utf-8
+
+"""
+| Project Implementation for IZV 2020/2021
+| Script tiles.py
+| Date: 18.10.2026
+| Author: Mikhail Abramov
+| xabram00@stud.fit.vutbr.cz
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import time
+import argparse
+import concurrent.futures
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from matplotlib.image import imsave
+from scipy.ndimage import gaussian_filter
+
+# Data layer modules from 1_Project
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, '1_Project'))
+from aggregate import encode  # noqa: E402
+from binning import BINS  # noqa: E402
+from id_index import id_keys  # noqa: E402
+from storage import atomic_write  # noqa: E402
+
+"""
+Half of the side of the Web Mercator (EPSG:3857) world square in metres
+"""
+EXTENT = 20037508.342789244
+
+"""
+Side of the tile in pixels
+"""
+TILE = 256
+
+"""
+Default zoom levels of the pyramid (whole Czech Republic ~ 6, streets ~ 13)
+"""
+ZOOMS = range(6, 14)
+
+"""
+Default radius (sigma of the gaussian kernel) of one accident in pixels, 0 - no blur
+"""
+RADIUS = 1.5
+
+"""
+Default colormap of the density
+"""
+CMAP = 'inferno'
+
+"""
+State of the pyramid in its folder: rendered accident IDs, parameters, scales
+"""
+STATE = 'tiles.npz'
+
+
+def pixels(x, y, zoom):
+    """
+    Global pixel coordinates of EPSG:3857 points at the zoom level
+    (origin in the top left corner of the world, y grows to the south)
+
+    Returns
+    -------
+    px, py : np.ndarray[float]
+    """
+    scale = TILE * 2 ** zoom / (2 * EXTENT)
+    return (np.asarray(x) + EXTENT) * scale, (EXTENT - np.asarray(y)) * scale
+
+
+def tile_keys(px, py, zoom):
+    """
+    Key of the tile of each pixel (tx * 2 ** zoom + ty)
+
+    Returns
+    -------
+    keys : np.ndarray[int64]
+    """
+    n = 2 ** zoom
+    tx = np.clip(np.floor(px / TILE), 0, n - 1).astype(np.int64)
+    ty = np.clip(np.floor(py / TILE), 0, n - 1).astype(np.int64)
+    return tx * n + ty
+
+
+def peak(px, py):
+    """
+    Largest number of points in one pixel (scale of the colors of a zoom level)
+    """
+    if not len(px):
+        return 1
+    width = 2 ** 31
+    keys = np.floor(px).astype(np.int64) * width + np.floor(py).astype(np.int64)
+    return int(np.unique(keys, return_counts=True)[1].max())
+
+
+def histogram(px, py, tx, ty, margin=0):
+    """
+    2D histogram of the points in the pixels of the tile
+    extended by margin pixels on each side
+
+    Returns
+    -------
+    counts : np.ndarray[int64]
+        Shape (TILE + 2 * margin, TILE + 2 * margin), rows are y
+    """
+    size = TILE + 2 * margin
+    lx = np.floor(px - tx * TILE).astype(np.int64) + margin
+    ly = np.floor(py - ty * TILE).astype(np.int64) + margin
+    inside = (lx >= 0) & (lx < size) & (ly >= 0) & (ly < size)
+    counts = np.bincount(ly[inside] * size + lx[inside], minlength=size * size)
+    return counts.reshape(size, size)
+
+
+def render(px, py, tx, ty, path, vmax, radius=RADIUS, cmap=CMAP):
+    """
+    Render one heatmap tile into PNG file: points are blurred by gaussian
+    kernel with peak 1 (isolated accident has value 1, points of the
+    neighbouring tiles within the margin are included, so there are no seams),
+    value log(1 + density) / log(1 + vmax) is the color and the opacity.
+
+    Parameters
+    ----------
+    px, py : np.ndarray[float]
+        Global pixel coordinates of the points of the tile and its neighbours.
+    tx, ty : int
+        Tile.
+    path : str
+        Output PNG file.
+    vmax : float
+        Density of the brightest color.
+
+    Returns
+    -------
+    written : bool
+        False if the tile is empty (no file is written)
+    """
+    margin = int(math.ceil(3 * radius)) if radius else 0
+    density = histogram(px, py, tx, ty, margin).astype(np.float32)
+    if radius:
+        density = gaussian_filter(density, radius, mode='constant') * (2 * math.pi * radius ** 2)
+        density = density[margin:margin + TILE, margin:margin + TILE]
+    value = np.clip(np.log1p(density) / math.log1p(vmax), 0, 1)
+    if not (value > 1 / 255).any():
+        return False
+    rgba = plt.get_cmap(cmap)(value, bytes=True)
+    rgba[..., 3] = np.round(value * 255).astype(np.uint8)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with atomic_write(path) as f:
+        imsave(f, rgba, format='png')
+    return True
+
+
+def slug(label):
+    """
+    Folder name of the category label
+    """
+    return re.sub(r'[^0-9A-Za-z]+', '_', str(label)).strip('_').lower() or 'none'
+
+
+def layers(values):
+    """
+    Categories of the accidents for the layers of the pyramid,
+    columns with bins (p12) are grouped by them (cause groups)
+
+    Parameters
+    ----------
+    values : pd.Series
+        Category column (p5a, p12, ...).
+
+    Returns
+    -------
+    categories : pd.Series or pd.Categorical
+    """
+    if values.name in BINS:
+        return BINS[values.name].categorical(values)
+    return values
+
+
+def load_state(folder):
+    """
+    State of the pyramid (None if it does not exist)
+
+    Returns
+    -------
+    ids : np.ndarray
+        Sorted keys of the rendered accidents.
+    params : dict
+        zooms, radius, cmap, layers, vmax {layer: {zoom: vmax}}
+    """
+    path = os.path.join(folder, STATE)
+    if not os.path.isfile(path):
+        return None, None
+    with np.load(path, allow_pickle=False) as f:
+        return f['ids'], json.loads(str(f['params']))
+
+
+def save_state(folder, ids, params):
+    """
+    Atomically save state of the pyramid
+    """
+    os.makedirs(folder, exist_ok=True)
+    with atomic_write(os.path.join(folder, STATE)) as f:
+        np.savez_compressed(f, ids=ids, params=np.array(json.dumps(params)))
+
+
+def build(folder, x, y, ids, categories=None, zooms=ZOOMS, radius=RADIUS, cmap=CMAP,
+          full=False, executor=None, workers=None):
+    """
+    Build or update XYZ pyramid of heatmap tiles {folder}/[{category}/]{z}/{x}/{y}.png.
+    Accidents already rendered are remembered by ID, tiles touched by newly
+    appended accidents (incl. neighbours within the blur margin) are re-rendered
+    from all accidents, other tiles are kept. Scales of the zoom levels are
+    kept from the full build (brighter new hot spots saturate), full rebuild
+    is forced by changed parameters or categories.
+
+    Parameters
+    ----------
+    folder : str
+        Output folder.
+    x, y : array-like
+        EPSG:3857 coordinates (make_geo geometry), NaN rows are skipped.
+    ids : array-like
+        Accident IDs (p1).
+    categories : array-like
+        Category of each accident (one layer per category),
+        one layer of all accidents if None.
+    zooms : iterable[int]
+        Zoom levels.
+    radius : float
+        Sigma of the gaussian kernel in pixels.
+    cmap : str
+        Colormap.
+    full : bool
+        Re-render all tiles.
+    executor : concurrent.futures.Executor
+        Executor rendering the tiles, own ThreadPoolExecutor if None.
+    workers : int
+        Workers of own executor.
+
+    Returns
+    -------
+    stats : dict
+        accidents, new (rendered for the first time), tiles (rendered),
+        empty (skipped) and seconds
+    """
+    start = time.perf_counter()
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    keys = id_keys(ids)
+    valid = np.isfinite(x) & np.isfinite(y)
+    if categories is None:
+        codes, labels = np.zeros(len(x), dtype=np.int64), ['']
+    else:
+        codes, labels = encode(categories)
+        labels = [slug(label) for label in labels]
+
+    zooms = [int(z) for z in zooms]
+    params = {'zooms': zooms, 'radius': radius, 'cmap': cmap, 'layers': labels, 'vmax': {}}
+    rendered, state = load_state(folder)
+    if full or state is None or any(state[k] != params[k] for k in ('zooms', 'radius', 'cmap')) \
+            or not set(labels) <= set(state['layers']):
+        full, rendered = True, np.zeros(0, dtype=keys.dtype)
+    else:
+        params['layers'] = list(dict.fromkeys(state['layers'] + labels))
+        params['vmax'] = state['vmax']
+    new = ~np.isin(keys, rendered)
+    stats = {'accidents': int(valid.sum()), 'new': int((new & valid).sum()),
+             'tiles': 0, 'empty': 0}
+    if not stats['new'] and not full:
+        stats['seconds'] = time.perf_counter() - start
+        return stats
+
+    margin = int(math.ceil(3 * radius)) if radius else 0
+    around = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)] if margin else [(0, 0)]
+    own = executor is None
+    if own:
+        executor = concurrent.futures.ThreadPoolExecutor(workers)
+    try:
+        futures = []
+        for code, label in enumerate(labels):
+            rows = np.flatnonzero(valid & (codes == code))
+            fresh = new[rows]
+            if not len(rows) or not (full or fresh.any()):
+                continue
+            scales = params['vmax'].setdefault(label, {})
+            for z in zooms:
+                n = 2 ** z
+                px, py = pixels(x[rows], y[rows], z)
+                if full or str(z) not in scales:
+                    scales[str(z)] = peak(px, py)
+                tiles = tile_keys(px, py, z)
+                order = np.argsort(tiles, kind='stable')
+                sorted_tiles = tiles[order]
+                # Tiles of the (new) points and of the blur margin around them
+                source = slice(None) if full else fresh
+                touched = np.unique(np.concatenate([
+                    tile_keys(px[source] + dx, py[source] + dy, z)
+                    for dx in (-margin, margin) for dy in (-margin, margin)]))
+                for key in touched:
+                    tx, ty = divmod(int(key), n)
+                    neighbours = [(tx + dx) * n + ty + dy for dx, dy in around
+                                  if 0 <= tx + dx < n and 0 <= ty + dy < n]
+                    lows = np.searchsorted(sorted_tiles, neighbours, side='left')
+                    highs = np.searchsorted(sorted_tiles, neighbours, side='right')
+                    points = np.concatenate([order[lo:hi] for lo, hi in zip(lows, highs)])
+                    path = os.path.join(folder, label, str(z), str(tx), f'{ty}.png')
+                    futures.append(executor.submit(render, px[points], py[points], tx, ty,
+                                                   path, scales[str(z)], radius, cmap))
+        for future in futures:
+            if future.result():
+                stats['tiles'] += 1
+            else:
+                stats['empty'] += 1
+    finally:
+        if own:
+            executor.shutdown()
+
+    save_state(folder, np.union1d(rendered, keys[valid]), params)
+    stats['seconds'] = time.perf_counter() - start
+    return stats
+
+
+def from_geo(gdf):
+    """
+    Coordinates and IDs of make_geo output
+
+    Returns
+    -------
+    x, y : np.ndarray[float]
+    ids : np.ndarray
+    """
+    return gdf.geometry.x.to_numpy(), gdf.geometry.y.to_numpy(), gdf['p1'].to_numpy()
+
+
+"""
+Main:
+    Build or update heatmap tiles of accidents.pkl.gz (2_Project get_dataframe output):
+    layer of all accidents and layers of each category column
+"""
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="XYZ heatmap tiles of accidents")
+    parser.add_argument("filename", nargs="?", default="accidents.pkl.gz")
+    parser.add_argument("-o", "--output", default="tiles")
+    parser.add_argument("-z", "--zooms", type=int, nargs=2, default=[min(ZOOMS), max(ZOOMS)],
+                        help="first and last zoom level")
+    parser.add_argument("-c", "--categories", nargs="*", default=["p12", "p5a"],
+                        help="category columns (p12 - cause groups)")
+    parser.add_argument("-r", "--radius", type=float, default=RADIUS)
+    parser.add_argument("--full", action="store_true", help="re-render all tiles")
+    parser.add_argument("-w", "--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    # geopandas is needed only to project the coordinates
+    from geo import make_geo
+
+    gdf = make_geo(pd.read_pickle(args.filename))
+    x, y, ids = from_geo(gdf)
+    zooms = range(args.zooms[0], args.zooms[1] + 1)
+    for name in ["all"] + args.categories:
+        result = build(os.path.join(args.output, name), x, y, ids,
+                       None if name == "all" else layers(gdf[name]),
+                       zooms, args.radius, full=args.full, workers=args.workers)
+        print(f'{name}: {result["new"]}/{result["accidents"]} new accidents, '
+              f'{result["tiles"]} tiles rendered, {result["empty"]} empty, '
+              f'{result["seconds"]:.2f} s')